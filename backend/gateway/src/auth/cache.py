@@ -0,0 +1,48 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def token_key(token: str) -> str:
+    # В памяти храним только хеш токена, а не сам токен
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TTLLRUCache(Generic[V]):
+    """Ограниченный по размеру LRU-кеш, у каждой записи свой срок жизни"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[V]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V, expires_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[tuple[float, V]]:
+        """Удалить запись: (срок жизни, значение) или None"""
+        return self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -1,9 +1,15 @@
 import dataclasses
+import time
 from datetime import datetime, timezone
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
+from src.auth.cache import TTLLRUCache, token_key
 from src.config import Settings
+from src.monitoring.auth_metrics import (
+    gateway_token_cache_hits_total,
+    gateway_token_cache_misses_total,
+)
 
 settings = Settings()
 
@@ -14,6 +20,12 @@ class UserContext:
     is_manager: int
 
 
+# Проверенные токены живут в кеше до своего exp
+verified_tokens: TTLLRUCache[UserContext] = TTLLRUCache(settings.TOKEN_CACHE_SIZE)
+# Недавно отклоненные токены: хранится detail ошибки
+rejected_tokens: TTLLRUCache[str] = TTLLRUCache(settings.TOKEN_NEGATIVE_CACHE_SIZE)
+
+
 def extract_bearer_token(auth: str) -> str | None:
     if not auth:
         return
@@ -26,7 +38,7 @@ def extract_bearer_token(auth: str) -> str | None:
     return token
 
 
-async def get_user_by_token(token: str):
+def _verify_token(token: str) -> tuple[UserContext, int]:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -37,8 +49,10 @@ async def get_user_by_token(token: str):
         )
 
     expire = payload.get("exp")
-    expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-    if (not expire) or (expire_time < datetime.now(timezone.utc)):
+    if (not expire) or (
+        datetime.fromtimestamp(int(expire), tz=timezone.utc)
+        < datetime.now(timezone.utc)
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired"
         )
@@ -57,4 +71,43 @@ async def get_user_by_token(token: str):
             detail="Token invalid",
         )
 
-    return UserContext(user_id, user_is_manager)
+    return UserContext(user_id, user_is_manager), int(expire)
+
+
+async def get_user_by_token(token: str):
+    key = token_key(token)
+
+    user = verified_tokens.get(key)
+    if user is not None:
+        gateway_token_cache_hits_total.labels(result="valid").inc()
+        return user
+
+    rejected_detail = rejected_tokens.get(key)
+    if rejected_detail is not None:
+        gateway_token_cache_hits_total.labels(result="rejected").inc()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=rejected_detail
+        )
+
+    gateway_token_cache_misses_total.inc()
+    try:
+        user, expire = _verify_token(token)
+    except HTTPException as exc:
+        rejected_tokens.set(
+            key, exc.detail, time.time() + settings.TOKEN_NEGATIVE_CACHE_TTL
+        )
+        raise
+
+    verified_tokens.set(key, user, expire)
+    return user
+
+
+def revoke_token(token: str) -> None:
+    """Токен отозван (выход): до его exp он отклоняется без проверки подписи"""
+    key = token_key(token)
+    cached = verified_tokens.pop(key)
+    if cached is None:
+        expires_at = time.time() + settings.TOKEN_NEGATIVE_CACHE_TTL
+    else:
+        expires_at = cached[0]
+    rejected_tokens.set(key, "Token revoked", expires_at)
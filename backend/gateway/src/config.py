@@ -10,9 +10,182 @@ class Settings:
     REFRESH_TOKEN_EXPIRE_DAYS = os.getenv("REFRESH_TOKEN_EXPIRE_DAYS")
     GATEWAY_SECRET = os.getenv("GATEWAY_SECRET")
 
+    # Пул соединений к апстримам
+    UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100))
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", 20)
+    )
+    UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 30.0))
+    UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 2.0))
+    UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10.0))
+
+    # Потоковое проксирование тел запросов и ответов
+    PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+    PROXY_BUFFER_THRESHOLD = int(os.getenv("PROXY_BUFFER_THRESHOLD", 64 * 1024))
+    PROXY_MAX_BODY_SIZE = int(os.getenv("PROXY_MAX_BODY_SIZE", 10 * 1024 * 1024))
+
+    # Кеш проверенных JWT
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_NEGATIVE_CACHE_SIZE = int(os.getenv("TOKEN_NEGATIVE_CACHE_SIZE", 10000))
+    TOKEN_NEGATIVE_CACHE_TTL = float(os.getenv("TOKEN_NEGATIVE_CACHE_TTL", 30.0))
+    # Успешный выход через этот маршрут убирает токен из кеша
+    LOGOUT_PATH = os.getenv("LOGOUT_PATH", "/auth/logout")
+
+    # Кеш ответов публичных GET-маршрутов
+    RESPONSE_CACHE_ENABLED = (
+        os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    )
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    )
+    RESPONSE_CACHE_MAX_ENTRY_BYTES = int(
+        os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", 1024 * 1024)
+    )
+    # Если задан, кеш общий для всех реплик gateway
+    RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+
+    # Объединение одинаковых одновременных GET-запросов на маршрутах из COALESCE_ROUTES
+    REQUEST_COALESCING_ENABLED = (
+        os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+    )
+
+    # Адаптивный лимит одновременных запросов к апстриму (AIMD)
+    UPSTREAM_CONCURRENCY_INITIAL = int(os.getenv("UPSTREAM_CONCURRENCY_INITIAL", 20))
+    UPSTREAM_CONCURRENCY_MIN = int(os.getenv("UPSTREAM_CONCURRENCY_MIN", 1))
+    UPSTREAM_CONCURRENCY_MAX = int(os.getenv("UPSTREAM_CONCURRENCY_MAX", 200))
+    UPSTREAM_LATENCY_TARGET = float(os.getenv("UPSTREAM_LATENCY_TARGET", 1.0))
+    UPSTREAM_CONCURRENCY_BACKOFF = float(os.getenv("UPSTREAM_CONCURRENCY_BACKOFF", 0.9))
+
+    # Circuit breaker
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 10.0))
+
+    # Балансировка между инстансами сервиса
+    HEALTH_CHECK_ENABLED = os.getenv("HEALTH_CHECK_ENABLED", "true").lower() == "true"
+    HEALTH_CHECK_PATH = os.getenv("HEALTH_CHECK_PATH", "/metrics")
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 5.0))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 1.0))
+    EJECT_FAILURE_THRESHOLD = int(os.getenv("EJECT_FAILURE_THRESHOLD", 3))
+    EJECT_DURATION = float(os.getenv("EJECT_DURATION", 30.0))
+
+    # Повторы запросов при ошибках соединения (только идемпотентные методы)
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 2))
+    RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", 0.05))
+    RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", 0.5))
+
+    # Хеджирование GET-запросов на маршрутах из HEDGE_ROUTES
+    HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.01))
+
+    # POST /batch
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 20))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 5))
+
+    # Сжатие ответов по Accept-Encoding (zstd, br, gzip)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+    # /metrics отдается на отдельном внутреннем порту, а не на публичном порту gateway
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+
+    # Запись выборки запросов в файл для воспроизведения нагрузки (src/tools/replay.py)
+    CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+    CAPTURE_FILE = os.getenv("CAPTURE_FILE", "capture.jsonl")
+    CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", 1.0))
+    CAPTURE_MAX_BODY_SIZE = int(os.getenv("CAPTURE_MAX_BODY_SIZE", 64 * 1024))
+
+
+def _endpoints(env_name: str) -> list[str]:
+    # Несколько инстансов сервиса указываются через запятую
+    return [
+        url.strip().rstrip("/")
+        for url in os.getenv(env_name, "").split(",")
+        if url.strip()
+    ]
+
 
 SERVICE_MAP = {
-    "auth": os.getenv("AUTH_SERVICE_URL"),
-    "decks": os.getenv("DECKS_SERVICE_URL"),
-    "teaching": os.getenv("TEACHING_SERVICE_URL"),
+    "auth": _endpoints("AUTH_SERVICE_URL"),
+    "decks": _endpoints("DECKS_SERVICE_URL"),
+    "teaching": _endpoints("TEACHING_SERVICE_URL"),
+}
+
+# Таймаут ответа для каждого апстрима, например DECKS_SERVICE_TIMEOUT=5
+SERVICE_TIMEOUTS = {
+    service: float(
+        os.getenv(f"{service.upper()}_SERVICE_TIMEOUT", Settings.UPSTREAM_TIMEOUT)
+    )
+    for service in SERVICE_MAP
 }
+
+# Кешируемые маршруты: (сервис, регулярное выражение для path, TTL в секундах)
+RESPONSE_CACHE_ROUTES = [
+    ("decks", r"decks/", int(os.getenv("DECKS_LIST_CACHE_TTL", 30))),
+    ("decks", r"decks/\d+/", int(os.getenv("DECK_DETAIL_CACHE_TTL", 30))),
+]
+
+# Бюджет времени на маршрут (сервис, path, секунды); по умолчанию — SERVICE_TIMEOUTS.
+# Передается сервисам в заголовке X-Request-Deadline
+ROUTE_TIMEOUTS = [
+    ("decks", r"learn/.*", float(os.getenv("LEARN_TIMEOUT", 3.0))),
+]
+
+# Маршруты с небольшими публичными ответами, где одинаковые одновременные GET
+# объединяются в один запрос: (сервис, path). Ответ таких запросов буферизуется,
+# остальные GET проксируются потоком
+COALESCE_ROUTES = [
+    ("decks", r"decks/"),
+    ("decks", r"decks/\d+/"),
+]
+
+# Маршруты, где медленный GET дублируется после p95 задержки: (сервис, path)
+HEDGE_ROUTES = [
+    ("decks", r"decks/"),
+    ("decks", r"decks/\d+/"),
+]
+
+# Шаблоны маршрутов для метки endpoint в метриках: (сервис, path).
+# {id} — числовой сегмент; пути вне списка учитываются как "other"
+METRICS_ROUTES = [
+    ("auth", "register"),
+    ("auth", "login"),
+    ("auth", "logout"),
+    ("auth", "refresh"),
+    ("auth", "me"),
+    ("decks", "decks/"),
+    ("decks", "decks/{id}/"),
+    ("decks", "decks/{id}/stats/"),
+    ("decks", "deck/{id}/cards"),
+    ("decks", "deck/{id}/cards/{id}"),
+    ("decks", "deck/decks/{id}/cards"),
+    ("decks", "deck/{id}/results"),
+    ("decks", "deck/uploads/presign"),
+    ("decks", "categories/"),
+    ("decks", "categories/{id}"),
+    ("decks", "learn/deck/{id}/sessions"),
+    ("decks", "learn/deck/{id}/forecast"),
+    ("decks", "learn/review"),
+    ("decks", "learn/review/cards/{id}/answer"),
+    ("decks", "learn/sessions/{id}"),
+    ("decks", "learn/sessions/{id}/next"),
+    ("decks", "learn/sessions/{id}/cards/{id}/answer"),
+    ("decks", "learn/sessions/{id}/answers"),
+    ("decks", "learn/sessions/{id}/progress"),
+    ("decks", "learn/sessions/{id}/finish"),
+    ("teaching", "courses/"),
+    ("teaching", "courses/{id}/"),
+    ("teaching", "courses/{id}/publish/"),
+    ("teaching", "courses/{id}/unpublish/"),
+    ("teaching", "courses/{id}/decks/"),
+    ("teaching", "courses/{id}/decks/reorder/"),
+    ("teaching", "courses/{id}/decks/batch/"),
+    ("teaching", "courses/{id}/decks/{id}/"),
+    ("teaching", "enrollments/"),
+    ("teaching", "enrollments/{id}/"),
+    ("teaching", "enrollments/{id}/decks/"),
+    ("teaching", "enrollments/{id}/decks/{id}/"),
+    ("teaching", "enrollments/{id}/decks/{id}/complete/"),
+]
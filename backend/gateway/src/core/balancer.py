@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+
+import httpx
+from src.config import SERVICE_MAP, Settings
+from src.core.clients import upstream_clients
+
+settings = Settings()
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+
+class LoadBalancer:
+    """Выбор инстанса сервиса: power of two choices по числу незавершенных запросов.
+
+    Инстанс исключается из выбора, если не проходит активную проверку здоровья
+    или подряд отвечает ошибками (пассивное исключение на EJECT_DURATION).
+    """
+
+    def __init__(self, urls: list[str]):
+        self.endpoints = [Endpoint(url) for url in urls]
+
+    def pick(self) -> Endpoint:
+        now = time.monotonic()
+        candidates = [ep for ep in self.endpoints if ep.is_available(now)]
+        if not candidates:
+            # Все инстансы исключены — лучше попробовать любой, чем отказать сразу
+            candidates = self.endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+    def record(self, endpoint: Endpoint, failed: bool) -> None:
+        if not failed:
+            endpoint.failures = 0
+            return
+        endpoint.failures += 1
+        if endpoint.failures >= settings.EJECT_FAILURE_THRESHOLD:
+            endpoint.ejected_until = time.monotonic() + settings.EJECT_DURATION
+            endpoint.failures = 0
+
+
+upstream_balancers = {
+    service: LoadBalancer(urls) for service, urls in SERVICE_MAP.items()
+}
+
+
+async def _check_endpoint(client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+    try:
+        resp = await client.get(
+            endpoint.url + settings.HEALTH_CHECK_PATH,
+            timeout=settings.HEALTH_CHECK_TIMEOUT,
+        )
+        endpoint.healthy = resp.status_code < 500
+    except httpx.HTTPError:
+        endpoint.healthy = False
+
+
+class HealthChecker:
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            checks = [
+                _check_endpoint(upstream_clients.clients[service], endpoint)
+                for service, balancer in upstream_balancers.items()
+                if service in upstream_clients.clients
+                for endpoint in balancer.endpoints
+            ]
+            await asyncio.gather(*checks)
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+
+    async def start(self):
+        if settings.HEALTH_CHECK_ENABLED:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+health_checker = HealthChecker()
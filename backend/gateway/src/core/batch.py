@@ -0,0 +1,124 @@
+import asyncio
+import json
+from urllib.parse import urlencode
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from src.config import SERVICE_MAP, Settings
+from src.core.proxy import forward_request
+from src.schemas.batch import SBatchItem, SBatchItemResult
+
+settings = Settings()
+
+
+def _query_string(query: dict) -> bytes:
+    params = {
+        key: str(value).lower() if isinstance(value, bool) else value
+        for key, value in query.items()
+    }
+    return urlencode(params).encode()
+
+
+def build_sub_request(parent: Request, item: SBatchItem) -> Request:
+    """Собрать запрос к сервису от имени уже аутентифицированного родителя"""
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    headers = {
+        key.lower(): value
+        for key, value in item.headers.items()
+        if key.lower()
+        not in ("authorization", "content-length", "host", "accept-encoding")
+    }
+    for name in ("accept", "accept-language"):
+        if name in parent.headers and name not in headers:
+            headers[name] = parent.headers[name]
+    # Тело ответа вкладывается в JSON batch-ответа, поэтому сжатие у апстрима
+    # не запрашивается: без заголовка httpx подставил бы свой gzip, deflate
+    headers["accept-encoding"] = "identity"
+    if body:
+        headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(body))
+
+    path = f"/{item.service}/{item.path.lstrip('/')}"
+    scope = {
+        "type": "http",
+        "http_version": parent.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": parent.scope.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": parent.scope.get("root_path", ""),
+        "query_string": _query_string(item.query),
+        "headers": [(key.encode(), value.encode()) for key, value in headers.items()],
+        "client": parent.scope.get("client"),
+        "server": parent.scope.get("server"),
+        # Пользователь, определенный auth_middleware для всего batch-запроса
+        "state": dict(parent.scope.get("state", {})),
+    }
+
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            return {"type": "http.disconnect"}
+        body_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def _response_body(response: Response) -> bytes:
+    if not isinstance(response, StreamingResponse):
+        return response.body
+    chunks = [chunk async for chunk in response.body_iterator]
+    if response.background is not None:
+        await response.background()
+    return b"".join(
+        chunk if isinstance(chunk, bytes) else chunk.encode() for chunk in chunks
+    )
+
+
+def _decode_body(headers: dict, body: bytes):
+    if not body:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode(errors="replace")
+
+
+async def dispatch_item(parent: Request, item: SBatchItem) -> SBatchItemResult:
+    if item.service not in SERVICE_MAP:
+        return SBatchItemResult(
+            status=404, headers={}, body={"detail": "Service not found"}
+        )
+    sub_request = build_sub_request(parent, item)
+    try:
+        response = await forward_request(
+            item.service, item.path.lstrip("/"), sub_request
+        )
+    except HTTPException as exc:
+        return SBatchItemResult(
+            status=exc.status_code, headers={}, body={"detail": exc.detail}
+        )
+    headers = {key.decode(): value.decode() for key, value in response.raw_headers}
+    body = await _response_body(response)
+    return SBatchItemResult(
+        status=response.status_code,
+        headers=headers,
+        body=_decode_body(headers, body),
+    )
+
+
+async def dispatch_batch(
+    parent: Request, items: list[SBatchItem]
+) -> list[SBatchItemResult]:
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run(item: SBatchItem) -> SBatchItemResult:
+        async with semaphore:
+            return await dispatch_item(parent, item)
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,200 @@
+import base64
+import dataclasses
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Mapping, Optional
+
+import redis.asyncio as redis
+from fastapi import Request, Response
+from src.config import RESPONSE_CACHE_ROUTES, Settings
+
+settings = Settings()
+
+# Заголовки запроса, от которых зависит тело ответа
+KEY_HEADERS = ("accept", "accept-encoding", "accept-language")
+
+_compiled_routes = [
+    (service, re.compile(pattern), ttl)
+    for service, pattern, ttl in RESPONSE_CACHE_ROUTES
+]
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    status_code: int
+    headers: dict
+    body: bytes
+    etag: str
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(
+            len(key) + len(value) for key, value in self.headers.items()
+        )
+
+    def to_json(self) -> str:
+        data = dataclasses.asdict(self)
+        data["body"] = base64.b64encode(self.body).decode()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "CacheEntry":
+        data = json.loads(raw)
+        data["body"] = base64.b64decode(data["body"])
+        return cls(**data)
+
+
+class MemoryResponseCache:
+    """LRU-кеш ответов в памяти процесса, ограниченный суммарным размером"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, tuple[float, CacheEntry]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._items.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        if entry.size > self.max_bytes:
+            return
+        self._remove(key)
+        self._items[key] = (time.time() + ttl, entry)
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._items))
+            self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1].size
+
+    async def close(self) -> None:
+        self._items.clear()
+        self.size = 0
+
+
+class RedisResponseCache:
+    """Кеш ответов в Redis, общий для всех реплик gateway"""
+
+    prefix = "gateway:response:"
+
+    def __init__(self, url: str):
+        self.redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        # Недоступный Redis не должен ломать проксирование: считаем это промахом
+        try:
+            raw = await self.redis.get(self.prefix + key)
+        except redis.RedisError:
+            return None
+        if raw is None:
+            return None
+        return CacheEntry.from_json(raw)
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        try:
+            await self.redis.set(self.prefix + key, entry.to_json(), ex=ttl)
+        except redis.RedisError:
+            pass
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class ResponseCacheManager:
+    def __init__(self):
+        self.backend: MemoryResponseCache | RedisResponseCache | None = None
+
+    async def init_cache(self):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        if settings.RESPONSE_CACHE_REDIS_URL:
+            self.backend = RedisResponseCache(settings.RESPONSE_CACHE_REDIS_URL)
+        else:
+            self.backend = MemoryResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+    async def close_cache(self):
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+
+
+response_cache = ResponseCacheManager()
+
+
+def route_cache_ttl(service: str, path: str) -> Optional[int]:
+    for route_service, pattern, ttl in _compiled_routes:
+        if route_service == service and pattern.fullmatch(path):
+            return ttl
+    return None
+
+
+def cache_key(service: str, path: str, request: Request) -> str:
+    query = sorted(request.query_params.multi_items())
+    headers = [(name, request.headers.get(name, "")) for name in KEY_HEADERS]
+    raw = json.dumps([service, path, query, headers])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _cache_control(headers: Mapping[str, str]) -> dict:
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def response_ttl(headers: Mapping[str, str], route_ttl: int) -> int:
+    """TTL записи с учетом Cache-Control апстрима; 0 — не кешировать"""
+    directives = _cache_control(headers)
+    if {"no-store", "no-cache", "private"} & directives.keys():
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return int(directives[name])
+    return route_ttl
+
+
+def make_entry(status_code: int, headers: Mapping[str, str], body: bytes):
+    etag = headers.get("etag") or f'W/"{hashlib.sha1(body).hexdigest()}"'
+    stored_headers = {
+        key: value for key, value in headers.items() if key.lower() != "etag"
+    }
+    return CacheEntry(
+        status_code=status_code, headers=stored_headers, body=body, etag=etag
+    )
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Для If-None-Match используется слабое сравнение
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def entry_response(entry: CacheEntry, request: Request, cache_status: str):
+    headers = dict(entry.headers)
+    headers["ETag"] = entry.etag
+    headers["X-Cache"] = cache_status
+    if _etag_matches(request, entry.etag):
+        headers.pop("content-length", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, status_code=entry.status_code, headers=headers)
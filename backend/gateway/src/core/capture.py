@@ -0,0 +1,197 @@
+import asyncio
+import json
+import random
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request
+from src.config import Settings
+from src.monitoring.middleware import route_labels
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+settings = Settings()
+
+# Заголовки с секретами и служебные заголовки gateway не записываются
+SECRET_HEADERS = {
+    "authorization",
+    "cookie",
+    "proxy-authorization",
+    "x-gateway-auth",
+    "x-user-id",
+    "x-user-ismanager",
+}
+
+# Ключи JSON-тела, формы и query-параметров, значения которых маскируются;
+# заголовки из SECRET_HEADERS маскируются и во вложенных запросах /batch
+SECRET_FIELDS = (
+    "password",
+    "token",
+    "secret",
+    "signature",
+    "credential",
+    "api_key",
+    "apikey",
+)
+
+
+def _is_secret(key: str) -> bool:
+    key = key.lower()
+    if key in SECRET_HEADERS:
+        return True
+    key = key.replace("-", "_")
+    return any(field in key for field in SECRET_FIELDS)
+
+
+def _mask_secrets(value):
+    if isinstance(value, dict):
+        return {
+            key: "***" if _is_secret(key) else _mask_secrets(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_mask_secrets(item) for item in value]
+    return value
+
+
+def _mask_pairs(pairs: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    return [(key, "***" if _is_secret(key) else value) for key, value in pairs]
+
+
+def capture_query(query: str) -> str:
+    if not query:
+        return ""
+    return urlencode(_mask_pairs(parse_qsl(query, keep_blank_values=True)))
+
+
+def capture_body(body: bytes, content_type: str) -> dict:
+    """Тело для записи: JSON и форма с маскированными секретами.
+    Остальные тела не записываются, остается только их размер"""
+    if not body:
+        return {}
+    try:
+        if content_type.startswith("application/json"):
+            return {"json": _mask_secrets(json.loads(body))}
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            pairs = parse_qsl(body.decode(), keep_blank_values=True)
+            return {"form": _mask_pairs(pairs)}
+    except ValueError:
+        pass
+    return {"body_size": len(body)}
+
+
+class TrafficRecorder:
+    """Фоновая запись захваченных запросов в JSONL-файл"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=10000)
+        self.task: asyncio.Task | None = None
+
+    def record(self, item: dict) -> None:
+        # Запись не должна тормозить запросы: при переполнении очереди теряем
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            pass
+
+    def _drain(self) -> list[dict]:
+        items = []
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    @staticmethod
+    def _write(items: list[dict]) -> None:
+        with open(settings.CAPTURE_FILE, "a", encoding="utf-8") as file:
+            for item in items:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    async def _run(self):
+        while True:
+            items = [await self.queue.get()] + self._drain()
+            await asyncio.to_thread(self._write, items)
+
+    async def start(self):
+        if settings.CAPTURE_ENABLED:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            self._write(self._drain())
+
+
+traffic_recorder = TrafficRecorder()
+
+
+class CaptureMiddleware:
+    """Запись метаданных и тела выборки запросов для src/tools/replay.py"""
+
+    def __init__(self, app: ASGIApp, sample_rate: float, max_body_size: int):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        chunks: list[bytes] = []
+        body_size = 0
+        status_code = 500
+        response_size = 0
+
+        async def receive_and_capture() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                body_size += len(body)
+                if body_size <= self.max_body_size:
+                    chunks.append(body)
+            return message
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        started_at = time.time()
+        start_time = time.monotonic()
+        try:
+            await self.app(scope, receive_and_capture, send_and_capture)
+        finally:
+            request = Request(scope)
+            service, endpoint = route_labels(request)
+            item = {
+                "ts": started_at,
+                "duration": time.monotonic() - start_time,
+                "method": request.method,
+                "path": request.url.path,
+                "query": capture_query(request.url.query),
+                "service": service,
+                "endpoint": endpoint,
+                "status_code": status_code,
+                "response_size": response_size,
+                "user_id": getattr(request.state, "user_id", None),
+                "user_is_manager": getattr(request.state, "user_is_manager", None),
+                "headers": {
+                    key: value
+                    for key, value in request.headers.items()
+                    if not _is_secret(key)
+                },
+            }
+            if body_size > self.max_body_size:
+                item["body_size"] = body_size
+            else:
+                content_type = request.headers.get("content-type", "")
+                item.update(capture_body(b"".join(chunks), content_type))
+            traffic_recorder.record(item)
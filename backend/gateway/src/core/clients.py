@@ -0,0 +1,61 @@
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException, status
+from src.config import SERVICE_MAP, SERVICE_TIMEOUTS, Settings
+from src.monitoring.pool_metrics import gateway_upstream_pool_max_connections
+
+settings = Settings()
+
+
+class UpstreamClients:
+    """Долгоживущие httpx-клиенты, по одному на каждый сервис из SERVICE_MAP"""
+
+    def __init__(self):
+        self.clients: dict[str, httpx.AsyncClient] = {}
+
+    def _build_client(self, service: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            SERVICE_TIMEOUTS[service],
+            connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+        )
+        gateway_upstream_pool_max_connections.labels(service=service).set(
+            settings.UPSTREAM_MAX_CONNECTIONS
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=settings.UPSTREAM_HTTP2,
+        )
+
+    async def init_clients(self):
+        for service, endpoints in SERVICE_MAP.items():
+            if endpoints:
+                self.clients[service] = self._build_client(service)
+
+    async def close_clients(self):
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+    def get(self, service: str) -> Optional[httpx.AsyncClient]:
+        return self.clients.get(service)
+
+
+upstream_clients = UpstreamClients()
+
+
+def get_upstream_client(service: str) -> httpx.AsyncClient:
+    client = upstream_clients.get(service)
+    if client is None:
+        # Клиент не был создан в lifespan (например, у сервиса не задан URL)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service unavailable",
+        )
+    return client
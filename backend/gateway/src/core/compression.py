@@ -0,0 +1,185 @@
+import zlib
+
+import brotli
+import zstandard
+from src.monitoring.compression_metrics import (
+    gateway_compressed_responses_total,
+    gateway_compression_bytes_saved_total,
+)
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Порядок предпочтения при одинаковом q
+PREFERRED_ENCODINGS = ("zstd", "br", "gzip")
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+class GzipCompressor:
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self.compressor.compress(data) + self.compressor.flush(mode)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self.compressor.process(data)
+        return out + (self.compressor.finish() if final else self.compressor.flush())
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = (
+            zstandard.COMPRESSOBJ_FLUSH_FINISH
+            if final
+            else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+        return self.compressor.compress(data) + self.compressor.flush(mode)
+
+
+COMPRESSORS = {
+    "gzip": GzipCompressor,
+    "br": BrotliCompressor,
+    "zstd": ZstdCompressor,
+}
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Выбрать кодировку по Accept-Encoding с учетом q-значений"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.strip().split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.strip().lower()] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in PREFERRED_ENCODINGS:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+    )
+
+
+class CompressionMiddleware:
+    """Сжатие ответов gateway; уже сжатые апстримом тела отдаются как есть"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.compressor = None
+        self.raw_size = 0
+        self.compressed_size = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self._send(message)
+            else:
+                # Заголовки отправляются вместе с первым куском тела
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send(start_message)
+                await self._send(message)
+                return
+
+            self.compressor = COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            del headers["Content-Length"]
+            # Тело изменилось — сильный ETag апстрима становится слабым
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if not more_body:
+                compressed = self._compress(body, final=True)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(start_message)
+                await self._send({**message, "body": compressed})
+                return
+            await self._send(start_message)
+
+        await self._send({**message, "body": self._compress(body, not more_body)})
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        compressed = self.compressor.compress(body, final)
+        self.raw_size += len(body)
+        self.compressed_size += len(compressed)
+        if final:
+            gateway_compressed_responses_total.labels(encoding=self.encoding).inc()
+            gateway_compression_bytes_saved_total.labels(encoding=self.encoding).inc(
+                max(0, self.raw_size - self.compressed_size)
+            )
+        return compressed
@@ -0,0 +1,31 @@
+import re
+import time
+from typing import Mapping
+
+from src.config import ROUTE_TIMEOUTS, SERVICE_TIMEOUTS
+
+# Абсолютный дедлайн запроса, unix time в секундах
+DEADLINE_HEADER = "X-Request-Deadline"
+
+_route_timeouts = [
+    (service, re.compile(pattern), timeout)
+    for service, pattern, timeout in ROUTE_TIMEOUTS
+]
+
+
+def route_timeout(service: str, path: str) -> float:
+    for route_service, pattern, timeout in _route_timeouts:
+        if route_service == service and pattern.fullmatch(path):
+            return timeout
+    return SERVICE_TIMEOUTS[service]
+
+
+def request_deadline(service: str, path: str) -> str:
+    return f"{time.time() + route_timeout(service, path):.3f}"
+
+
+def remaining_time(headers: Mapping[str, str]) -> float | None:
+    try:
+        return float(headers[DEADLINE_HEADER]) - time.time()
+    except (KeyError, ValueError):
+        return None
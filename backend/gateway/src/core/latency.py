@@ -0,0 +1,26 @@
+from collections import deque
+
+from src.config import SERVICE_MAP
+
+
+class LatencyWindow:
+    """Скользящее окно последних времен ответа апстрима для оценки перцентилей"""
+
+    def __init__(self, size: int = 512):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+upstream_latencies = {service: LatencyWindow() for service in SERVICE_MAP}
@@ -1,18 +1,65 @@
+import dataclasses
+from typing import AsyncIterator, Mapping
+
 import httpx
-from fastapi import Request, Response
-from src.config import SERVICE_MAP, Settings
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from src.config import Settings
+from src.core.cache import (
+    cache_key,
+    entry_response,
+    make_entry,
+    response_cache,
+    response_ttl,
+    route_cache_ttl,
+)
+from src.core.clients import get_upstream_client
+from src.core.deadline import DEADLINE_HEADER, request_deadline
+from src.core.singleflight import can_coalesce, coalesce_key, upstream_flights
+from src.core.upstream import send_with_policy
+from src.monitoring.cache_metrics import gateway_response_cache_requests_total
+from src.monitoring.proxy_metrics import gateway_coalesced_requests_total
+from starlette.background import BackgroundTask
 
 settings = Settings()
 
+# Заголовки, которые относятся к одному соединению и не проксируются (RFC 7230)
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+def strip_hop_by_hop_headers(headers: Mapping[str, str]) -> dict:
+    connection_tokens = {
+        token.strip().lower()
+        for token in headers.get("connection", "").split(",")
+        if token.strip()
+    }
+    return {
+        key: value
+        for key, value in headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS
+        and key.lower() not in connection_tokens
+    }
+
 
 def prepare_headers(request: Request) -> dict:
-    headers = dict(request.headers)
+    headers = strip_hop_by_hop_headers(request.headers)
 
     headers.pop("host", None)
-    headers.pop("Authorization", None)
-    headers.pop("X-User-Id", None)
-    headers.pop("X-User-Ismanager", None)
-    headers.pop("X-Gateway-Auth", None)
+    headers.pop("authorization", None)
+    headers.pop("x-user-id", None)
+    headers.pop("x-user-ismanager", None)
+    headers.pop("x-gateway-auth", None)
+    headers.pop(DEADLINE_HEADER.lower(), None)
 
     if hasattr(request.state, "user_id"):
         headers["X-User-Id"] = str(request.state.user_id)
@@ -23,17 +70,156 @@ def prepare_headers(request: Request) -> dict:
     return headers
 
 
+def _body_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail="Request body too large",
+    )
+
+
+async def _limited_stream(request: Request) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > settings.PROXY_MAX_BODY_SIZE:
+            raise _body_too_large()
+        yield chunk
+
+
+def _content_length(value: str | None) -> int | None:
+    """Значение Content-Length; None — заголовка нет или он некорректен"""
+    if value is None or not value.isascii() or not value.isdigit():
+        return None
+    return int(value)
+
+
+async def _request_content(request: Request) -> bytes | AsyncIterator[bytes]:
+    raw_length = request.headers.get("content-length")
+    if raw_length is None and "transfer-encoding" not in request.headers:
+        return b""
+    if raw_length is not None:
+        content_length = _content_length(raw_length)
+        if content_length is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid Content-Length",
+            )
+        if content_length > settings.PROXY_MAX_BODY_SIZE:
+            raise _body_too_large()
+        if content_length <= settings.PROXY_BUFFER_THRESHOLD:
+            return await request.body()
+    if not settings.PROXY_STREAMING:
+        return b"".join([chunk async for chunk in _limited_stream(request)])
+    return _limited_stream(request)
+
+
+def _should_buffer_response(headers: Mapping[str, str]) -> bool:
+    if not settings.PROXY_STREAMING:
+        return True
+    # Ответ без корректной длины передается потоком
+    content_length = _content_length(headers.get("content-length"))
+    return (
+        content_length is not None and content_length <= settings.PROXY_BUFFER_THRESHOLD
+    )
+
+
+@dataclasses.dataclass
+class BufferedResponse:
+    status_code: int
+    headers: dict
+    body: bytes
+
+
+async def _read_raw(resp: httpx.Response) -> bytes:
+    try:
+        return b"".join([chunk async for chunk in resp.aiter_raw()])
+    finally:
+        await resp.aclose()
+
+
+async def _fetch_buffered(
+    service: str, path: str, client: httpx.AsyncClient, upstream_request: httpx.Request
+) -> BufferedResponse:
+    resp = await send_with_policy(service, path, client, upstream_request)
+    return BufferedResponse(
+        status_code=resp.status_code,
+        headers=strip_hop_by_hop_headers(resp.headers),
+        body=await _read_raw(resp),
+    )
+
+
 async def forward_request(service: str, path: str, request: Request):
-    url = f"{SERVICE_MAP[service]}/api/{path}"
+    public_ttl = route_cache_ttl(service, path)
+    cache_ttl = None
+    if request.method == "GET" and response_cache.backend is not None:
+        cache_ttl = public_ttl
+    if cache_ttl is not None:
+        key = cache_key(service, path, request)
+        entry = await response_cache.backend.get(key)
+        if entry is not None:
+            gateway_response_cache_requests_total.labels(
+                service=service, result="hit"
+            ).inc()
+            return entry_response(entry, request, "HIT")
+        gateway_response_cache_requests_total.labels(
+            service=service, result="miss"
+        ).inc()
+
+    client = get_upstream_client(service)
     headers = prepare_headers(request)
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            params=request.query_params,
-            content=await request.body(),
+    headers[DEADLINE_HEADER] = request_deadline(service, path)
+    upstream_request = client.build_request(
+        method=request.method,
+        url=f"/api/{path}",
+        headers=headers,
+        params=request.query_params,
+        content=await _request_content(request),
+    )
+
+    coalesce = can_coalesce(service, path, request)
+    if cache_ttl is None and not coalesce:
+        resp = await send_with_policy(service, path, client, upstream_request)
+        response_headers = strip_hop_by_hop_headers(resp.headers)
+        # Тело отдается как есть (aiter_raw), без распаковки content-encoding
+        if _should_buffer_response(resp.headers):
+            return Response(
+                content=await _read_raw(resp),
+                status_code=resp.status_code,
+                headers=response_headers,
+            )
+        return StreamingResponse(
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers=response_headers,
+            background=BackgroundTask(resp.aclose),
         )
+
+    shared = False
+    if coalesce:
+        # Для публичных маршрутов ответ не зависит от пользователя
+        flight_key = coalesce_key(service, path, request, per_user=public_ttl is None)
+        upstream, shared = await upstream_flights.do(
+            flight_key, lambda: _fetch_buffered(service, path, client, upstream_request)
+        )
+        if shared:
+            gateway_coalesced_requests_total.labels(service=service).inc()
+    else:
+        upstream = await _fetch_buffered(service, path, client, upstream_request)
+
+    if cache_ttl is not None:
+        ttl = response_ttl(upstream.headers, cache_ttl)
+        if (
+            upstream.status_code == status.HTTP_200_OK
+            and ttl > 0
+            and len(upstream.body) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES
+        ):
+            entry = make_entry(upstream.status_code, upstream.headers, upstream.body)
+            if not shared:
+                await response_cache.backend.set(key, entry, ttl)
+            return entry_response(entry, request, "MISS")
+
     return Response(
-        content=resp.content, status_code=resp.status_code, headers=resp.headers
+        content=upstream.body,
+        status_code=upstream.status_code,
+        headers=upstream.headers,
     )
@@ -0,0 +1,138 @@
+import time
+from enum import StrEnum
+
+from src.config import SERVICE_MAP, Settings
+
+settings = Settings()
+
+
+class BreakerState(StrEnum):
+    closed = "closed"
+    half_open = "half_open"
+    open = "open"
+
+
+class AIMDLimiter:
+    """Лимит одновременных запросов: +1 за окно успешных ответов, *backoff при перегрузке.
+
+    Перегрузкой считается ошибка апстрима или ответ медленнее latency_target.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool) -> None:
+        self.in_flight -= 1
+        if failed or latency > self.latency_target:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def cancel(self) -> None:
+        """Освободить слот отмененного запроса без замера задержки"""
+        self.in_flight -= 1
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.closed
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == BreakerState.closed:
+            return True
+        if self.state == BreakerState.open:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = BreakerState.half_open
+        # В полуоткрытом состоянии пропускаем один пробный запрос
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record(self, failed: bool, probe: bool = False) -> None:
+        if probe:
+            self.probe_in_flight = False
+        if self.state != BreakerState.closed:
+            # Ответы запросов, отправленных до размыкания, состояние не меняют:
+            # закрыть или снова разомкнуть breaker может только пробный запрос
+            if not probe:
+                return
+            if failed:
+                self._open()
+            else:
+                self.failures = 0
+                self.state = BreakerState.closed
+            return
+        if not failed:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = BreakerState.open
+        self.opened_at = time.monotonic()
+
+
+class UpstreamGuard:
+    def __init__(self):
+        self.limiter = AIMDLimiter(
+            initial=settings.UPSTREAM_CONCURRENCY_INITIAL,
+            min_limit=settings.UPSTREAM_CONCURRENCY_MIN,
+            max_limit=settings.UPSTREAM_CONCURRENCY_MAX,
+            latency_target=settings.UPSTREAM_LATENCY_TARGET,
+            backoff=settings.UPSTREAM_CONCURRENCY_BACKOFF,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_TIMEOUT,
+        )
+
+    def acquire(self) -> tuple[str | None, bool]:
+        """Занять слот; вернуть причину отказа или None и признак пробного запроса"""
+        if not self.breaker.allow():
+            return "breaker_open", False
+        probe = self.breaker.state == BreakerState.half_open
+        if not self.limiter.try_acquire():
+            # Слот не получен — пробный запрос breaker'а не состоялся
+            if probe:
+                self.breaker.probe_in_flight = False
+            return "over_capacity", False
+        return None, probe
+
+    def release(self, latency: float, failed: bool, probe: bool = False) -> None:
+        self.limiter.release(latency, failed)
+        self.breaker.record(failed, probe)
+
+    def cancel(self, probe: bool = False) -> None:
+        self.limiter.cancel()
+        if probe:
+            self.breaker.probe_in_flight = False
+
+
+upstream_guards = {service: UpstreamGuard() for service in SERVICE_MAP}
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from fastapi import Request
+from src.config import COALESCE_ROUTES, Settings
+from src.core.cache import KEY_HEADERS
+
+settings = Settings()
+
+T = TypeVar("T")
+
+COALESCE_METHODS = {"GET", "HEAD"}
+
+_coalesce_routes = [
+    (service, re.compile(pattern)) for service, pattern in COALESCE_ROUTES
+]
+
+
+class SingleFlight(Generic[T]):
+    """Одновременные вызовы с одинаковым ключом ждут один общий результат"""
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        task = self._tasks.get(key)
+        shared = task is not None
+        if task is None:
+            # Отдельная задача: отмена запроса-инициатора не затрагивает остальных
+            task = asyncio.create_task(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+upstream_flights = SingleFlight()
+
+
+def can_coalesce(service: str, path: str, request: Request) -> bool:
+    return (
+        settings.REQUEST_COALESCING_ENABLED
+        and request.method in COALESCE_METHODS
+        and "content-length" not in request.headers
+        and "transfer-encoding" not in request.headers
+        and any(
+            route_service == service and pattern.fullmatch(path)
+            for route_service, pattern in _coalesce_routes
+        )
+    )
+
+
+def coalesce_key(service: str, path: str, request: Request, per_user: bool) -> str:
+    query = sorted(request.query_params.multi_items())
+    headers = [(name, request.headers.get(name, "")) for name in KEY_HEADERS]
+    user = None
+    if per_user:
+        user = [
+            getattr(request.state, "user_id", None),
+            getattr(request.state, "user_is_manager", None),
+        ]
+    raw = json.dumps([request.method, service, path, query, headers, user])
+    return hashlib.sha256(raw.encode()).hexdigest()
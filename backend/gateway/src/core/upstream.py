@@ -0,0 +1,297 @@
+import asyncio
+import random
+import re
+import time
+
+import httpx
+from fastapi import HTTPException, status
+from src.config import HEDGE_ROUTES, Settings
+from src.core.balancer import upstream_balancers
+from src.core.deadline import remaining_time
+from src.core.latency import upstream_latencies
+from src.core.resilience import upstream_guards
+from src.monitoring.pool_metrics import (
+    gateway_upstream_pool_connections_in_use,
+    gateway_upstream_pool_connections_opened_total,
+    gateway_upstream_pool_requests_total,
+)
+from src.monitoring.proxy_metrics import (
+    gateway_upstream_hedged_total,
+    gateway_upstream_rejected_total,
+    gateway_upstream_retries_total,
+)
+from src.monitoring.upstream_metrics import (
+    gateway_upstream_in_flight_requests,
+    gateway_upstream_phase_duration_seconds,
+)
+
+settings = Settings()
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_hedge_routes = [(service, re.compile(pattern)) for service, pattern in HEDGE_ROUTES]
+
+
+class UpstreamConnectError(HTTPException):
+    """Соединение с инстансом не установлено — запрос до апстрима не дошел"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_502_BAD_GATEWAY, detail="Upstream unavailable"
+        )
+
+
+class PhaseTracer:
+    """Разбивка времени запроса к апстриму на фазы по trace-событиям httpcore.
+
+    queue — ожидание соединения в пуле, connect — установка нового соединения,
+    wait — от отправки запроса до заголовков ответа, transfer — чтение тела.
+    По тем же событиям считаются новые и переиспользованные соединения пула.
+    """
+
+    # Событие httpcore (без префикса http11/http2/connection) -> начинающаяся фаза
+    transitions = {
+        "connect_tcp.started": "connect",
+        "send_request_headers.started": "wait",
+        "receive_response_headers.complete": "transfer",
+        "response_closed.started": None,
+    }
+
+    def __init__(self, service: str):
+        self.service = service
+        self.phase: str | None = "queue"
+        self.phase_started = time.monotonic()
+        self.new_connection = False
+        self.in_use = False
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        event = event_name.partition(".")[2]
+        self._count_connection(event)
+        if event not in self.transitions or self.phase is None:
+            return
+        now = time.monotonic()
+        gateway_upstream_phase_duration_seconds.labels(
+            service=self.service, phase=self.phase
+        ).observe(now - self.phase_started)
+        self.phase = self.transitions[event]
+        self.phase_started = now
+
+    def _count_connection(self, event: str) -> None:
+        if event == "connect_tcp.complete":
+            self.new_connection = True
+            gateway_upstream_pool_connections_opened_total.labels(
+                service=self.service
+            ).inc()
+        elif event == "send_request_headers.started" and not self.in_use:
+            self.in_use = True
+            gateway_upstream_pool_requests_total.labels(
+                service=self.service,
+                connection="new" if self.new_connection else "reused",
+            ).inc()
+            gateway_upstream_pool_connections_in_use.labels(service=self.service).inc()
+        elif event in ("response_closed.complete", "response_closed.failed"):
+            if not self.in_use:
+                return
+            # Соединение вернулось в пул или закрыто
+            self.in_use = False
+            gateway_upstream_pool_connections_in_use.labels(service=self.service).dec()
+
+
+def _apply_deadline(
+    service: str, client: httpx.AsyncClient, upstream_request: httpx.Request
+) -> None:
+    # Таймауты запроса не длиннее оставшегося до дедлайна времени
+    remaining = remaining_time(upstream_request.headers)
+    if remaining is None:
+        return
+    if remaining <= 0:
+        gateway_upstream_rejected_total.labels(
+            service=service, reason="deadline_exceeded"
+        ).inc()
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Deadline exceeded"
+        )
+    timeout = upstream_request.extensions.get("timeout") or client.timeout.as_dict()
+    upstream_request.extensions["timeout"] = {
+        name: remaining if value is None else min(value, remaining)
+        for name, value in timeout.items()
+    }
+
+
+def _bind_endpoint(upstream_request: httpx.Request, base_url: str) -> None:
+    # Запрос собирается с относительным URL, инстанс выбирается перед отправкой
+    url = httpx.URL(base_url + upstream_request.url.raw_path.decode("ascii"))
+    upstream_request.url = url
+    upstream_request.headers["Host"] = url.netloc.decode("ascii")
+
+
+async def send_upstream(
+    service: str, client: httpx.AsyncClient, upstream_request: httpx.Request
+) -> httpx.Response:
+    """Отправить запрос на один из инстансов апстрима через лимитер и breaker.
+
+    Время ответа и ошибки (сетевые и 5xx) подстраивают лимит, состояние breaker'а
+    и пассивное исключение инстанса из балансировки.
+    """
+    _apply_deadline(service, client, upstream_request)
+
+    guard = upstream_guards[service]
+    rejected_reason, probe = guard.acquire()
+    if rejected_reason is not None:
+        gateway_upstream_rejected_total.labels(
+            service=service, reason=rejected_reason
+        ).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service unavailable",
+            headers={"Retry-After": "1"},
+        )
+
+    balancer = upstream_balancers[service]
+    endpoint = balancer.pick()
+    _bind_endpoint(upstream_request, endpoint.url)
+    upstream_request.extensions["trace"] = PhaseTracer(service)
+
+    endpoint.outstanding += 1
+    in_flight = gateway_upstream_in_flight_requests.labels(service=service)
+    in_flight.inc()
+    start_time = time.monotonic()
+    failed = False
+    cancelled = False
+    try:
+        resp = await client.send(upstream_request, stream=True)
+        failed = resp.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR
+        if not failed:
+            upstream_latencies[service].observe(time.monotonic() - start_time)
+        return resp
+    except httpx.TimeoutException:
+        failed = True
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Upstream timeout"
+        )
+    except httpx.ConnectError:
+        failed = True
+        raise UpstreamConnectError()
+    except httpx.TransportError:
+        failed = True
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY, detail="Upstream unavailable"
+        )
+    except asyncio.CancelledError:
+        # Отмененный запрос (например, проигравший хедж) ничего не говорит
+        # о состоянии апстрима: слот освобождается без замера
+        cancelled = True
+        raise
+    finally:
+        endpoint.outstanding -= 1
+        in_flight.dec()
+        if cancelled:
+            guard.cancel(probe)
+        else:
+            balancer.record(endpoint, failed)
+            guard.release(time.monotonic() - start_time, failed, probe)
+
+
+def _clone_request(upstream_request: httpx.Request) -> httpx.Request:
+    return httpx.Request(
+        upstream_request.method,
+        upstream_request.url,
+        headers=upstream_request.headers,
+        content=upstream_request.content,
+    )
+
+
+def _close_when_done(task: asyncio.Task) -> None:
+    # Ответ проигравшего запроса может прийти уже после отмены — закрываем его
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+def hedge_delay(service: str) -> float | None:
+    latencies = upstream_latencies[service]
+    if len(latencies) < settings.HEDGE_MIN_SAMPLES:
+        return None
+    return max(
+        settings.HEDGE_MIN_DELAY, latencies.percentile(settings.HEDGE_PERCENTILE)
+    )
+
+
+async def _hedged_send(
+    service: str,
+    client: httpx.AsyncClient,
+    upstream_request: httpx.Request,
+    delay: float,
+) -> httpx.Response:
+    primary = asyncio.create_task(send_upstream(service, client, upstream_request))
+    pending = {primary}
+    first_error: BaseException | None = None
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+
+        gateway_upstream_hedged_total.labels(service=service).inc()
+        hedge = asyncio.create_task(
+            send_upstream(service, client, _clone_request(upstream_request))
+        )
+        pending.add(hedge)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                # Обе попытки могли завершиться одновременно: ответ второй
+                # закрывается, иначе его соединение не вернется в пул
+                for task in succeeded[1:]:
+                    _close_when_done(task)
+                return succeeded[0].result()
+            for task in done:
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        # Отмена вызывающего тоже попадает сюда: незавершенные попытки не утекают
+        for task in pending:
+            task.add_done_callback(_close_when_done)
+            task.cancel()
+
+
+def _should_hedge(service: str, path: str, method: str) -> bool:
+    if not settings.HEDGING_ENABLED or method != "GET":
+        return False
+    return any(
+        route_service == service and pattern.fullmatch(path)
+        for route_service, pattern in _hedge_routes
+    )
+
+
+def _backoff(attempt: int) -> float:
+    # Экспоненциальная задержка с полным джиттером
+    ceiling = min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2**attempt)
+    return random.uniform(0, ceiling)
+
+
+async def send_with_policy(
+    service: str, path: str, client: httpx.AsyncClient, upstream_request: httpx.Request
+) -> httpx.Response:
+    """Отправка с повторами при ошибке соединения и хеджированием медленных GET"""
+    delay = None
+    if _should_hedge(service, path, upstream_request.method):
+        delay = hedge_delay(service)
+
+    max_attempts = 1
+    if upstream_request.method in IDEMPOTENT_METHODS:
+        max_attempts = max(1, settings.RETRY_MAX_ATTEMPTS)
+
+    attempt = 0
+    while True:
+        try:
+            if delay is not None:
+                return await _hedged_send(service, client, upstream_request, delay)
+            return await send_upstream(service, client, upstream_request)
+        except UpstreamConnectError:
+            attempt += 1
+            if attempt >= max_attempts:
+                raise
+            gateway_upstream_retries_total.labels(service=service).inc()
+            await asyncio.sleep(_backoff(attempt))
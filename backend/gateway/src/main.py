@@ -1,10 +1,54 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
-from src.auth.service import extract_bearer_token, get_user_by_token
+from prometheus_client import start_http_server
+from src.auth.service import extract_bearer_token, get_user_by_token, revoke_token
+from src.config import Settings
+from src.core.balancer import health_checker
+from src.core.cache import response_cache
+from src.core.capture import CaptureMiddleware, traffic_recorder
+from src.core.clients import upstream_clients
+from src.core.compression import CompressionMiddleware
+from src.monitoring import balancer_metrics, resilience_metrics  # noqa: F401
+from src.monitoring.auth_metrics import gateway_jwt_verification_duration_seconds
+from src.monitoring.common import registry
+from src.monitoring.middleware import MetricsMiddleware
+from src.routers.batch import router as batch_router
 from src.routers.proxy import router as proxy_router
 
-app = FastAPI()
+settings = Settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Метрики не публикуются через edge-порт вместе с проксируемым API
+    app.state.metrics_server, _ = start_http_server(
+        settings.METRICS_PORT, registry=registry
+    )
+    await upstream_clients.init_clients()
+    await response_cache.init_cache()
+    await health_checker.start()
+    await traffic_recorder.start()
+    yield
+    await traffic_recorder.stop()
+    await health_checker.stop()
+    await response_cache.close_cache()
+    await upstream_clients.close_clients()
+    app.state.metrics_server.shutdown()
+    app.state.metrics_server.server_close()
+
+
+app = FastAPI(lifespan=lifespan)
 
+# Добавляется первым, чтобы сжимать ответ приложения целиком, а не поток после других middleware
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE
+    )
+
+
+app.include_router(batch_router)
 app.include_router(proxy_router)
 
 
@@ -15,7 +59,8 @@ async def auth_middleware(request: Request, call_next):
 
     if token:
         try:
-            user = await get_user_by_token(token)
+            with gateway_jwt_verification_duration_seconds.time():
+                user = await get_user_by_token(token)
         except HTTPException as exc:
             return JSONResponse(
                 status_code=exc.status_code,
@@ -25,4 +70,24 @@ async def auth_middleware(request: Request, call_next):
         request.state.user_id = user.id
         request.state.user_is_manager = user.is_manager
 
-    return await call_next(request)
+    response = await call_next(request)
+    # auth отозвал токен, но подпись и exp остались верными: кеш должен
+    # перестать его принимать
+    if (
+        token
+        and request.method == "POST"
+        and request.url.path == settings.LOGOUT_PATH
+        and response.status_code == 200
+    ):
+        revoke_token(token)
+    return response
+
+
+app.middleware("http")(MetricsMiddleware(app))
+
+if settings.CAPTURE_ENABLED:
+    app.add_middleware(
+        CaptureMiddleware,
+        sample_rate=settings.CAPTURE_SAMPLE_RATE,
+        max_body_size=settings.CAPTURE_MAX_BODY_SIZE,
+    )
@@ -0,0 +1,31 @@
+from prometheus_client import Counter, Histogram
+
+from .common import registry
+
+gateway_http_requests_total = Counter(
+    "gateway_http_requests_total",
+    "Total number of HTTP requests in gateway",
+    ["method", "service", "endpoint", "status_code"],
+    registry=registry,
+)
+
+gateway_http_request_duration_seconds = Histogram(
+    "gateway_http_request_duration_seconds",
+    "HTTP request duration in seconds in gateway",
+    ["method", "service", "endpoint"],
+    registry=registry,
+)
+
+gateway_http_errors_4xx_total = Counter(
+    "gateway_http_errors_4xx_total",
+    "Total number of 4xx HTTP errors in gateway",
+    ["service", "endpoint", "status_code"],
+    registry=registry,
+)
+
+gateway_http_errors_5xx_total = Counter(
+    "gateway_http_errors_5xx_total",
+    "Total number of 5xx HTTP errors in gateway",
+    ["service", "endpoint", "status_code"],
+    registry=registry,
+)
@@ -0,0 +1,23 @@
+from prometheus_client import Counter, Histogram
+
+from .common import registry
+
+gateway_token_cache_hits_total = Counter(
+    "gateway_token_cache_hits_total",
+    "Total number of token verifications served from cache",
+    ["result"],
+    registry=registry,
+)
+
+gateway_token_cache_misses_total = Counter(
+    "gateway_token_cache_misses_total",
+    "Total number of token verifications that required JWT decoding",
+    registry=registry,
+)
+
+gateway_jwt_verification_duration_seconds = Histogram(
+    "gateway_jwt_verification_duration_seconds",
+    "Time spent verifying bearer tokens in gateway",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+    registry=registry,
+)
@@ -0,0 +1,34 @@
+import time
+
+from prometheus_client.core import GaugeMetricFamily
+
+from src.core.balancer import upstream_balancers
+
+from .common import registry
+
+
+class UpstreamEndpointCollector:
+    """Состояние инстансов каждого апстрима"""
+
+    def collect(self):
+        available = GaugeMetricFamily(
+            "gateway_upstream_endpoint_available",
+            "Whether upstream endpoint is healthy and not ejected (1 - available)",
+            labels=["service", "endpoint"],
+        )
+        outstanding = GaugeMetricFamily(
+            "gateway_upstream_endpoint_outstanding_requests",
+            "Number of requests currently sent to upstream endpoint",
+            labels=["service", "endpoint"],
+        )
+        now = time.monotonic()
+        for service, balancer in upstream_balancers.items():
+            for endpoint in balancer.endpoints:
+                labels = [service, endpoint.url]
+                available.add_metric(labels, int(endpoint.is_available(now)))
+                outstanding.add_metric(labels, endpoint.outstanding)
+        yield available
+        yield outstanding
+
+
+registry.register(UpstreamEndpointCollector())
@@ -0,0 +1,10 @@
+from prometheus_client import Counter
+
+from .common import registry
+
+gateway_response_cache_requests_total = Counter(
+    "gateway_response_cache_requests_total",
+    "Total number of cacheable GET requests by cache result",
+    ["service", "result"],
+    registry=registry,
+)
@@ -0,0 +1,17 @@
+from prometheus_client import Counter
+
+from .common import registry
+
+gateway_compressed_responses_total = Counter(
+    "gateway_compressed_responses_total",
+    "Total number of responses compressed by gateway",
+    ["encoding"],
+    registry=registry,
+)
+
+gateway_compression_bytes_saved_total = Counter(
+    "gateway_compression_bytes_saved_total",
+    "Total number of response bytes saved by gateway compression",
+    ["encoding"],
+    registry=registry,
+)
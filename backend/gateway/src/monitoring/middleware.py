@@ -0,0 +1,88 @@
+import re
+import time
+from typing import Callable
+
+from fastapi import Request, Response
+from src.config import METRICS_ROUTES, SERVICE_MAP
+
+from .api_metrics import (
+    gateway_http_errors_4xx_total,
+    gateway_http_errors_5xx_total,
+    gateway_http_request_duration_seconds,
+    gateway_http_requests_total,
+)
+
+# Метка endpoint берется только из известных шаблонов, чтобы произвольные
+# пути не плодили новые серии; завершающий слэш не учитывается
+_metrics_routes = [
+    (
+        service,
+        re.compile(re.escape(template.rstrip("/")).replace(r"\{id\}", r"\d+") + "/?"),
+        "/" + template,
+    )
+    for service, template in METRICS_ROUTES
+]
+
+
+def route_labels(request: Request) -> tuple[str, str]:
+    route = request.scope.get("route")
+    if route is None or not hasattr(route, "path"):
+        return "gateway", "/unknown"
+
+    path_params = request.scope.get("path_params", {})
+    if "service" not in path_params:
+        return "gateway", route.path
+
+    service = path_params["service"]
+    if service not in SERVICE_MAP:
+        return "unknown", route.path
+    path = path_params.get("path", "")
+    for route_service, pattern, template in _metrics_routes:
+        if route_service == service and pattern.fullmatch(path):
+            return service, template
+    return service, "other"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
+        start_time = time.time()
+
+        response = await call_next(request)
+
+        duration = time.time() - start_time
+
+        method = request.method
+        service, endpoint = route_labels(request)
+        status_code = str(response.status_code)
+
+        gateway_http_requests_total.labels(
+            method=method,
+            service=service,
+            endpoint=endpoint,
+            status_code=status_code,
+        ).inc()
+
+        gateway_http_request_duration_seconds.labels(
+            method=method,
+            service=service,
+            endpoint=endpoint,
+        ).observe(duration)
+
+        status = response.status_code
+        if 400 <= status < 500:
+            gateway_http_errors_4xx_total.labels(
+                service=service,
+                endpoint=endpoint,
+                status_code=status_code,
+            ).inc()
+        elif status >= 500:
+            gateway_http_errors_5xx_total.labels(
+                service=service,
+                endpoint=endpoint,
+                status_code=status_code,
+            ).inc()
+
+        return response
@@ -0,0 +1,35 @@
+from prometheus_client import Counter, Gauge
+
+from .common import registry
+
+# httpx не отдает состояние пула публично: соединения считаются по trace-событиям
+# httpcore в PhaseTracer (src/core/upstream.py)
+
+gateway_upstream_pool_connections_opened_total = Counter(
+    "gateway_upstream_pool_connections_opened_total",
+    "Total number of new connections opened to upstream service",
+    ["service"],
+    registry=registry,
+)
+
+gateway_upstream_pool_requests_total = Counter(
+    "gateway_upstream_pool_requests_total",
+    "Total number of upstream requests by connection: new or reused from the pool",
+    ["service", "connection"],
+    registry=registry,
+)
+
+gateway_upstream_pool_connections_in_use = Gauge(
+    "gateway_upstream_pool_connections_in_use",
+    "Number of pooled connections currently carrying a request "
+    "(HTTP/2 streams are counted separately)",
+    ["service"],
+    registry=registry,
+)
+
+gateway_upstream_pool_max_connections = Gauge(
+    "gateway_upstream_pool_max_connections",
+    "Configured connection limit of upstream service pool",
+    ["service"],
+    registry=registry,
+)
@@ -0,0 +1,31 @@
+from prometheus_client import Counter
+
+from .common import registry
+
+gateway_coalesced_requests_total = Counter(
+    "gateway_coalesced_requests_total",
+    "Total number of requests served by another in-flight identical request",
+    ["service"],
+    registry=registry,
+)
+
+gateway_upstream_rejected_total = Counter(
+    "gateway_upstream_rejected_total",
+    "Total number of requests rejected before reaching upstream service",
+    ["service", "reason"],
+    registry=registry,
+)
+
+gateway_upstream_retries_total = Counter(
+    "gateway_upstream_retries_total",
+    "Total number of retried upstream requests after connection errors",
+    ["service"],
+    registry=registry,
+)
+
+gateway_upstream_hedged_total = Counter(
+    "gateway_upstream_hedged_total",
+    "Total number of hedged duplicate upstream requests",
+    ["service"],
+    registry=registry,
+)
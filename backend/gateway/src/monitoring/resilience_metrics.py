@@ -0,0 +1,38 @@
+from prometheus_client.core import GaugeMetricFamily
+
+from src.core.resilience import BreakerState, upstream_guards
+
+from .common import registry
+
+BREAKER_STATE_VALUES = {
+    BreakerState.closed: 0,
+    BreakerState.half_open: 1,
+    BreakerState.open: 2,
+}
+
+
+class UpstreamGuardCollector:
+    """Текущие лимиты конкурентности и состояние breaker'ов апстримов"""
+
+    def collect(self):
+        limit = GaugeMetricFamily(
+            "gateway_upstream_concurrency_limit",
+            "Current adaptive concurrency limit of upstream service",
+            labels=["service"],
+        )
+        breaker_state = GaugeMetricFamily(
+            "gateway_upstream_breaker_state",
+            "Circuit breaker state of upstream service "
+            "(0 - closed, 1 - half-open, 2 - open)",
+            labels=["service"],
+        )
+        for service, guard in upstream_guards.items():
+            limit.add_metric([service], int(guard.limiter.limit))
+            breaker_state.add_metric(
+                [service], BREAKER_STATE_VALUES[guard.breaker.state]
+            )
+        yield limit
+        yield breaker_state
+
+
+registry.register(UpstreamGuardCollector())
@@ -0,0 +1,18 @@
+from prometheus_client import Gauge, Histogram
+
+from .common import registry
+
+gateway_upstream_phase_duration_seconds = Histogram(
+    "gateway_upstream_phase_duration_seconds",
+    "Upstream request duration by phase: queue, connect, wait, transfer",
+    ["service", "phase"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=registry,
+)
+
+gateway_upstream_in_flight_requests = Gauge(
+    "gateway_upstream_in_flight_requests",
+    "Number of requests currently sent to upstream service",
+    ["service"],
+    registry=registry,
+)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Request
+from src.core.batch import dispatch_batch
+from src.schemas.batch import SBatchRequest, SBatchResponse
+
+router = APIRouter()
+
+
+@router.post("/batch", response_model=SBatchResponse)
+async def batch(payload: SBatchRequest, request: Request):
+    responses = await dispatch_batch(request, payload.requests)
+    return SBatchResponse(responses=responses)
@@ -0,0 +1,31 @@
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field
+from src.config import Settings
+
+settings = Settings()
+
+
+class SBatchItem(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    service: str
+    path: str
+    query: dict[str, str | int | float | bool] = {}
+    headers: dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class SBatchRequest(BaseModel):
+    requests: list[SBatchItem] = Field(
+        ..., min_length=1, max_length=settings.BATCH_MAX_SIZE
+    )
+
+
+class SBatchItemResult(BaseModel):
+    status: int
+    headers: dict[str, str]
+    body: Optional[Any] = None
+
+
+class SBatchResponse(BaseModel):
+    responses: list[SBatchItemResult]
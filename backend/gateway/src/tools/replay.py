@@ -0,0 +1,156 @@
+"""Воспроизведение захваченного трафика (CAPTURE_ENABLED) против gateway.
+
+Запуск из backend/gateway:
+
+    python -m src.tools.replay capture.jsonl --target http://localhost:8000 --speed 2
+
+Запросы отправляются с исходными интервалами, ускоренными в --speed раз.
+Токены пользователей выпускаются заново ключом SECRET_KEY/ALGORITHM из окружения.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+import dotenv
+import httpx
+from jose import jwt
+
+dotenv.load_dotenv()
+
+
+def load_capture(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        items = [json.loads(line) for line in file if line.strip()]
+    return sorted(items, key=lambda item: item["ts"])
+
+
+class TokenIssuer:
+    def __init__(self, secret_key: str | None, algorithm: str | None):
+        self.secret_key = secret_key
+        self.algorithm = algorithm or "HS256"
+        self.tokens: dict[tuple, str] = {}
+
+    def headers(self, item: dict) -> dict:
+        if item.get("user_id") is None or not self.secret_key:
+            return {}
+        user = (item["user_id"], item.get("user_is_manager"))
+        if user not in self.tokens:
+            payload = {
+                "sub": str(item["user_id"]),
+                "isman": item.get("user_is_manager"),
+                "exp": int(time.time()) + 24 * 3600,
+            }
+            self.tokens[user] = jwt.encode(
+                payload, self.secret_key, algorithm=self.algorithm
+            )
+        return {"Authorization": f"Bearer {self.tokens[user]}"}
+
+
+def build_request(item: dict, issuer: TokenIssuer) -> dict:
+    headers = {
+        key: value
+        for key, value in item.get("headers", {}).items()
+        if key not in ("host", "content-length")
+    }
+    headers.update(issuer.headers(item))
+    url = item["path"] + (f"?{item['query']}" if item.get("query") else "")
+    request = {"method": item["method"], "url": url, "headers": headers}
+    if "json" in item:
+        request["content"] = json.dumps(item["json"]).encode()
+    elif "form" in item:
+        request["content"] = urlencode([tuple(pair) for pair in item["form"]]).encode()
+    elif "body_b64" in item:
+        request["content"] = base64.b64decode(item["body_b64"])
+    return request
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, math.ceil(q * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def replay(
+    items: list[dict],
+    target: str,
+    speed: float,
+    concurrency: int,
+    issuer: TokenIssuer,
+) -> tuple[dict, float]:
+    results: dict[str, list[tuple[float, int | None]]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, limits=limits) as client:
+
+        async def send(item: dict, delay: float):
+            await asyncio.sleep(delay)
+            route = f"{item['method']} {item['service']} {item['endpoint']}"
+            async with semaphore:
+                start_time = time.monotonic()
+                try:
+                    resp = await client.request(**build_request(item, issuer))
+                    status_code = resp.status_code
+                except httpx.HTTPError:
+                    status_code = None
+                results[route].append((time.monotonic() - start_time, status_code))
+
+        first_ts = items[0]["ts"]
+        start_time = time.monotonic()
+        await asyncio.gather(
+            *[send(item, (item["ts"] - first_ts) / speed) for item in items]
+        )
+        elapsed = time.monotonic() - start_time
+
+    return results, elapsed
+
+
+def report(results: dict, elapsed: float) -> None:
+    total = sum(len(samples) for samples in results.values())
+    print(f"requests: {total}, elapsed: {elapsed:.2f}s, rps: {total / elapsed:.1f}")
+    print(
+        f"{'route':<60} {'count':>6} {'errors':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for route, samples in sorted(results.items()):
+        latencies = [latency for latency, _ in samples]
+        errors = sum(
+            1 for _, status_code in samples if status_code is None or status_code >= 500
+        )
+        print(
+            f"{route:<60} {len(samples):>6} {errors:>6} "
+            f"{percentile(latencies, 0.5) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured gateway traffic")
+    parser.add_argument("capture", help="JSONL file written with CAPTURE_ENABLED")
+    parser.add_argument("--target", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    items = load_capture(args.capture)
+    if not items:
+        print("capture is empty")
+        return
+
+    issuer = TokenIssuer(os.getenv("SECRET_KEY"), os.getenv("ALGORITHM"))
+    results, elapsed = asyncio.run(
+        replay(items, args.target, args.speed, args.concurrency, issuer)
+    )
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
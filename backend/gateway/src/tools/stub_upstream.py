@@ -0,0 +1,53 @@
+"""Заглушка апстрима для локального прогона src/tools/replay.py.
+
+Отвечает на любой /api/... запрос статусом, размером тела и задержкой из
+захваченного трафика (STUB_CAPTURE_FILE), иначе — 200, STUB_BODY_SIZE байт
+и STUB_LATENCY секунд:
+
+    STUB_CAPTURE_FILE=capture.jsonl uvicorn src.tools.stub_upstream:app --port 8001
+"""
+
+import asyncio
+import os
+
+from fastapi import FastAPI, Request, Response
+from src.tools.replay import load_capture
+
+STUB_CAPTURE_FILE = os.getenv("STUB_CAPTURE_FILE")
+STUB_BODY_SIZE = int(os.getenv("STUB_BODY_SIZE", 1024))
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", 0.01))
+# Множитель для задержек из захвата
+STUB_LATENCY_SCALE = float(os.getenv("STUB_LATENCY_SCALE", 1.0))
+
+# (метод, path без префикса сервиса) -> (статус, размер тела, задержка)
+captured_routes: dict[tuple[str, str], tuple[int, int, float]] = {}
+if STUB_CAPTURE_FILE:
+    for item in load_capture(STUB_CAPTURE_FILE):
+        _, _, path = item["path"].lstrip("/").partition("/")
+        captured_routes[(item["method"], path)] = (
+            item["status_code"],
+            item["response_size"],
+            item["duration"] * STUB_LATENCY_SCALE,
+        )
+
+app = FastAPI()
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response()
+
+
+@app.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def stub(path: str, request: Request):
+    await request.body()
+    status_code, size, latency = captured_routes.get(
+        (request.method, path), (200, STUB_BODY_SIZE, STUB_LATENCY)
+    )
+    await asyncio.sleep(latency)
+    # JSON-строка нужного размера, чтобы gateway сжимал ее как обычный ответ
+    return Response(
+        content=b'"' + b"x" * max(0, size - 2) + b'"',
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -0,0 +1,80 @@
+import os
+
+# Настройки читаются при импорте src.config, поэтому задаются до импорта приложения
+os.environ.setdefault("AUTH_SERVICE_URL", "http://auth-1")
+os.environ.setdefault("DECKS_SERVICE_URL", "http://decks-1,http://decks-2")
+os.environ.setdefault("GATEWAY_SECRET", "gateway-1")
+os.environ.setdefault("SECRET_KEY", "secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("HEALTH_CHECK_ENABLED", "false")
+
+from typing import AsyncGenerator, Awaitable, Callable  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from src.config import SERVICE_MAP  # noqa: E402
+from src.core.balancer import LoadBalancer, upstream_balancers  # noqa: E402
+from src.core.cache import response_cache  # noqa: E402
+from src.core.clients import upstream_clients  # noqa: E402
+from src.core.latency import LatencyWindow, upstream_latencies  # noqa: E402
+from src.core.resilience import UpstreamGuard, upstream_guards  # noqa: E402
+from src.main import app  # noqa: E402
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+class MockUpstream:
+    """Апстримы auth и decks на MockTransport: ответы задает тест через handler"""
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.handler: Handler = self.default_handler
+
+    @staticmethod
+    async def default_handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async def dispatch(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = await self.handler(request)
+        if not response.is_stream_consumed:
+            return response
+        # Ответ с content= уже прочитан, а gateway читает тело через aiter_raw
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=response.stream,
+        )
+
+
+@pytest.fixture(autouse=True)
+def gateway_state():
+    """Свежие лимитеры, breaker'ы, балансировщики и выключенный кеш в каждом тесте"""
+    for service, urls in SERVICE_MAP.items():
+        upstream_guards[service] = UpstreamGuard()
+        upstream_balancers[service] = LoadBalancer(urls)
+        upstream_latencies[service] = LatencyWindow()
+    yield
+    response_cache.backend = None
+
+
+@pytest.fixture
+async def upstream() -> AsyncGenerator[MockUpstream, None]:
+    """Подменяет httpx-клиенты сервисов auth и decks клиентом с MockTransport"""
+    mock = MockUpstream()
+    for service in ("auth", "decks"):
+        upstream_clients.clients[service] = httpx.AsyncClient(
+            transport=httpx.MockTransport(mock.dispatch)
+        )
+    yield mock
+    await upstream_clients.close_clients()
+
+
+@pytest.fixture
+async def client(upstream: MockUpstream) -> AsyncGenerator[AsyncClient, None]:
+    """HTTP клиент к приложению gateway"""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
@@ -0,0 +1,170 @@
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from jose import jwt
+from src.auth import service
+from src.auth.cache import TTLLRUCache
+from src.auth.service import (
+    get_user_by_token,
+    rejected_tokens,
+    revoke_token,
+    verified_tokens,
+)
+
+from tests.conftest import MockUpstream
+
+
+def make_token(user_id: int = 7, expires_in: int = 3600) -> str:
+    payload = {"sub": str(user_id), "isman": "0", "exp": int(time.time()) + expires_in}
+    return jwt.encode(payload, "secret", algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def token_caches():
+    """Пустые кеши токенов в каждом тесте"""
+    verified_tokens.clear()
+    rejected_tokens.clear()
+    yield
+    verified_tokens.clear()
+    rejected_tokens.clear()
+
+
+@pytest.fixture
+def verify_calls():
+    """Счетчик проверок подписи токена (промахов кеша)"""
+    with patch.object(
+        service, "_verify_token", wraps=service._verify_token
+    ) as verify_token:
+        yield verify_token
+
+
+class TestTTLLRUCache:
+    """Тесты LRU-кеша со сроком жизни записей"""
+
+    def test_get_missing(self):
+        """Тест промаха"""
+        assert TTLLRUCache(2).get("a") is None
+
+    def test_expired_entry_removed(self):
+        """Тест удаления записи после ее срока жизни"""
+        cache = TTLLRUCache(2)
+        cache.set("a", 1, time.time() + 10)
+        assert cache.get("a") == 1
+        with patch("src.auth.cache.time.time", return_value=time.time() + 11):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_evicted(self):
+        """Тест вытеснения давно не читавшейся записи"""
+        cache = TTLLRUCache(2)
+        expires_at = time.time() + 10
+        cache.set("a", 1, expires_at)
+        cache.set("b", 2, expires_at)
+        cache.get("a")
+        cache.set("c", 3, expires_at)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_disabled(self):
+        """Тест кеша нулевого размера"""
+        cache = TTLLRUCache(0)
+        cache.set("a", 1, time.time() + 10)
+        assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+class TestTokenCache:
+    """Тесты кеша проверенных и отклоненных токенов"""
+
+    async def test_miss_then_hit(self, verify_calls):
+        """Тест: подпись проверяется один раз, дальше токен берется из кеша"""
+        token = make_token()
+        first = await get_user_by_token(token)
+        second = await get_user_by_token(token)
+        assert first == second
+        assert first.id == "7"
+        assert verify_calls.call_count == 1
+
+    async def test_valid_until_token_exp(self, verify_calls):
+        """Тест: проверенный токен живет в кеше до своего exp"""
+        token = make_token(expires_in=60)
+        await get_user_by_token(token)
+        with patch("src.auth.cache.time.time", return_value=time.time() + 61):
+            assert verified_tokens.get(service.token_key(token)) is None
+        assert verify_calls.call_count == 1
+
+    async def test_invalid_token_cached(self, verify_calls):
+        """Тест: отклоненный токен отвечает 401 из негативного кеша"""
+        token = jwt.encode({"sub": "7", "isman": "0"}, "secret", algorithm="HS256")
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await get_user_by_token(token)
+            assert exc_info.value.status_code == 401
+            assert exc_info.value.detail == "Token expired"
+        assert verify_calls.call_count == 1
+        assert len(verified_tokens) == 0
+
+    async def test_negative_cache_ttl(self, verify_calls):
+        """Тест: отказ кешируется на TOKEN_NEGATIVE_CACHE_TTL"""
+        token = "not-a-jwt"
+        with pytest.raises(HTTPException):
+            await get_user_by_token(token)
+        later = time.time() + service.settings.TOKEN_NEGATIVE_CACHE_TTL + 1
+        with patch("src.auth.cache.time.time", return_value=later):
+            with pytest.raises(HTTPException):
+                await get_user_by_token(token)
+        assert verify_calls.call_count == 2
+
+    async def test_revoked_token_rejected(self, verify_calls):
+        """Тест: отозванный токен не принимается до его exp"""
+        token = make_token()
+        await get_user_by_token(token)
+        revoke_token(token)
+        with pytest.raises(HTTPException) as exc_info:
+            await get_user_by_token(token)
+        assert exc_info.value.detail == "Token revoked"
+        assert verify_calls.call_count == 1
+
+
+@pytest.mark.asyncio
+class TestLogout:
+    """Тесты выхода через gateway"""
+
+    async def test_logout_evicts_token(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест: после выхода токен отклоняется, хотя подпись и exp верны"""
+        headers = {"Authorization": f"Bearer {make_token()}"}
+        response = await client.get("/decks/cards/1", headers=headers)
+        assert response.status_code == 200
+        assert upstream.requests[-1].headers["X-User-Id"] == "7"
+
+        response = await client.post("/auth/logout", headers=headers)
+        assert response.status_code == 200
+        assert upstream.requests[-1].url.host == "auth-1"
+
+        response = await client.get("/decks/cards/1", headers=headers)
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Token revoked"}
+
+    async def test_failed_logout_keeps_token(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест: неудачный выход не отзывает токен"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(401, json={"code": "INVALID_TOKEN"})
+
+        upstream.handler = handler
+        headers = {"Authorization": f"Bearer {make_token()}"}
+        response = await client.post("/auth/logout", headers=headers)
+        assert response.status_code == 401
+
+        upstream.handler = MockUpstream.default_handler
+        response = await client.get("/decks/cards/1", headers=headers)
+        assert response.status_code == 200
@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.config import Settings
+from src.core.balancer import upstream_balancers
+
+from tests.conftest import MockUpstream
+
+
+@pytest.mark.asyncio
+class TestLoadBalancer:
+    """Тесты выбора инстанса сервиса"""
+
+    async def test_power_of_two_choices(self):
+        """Тест выбора инстанса с меньшим числом незавершенных запросов"""
+        balancer = upstream_balancers["decks"]
+        busy, idle = balancer.endpoints
+        busy.outstanding = 5
+        for _ in range(10):
+            assert balancer.pick() is idle
+
+    async def test_failing_endpoint_ejected(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест исключения инстанса, подряд отвечающего ошибками"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "decks-1":
+                return httpx.Response(500, json={})
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        for _ in range(50):
+            await client.post("/decks/cards/", json={})
+
+        first, second = upstream_balancers["decks"].endpoints
+        assert first.ejected_until > 0
+        assert second.ejected_until == 0
+        hosts = [request.url.host for request in upstream.requests]
+        assert hosts.count("decks-1") == Settings.EJECT_FAILURE_THRESHOLD
+
+    async def test_all_endpoints_ejected(self):
+        """Тест выбора инстанса, когда исключены все"""
+        balancer = upstream_balancers["decks"]
+        for endpoint in balancer.endpoints:
+            endpoint.healthy = False
+        assert balancer.pick() in balancer.endpoints
@@ -0,0 +1,125 @@
+import gzip
+import json
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from tests.conftest import MockUpstream
+
+
+@pytest.mark.asyncio
+class TestBatch:
+    """Тесты для POST /batch"""
+
+    async def test_batch(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест нескольких запросов в одном batch"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "POST":
+                return httpx.Response(201, json={"created": request.read().decode()})
+            return httpx.Response(200, json={"path": request.url.path})
+
+        upstream.handler = handler
+        response = await client.post(
+            "/batch",
+            json={
+                "requests": [
+                    {"service": "decks", "path": "cards/1", "query": {"full": True}},
+                    {
+                        "method": "POST",
+                        "service": "decks",
+                        "path": "/cards/",
+                        "body": {"name": "card"},
+                    },
+                ]
+            },
+        )
+        assert response.status_code == 200
+        first, second = response.json()["responses"]
+
+        assert first["status"] == 200
+        assert first["body"] == {"path": "/api/cards/1"}
+        assert second["status"] == 201
+        assert second["body"] == {"created": '{"name": "card"}'}
+        sent = next(request for request in upstream.requests if request.method == "GET")
+        assert sent.url.params["full"] == "true"
+
+    async def test_upstream_compression_not_requested(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест элемента batch при клиенте, принимающем сжатые ответы"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            body = json.dumps({"id": 1}).encode()
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                return httpx.Response(
+                    200,
+                    content=gzip.compress(body),
+                    headers={
+                        "content-type": "application/json",
+                        "content-encoding": "gzip",
+                    },
+                )
+            return httpx.Response(
+                200, content=body, headers={"content-type": "application/json"}
+            )
+
+        upstream.handler = handler
+        response = await client.post(
+            "/batch",
+            json={
+                "requests": [
+                    {"service": "decks", "path": "cards/1"},
+                    {
+                        "service": "decks",
+                        "path": "cards/2",
+                        "headers": {"Accept-Encoding": "gzip"},
+                    },
+                ]
+            },
+            headers={"Accept-Encoding": "gzip, br"},
+        )
+        assert [item["body"] for item in response.json()["responses"]] == [
+            {"id": 1},
+            {"id": 1},
+        ]
+        assert all(
+            request.headers["accept-encoding"] == "identity"
+            for request in upstream.requests
+        )
+
+    async def test_unknown_service(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест элемента batch с неизвестным сервисом"""
+        response = await client.post(
+            "/batch", json={"requests": [{"service": "unknown", "path": "cards/1"}]}
+        )
+        assert response.status_code == 200
+        assert response.json()["responses"][0]["status"] == 404
+        assert upstream.requests == []
+
+    async def test_item_error(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест ошибки одного элемента без ошибки всего batch"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/cards/2":
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        response = await client.post(
+            "/batch",
+            json={
+                "requests": [
+                    {"method": "POST", "service": "decks", "path": "cards/1"},
+                    {"method": "POST", "service": "decks", "path": "cards/2"},
+                ]
+            },
+        )
+        statuses = [item["status"] for item in response.json()["responses"]]
+        assert statuses == [200, 502]
+
+    async def test_empty_batch(self, client: AsyncClient):
+        """Тест пустого batch"""
+        response = await client.post("/batch", json={"requests": []})
+        assert response.status_code == 422
@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.core.cache import MemoryResponseCache, response_cache
+
+from tests.conftest import MockUpstream
+
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    """Тесты кеша ответов публичных маршрутов"""
+
+    @pytest.fixture(autouse=True)
+    def memory_cache(self):
+        response_cache.backend = MemoryResponseCache(1024 * 1024)
+
+    async def test_cache_hit(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест ответа из кеша без запроса к апстриму"""
+        first = await client.get("/decks/decks/")
+        second = await client.get("/decks/decks/")
+
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert len(upstream.requests) == 1
+
+    async def test_not_modified(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест ответа 304 по If-None-Match"""
+        first = await client.get("/decks/decks/")
+        response = await client.get(
+            "/decks/decks/", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    async def test_no_store_not_cached(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест некешируемого ответа с Cache-Control: no-store"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=[], headers={"Cache-Control": "no-store"})
+
+        upstream.handler = handler
+        await client.get("/decks/decks/")
+        await client.get("/decks/decks/")
+        assert len(upstream.requests) == 2
+
+    async def test_private_route_not_cached(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест маршрута вне списка кешируемых"""
+        await client.get("/decks/cards/1")
+        response = await client.get("/decks/cards/1")
+        assert "X-Cache" not in response.headers
+        assert len(upstream.requests) == 2
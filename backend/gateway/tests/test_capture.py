@@ -0,0 +1,136 @@
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from src.core.capture import CaptureMiddleware, capture_body, traffic_recorder
+from src.main import app
+from src.tools.replay import TokenIssuer, build_request
+
+from tests.conftest import MockUpstream
+
+
+@pytest.fixture
+async def captured(upstream: MockUpstream):
+    """Клиент к gateway с записью всех запросов; записи остаются в очереди"""
+    capture = CaptureMiddleware(app, sample_rate=1.0, max_body_size=64 * 1024)
+    async with AsyncClient(
+        transport=ASGITransport(app=capture), base_url="http://test"
+    ) as ac:
+        yield ac
+    traffic_recorder._drain()
+
+
+def recorded() -> dict:
+    (item,) = traffic_recorder._drain()
+    return item
+
+
+class TestCaptureBody:
+    """Тесты записи тел запросов"""
+
+    def test_json_masked(self):
+        """Тест маскирования секретов в JSON"""
+        body = json.dumps({"login": "user", "password": "123", "refresh_token": "t"})
+        assert capture_body(body.encode(), "application/json") == {
+            "json": {"login": "user", "password": "***", "refresh_token": "***"}
+        }
+
+    def test_form_masked(self):
+        """Тест маскирования секретов в форме"""
+        body = b"username=user&password=123&client_secret=s"
+        assert capture_body(body, "application/x-www-form-urlencoded") == {
+            "form": [
+                ("username", "user"),
+                ("password", "***"),
+                ("client_secret", "***"),
+            ]
+        }
+
+    @pytest.mark.parametrize(
+        "body, content_type",
+        [
+            (b"--b\r\npassword=123\r\n--b--", "multipart/form-data; boundary=b"),
+            (b"password=123", "text/plain"),
+            (b"{password: 123", "application/json"),
+        ],
+    )
+    def test_other_bodies_not_stored(self, body: bytes, content_type: str):
+        """Тест отказа от записи тел, которые нельзя замаскировать"""
+        assert capture_body(body, content_type) == {"body_size": len(body)}
+
+
+@pytest.mark.asyncio
+class TestCapture:
+    """Тесты записи запросов через gateway"""
+
+    async def test_query_masked(self, captured: AsyncClient):
+        """Тест маскирования секретов в query-параметрах"""
+        await captured.get(
+            "/decks/decks/",
+            params={
+                "page": "2",
+                "token": "t",
+                "X-Amz-Signature": "s",
+                "X-Amz-Credential": "c",
+            },
+        )
+
+        item = recorded()
+        assert item["query"] == (
+            "page=2&token=%2A%2A%2A&X-Amz-Signature=%2A%2A%2A"
+            "&X-Amz-Credential=%2A%2A%2A"
+        )
+
+    async def test_headers_dropped(self, captured: AsyncClient):
+        """Тест исключения заголовков с секретами"""
+        await captured.get(
+            "/decks/decks/",
+            headers={"Cookie": "session=1", "X-Api-Key": "k", "Accept": "text/plain"},
+        )
+
+        headers = recorded()["headers"]
+        assert "cookie" not in headers
+        assert "x-api-key" not in headers
+        assert headers["accept"] == "text/plain"
+
+    async def test_batch_headers_masked(self, captured: AsyncClient):
+        """Тест маскирования заголовков вложенных запросов /batch"""
+        await captured.post(
+            "/batch",
+            json={
+                "requests": [
+                    {
+                        "service": "decks",
+                        "path": "decks/",
+                        "headers": {"Authorization": "Bearer t", "Cookie": "c=1"},
+                        "query": {"token": "t"},
+                    }
+                ]
+            },
+        )
+
+        (request,) = recorded()["json"]["requests"]
+        assert request["headers"] == {"Authorization": "***", "Cookie": "***"}
+        assert request["query"] == {"token": "***"}
+
+    async def test_replay_round_trip(
+        self, captured: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест воспроизведения записанного запроса"""
+        await captured.post(
+            "/decks/learn/sessions/1/answers",
+            params={"mode": "srs", "token": "t"},
+            data={"card": "1", "password": "123"},
+        )
+        item = json.loads(json.dumps(recorded()))
+
+        await captured.request(**build_request(item, TokenIssuer(None, None)))
+
+        original, replayed = upstream.requests
+        assert replayed.method == original.method
+        assert replayed.url.path == original.url.path
+        assert replayed.url.params["mode"] == "srs"
+        assert replayed.url.params["token"] == "***"
+        assert replayed.content == b"card=1&password=%2A%2A%2A"
+        assert replayed.headers["content-type"] == original.headers["content-type"]
+        assert json.loads(json.dumps(recorded()))["form"] == item["form"]
@@ -0,0 +1,96 @@
+import gzip
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.core.compression import negotiate_encoding
+
+from tests.conftest import MockUpstream
+
+LARGE_JSON = [{"id": i, "name": f"card {i}"} for i in range(200)]
+
+
+class TestNegotiateEncoding:
+    """Тесты выбора кодировки по Accept-Encoding"""
+
+    def test_preferred_encoding(self):
+        """Тест выбора по порядку предпочтения при равных q"""
+        assert negotiate_encoding("gzip, br, zstd") == "zstd"
+
+    def test_q_values(self):
+        """Тест выбора по q-значениям"""
+        assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+        assert negotiate_encoding("gzip;q=0") is None
+
+    def test_wildcard(self):
+        """Тест кодировки из *"""
+        assert negotiate_encoding("*") == "zstd"
+        assert negotiate_encoding("identity") is None
+
+
+@pytest.mark.asyncio
+class TestCompression:
+    """Тесты сжатия ответов gateway"""
+
+    @pytest.fixture(autouse=True)
+    def large_json(self, upstream: MockUpstream):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=LARGE_JSON)
+
+        upstream.handler = handler
+
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    async def test_response_compressed(self, client: AsyncClient, encoding: str):
+        """Тест сжатия большого JSON-ответа"""
+        response = await client.get(
+            "/decks/cards/", headers={"Accept-Encoding": encoding}
+        )
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.json() == LARGE_JSON
+
+    async def test_small_response_not_compressed(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест ответа меньше COMPRESSION_MIN_SIZE"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"id": 1})
+
+        upstream.handler = handler
+        response = await client.get(
+            "/decks/cards/1", headers={"Accept-Encoding": "gzip"}
+        )
+        assert "Content-Encoding" not in response.headers
+
+    async def test_compressed_upstream_passthrough(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест ответа, уже сжатого апстримом"""
+        body = gzip.compress(b'{"id": 1}' * 200)
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200,
+                content=body,
+                headers={
+                    "content-type": "application/json",
+                    "content-encoding": "gzip",
+                },
+            )
+
+        upstream.handler = handler
+        async with client.stream(
+            "GET", "/decks/cards/", headers={"Accept-Encoding": "br"}
+        ) as response:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert raw == body
+
+    async def test_no_accept_encoding(self, client: AsyncClient):
+        """Тест ответа без Accept-Encoding"""
+        response = await client.get(
+            "/decks/cards/", headers={"Accept-Encoding": "identity"}
+        )
+        assert "Content-Encoding" not in response.headers
+        assert response.json() == LARGE_JSON
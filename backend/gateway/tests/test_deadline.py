@@ -0,0 +1,39 @@
+import time
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.core.deadline import DEADLINE_HEADER
+
+from tests.conftest import MockUpstream
+
+
+@pytest.mark.asyncio
+class TestDeadline:
+    """Тесты дедлайнов запросов"""
+
+    async def test_deadline_header(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест передачи дедлайна маршрута в апстрим"""
+        await client.get("/decks/learn/1/next")
+        deadline = float(upstream.requests[0].headers[DEADLINE_HEADER])
+        assert deadline == pytest.approx(time.time() + 3.0, abs=1)
+
+    async def test_client_deadline_replaced(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест замены дедлайна, присланного клиентом"""
+        await client.get(
+            "/decks/learn/1/next", headers={DEADLINE_HEADER: str(time.time() + 3600)}
+        )
+        deadline = float(upstream.requests[0].headers[DEADLINE_HEADER])
+        assert deadline < time.time() + 10
+
+    async def test_upstream_timeout(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест ответа 504 при таймауте апстрима"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ReadTimeout("timeout", request=request)
+
+        upstream.handler = handler
+        response = await client.post("/decks/learn/1/answer", json={})
+        assert response.status_code == 504
@@ -0,0 +1,181 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.config import Settings
+from src.core.clients import upstream_clients
+from src.core.latency import upstream_latencies
+from src.core.resilience import upstream_guards
+from src.core.upstream import _hedged_send
+from src.monitoring.common import registry
+
+from tests.conftest import MockUpstream
+
+
+def hedged_total() -> float:
+    value = registry.get_sample_value(
+        "gateway_upstream_hedged_total", {"service": "decks"}
+    )
+    return value or 0.0
+
+
+async def connect_error_handler(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+@pytest.mark.asyncio
+class TestRetries:
+    """Тесты повторов при ошибке соединения"""
+
+    async def test_idempotent_request_retried(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест повтора GET на другой попытке"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if len(upstream.requests) == 1:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={"ok": True})
+
+        upstream.handler = handler
+        response = await client.get("/decks/cards/1")
+        assert response.status_code == 200
+        assert len(upstream.requests) == 2
+
+    async def test_post_not_retried(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест отсутствия повтора неидемпотентного запроса"""
+        upstream.handler = connect_error_handler
+        response = await client.post("/decks/cards/", json={})
+        assert response.status_code == 502
+        assert len(upstream.requests) == 1
+
+    async def test_retries_exhausted(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест ответа 502 после исчерпания попыток"""
+        upstream.handler = connect_error_handler
+        response = await client.get("/decks/cards/1")
+        assert response.status_code == 502
+        assert len(upstream.requests) == Settings.RETRY_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+class TestHedging:
+    """Тесты хеджирования медленных GET"""
+
+    @pytest.fixture(autouse=True)
+    def hedging(self):
+        for _ in range(Settings.HEDGE_MIN_SAMPLES):
+            upstream_latencies["decks"].observe(0.01)
+        with patch.object(Settings, "HEDGING_ENABLED", True):
+            yield
+
+    async def test_slow_request_hedged(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест ответа дублирующего запроса, пришедшего раньше основного"""
+        hedged_before = hedged_total()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if len(upstream.requests) == 1:
+                await asyncio.sleep(1)
+                return httpx.Response(200, json={"attempt": "primary"})
+            return httpx.Response(200, json={"attempt": "hedge"})
+
+        upstream.handler = handler
+        response = await client.get("/decks/decks/1/")
+
+        assert response.json() == {"attempt": "hedge"}
+        assert len(upstream.requests) == 2
+        assert hedged_total() == hedged_before + 1
+
+    async def test_cancelled_hedge_not_sampled(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест освобождения слота проигравшего запроса без замера задержки"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if len(upstream.requests) == 1:
+                await asyncio.sleep(1)
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        limiter = upstream_guards["decks"].limiter
+        with patch.object(limiter, "release", wraps=limiter.release) as release:
+            await client.get("/decks/decks/1/")
+            await asyncio.sleep(0.05)
+
+        assert release.call_count == 1
+        assert limiter.in_flight == 0
+
+    async def test_caller_cancelled_before_hedge(self, upstream: MockUpstream):
+        """Тест отмены основного запроса при отмене вызывающего"""
+        upstream_cancelled = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        upstream_client = upstream_clients.clients["decks"]
+        request = upstream_client.build_request("GET", "/api/decks/1/")
+        send = asyncio.create_task(_hedged_send("decks", upstream_client, request, 10))
+        await asyncio.sleep(0.05)
+        send.cancel()
+
+        await asyncio.wait_for(upstream_cancelled.wait(), timeout=0.5)
+        await asyncio.sleep(0.01)
+        assert upstream_guards["decks"].limiter.in_flight == 0
+
+    async def test_both_attempts_done_together(self):
+        """Тест закрытия второго ответа, если обе попытки завершились вместе"""
+        release = asyncio.Event()
+        responses = []
+
+        class Response:
+            closed = False
+
+            async def aclose(self):
+                self.closed = True
+
+        async def send_upstream(service, client, request):
+            response = Response()
+            responses.append(response)
+            await release.wait()
+            return response
+
+        with patch("src.core.upstream.send_upstream", send_upstream):
+            request = httpx.Request("GET", "http://decks-1/api/decks/1/")
+            send = asyncio.create_task(_hedged_send("decks", None, request, 0.01))
+            while len(responses) < 2:
+                await asyncio.sleep(0.01)
+            release.set()
+            winner = await send
+            await asyncio.sleep(0)
+
+        loser = next(response for response in responses if response is not winner)
+        assert not winner.closed
+        assert loser.closed
+
+    async def test_fast_request_not_hedged(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест запроса, ответившего до задержки хеджирования"""
+        response = await client.get("/decks/decks/1/")
+        assert response.status_code == 200
+        assert len(upstream.requests) == 1
+
+    async def test_route_not_hedged(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест маршрута вне HEDGE_ROUTES"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        await client.get("/decks/cards/1")
+        assert len(upstream.requests) == 1
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.config import Settings
+from src.core.upstream import PhaseTracer
+from src.main import app, lifespan
+from src.monitoring.common import registry
+
+
+def sample(name: str, **labels) -> float:
+    return registry.get_sample_value(name, {"service": "decks", **labels}) or 0.0
+
+
+async def trace(tracer: PhaseTracer, *events: str) -> None:
+    for event in events:
+        await tracer(event, {})
+
+
+@pytest.mark.asyncio
+class TestPoolMetrics:
+    """Тесты метрик пула соединений по trace-событиям httpcore"""
+
+    async def test_new_and_reused_connections(self):
+        """Тест подсчета новых и переиспользованных соединений"""
+        opened = sample("gateway_upstream_pool_connections_opened_total")
+        new = sample("gateway_upstream_pool_requests_total", connection="new")
+        reused = sample("gateway_upstream_pool_requests_total", connection="reused")
+
+        await trace(
+            PhaseTracer("decks"),
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "http11.send_request_headers.started",
+        )
+        await trace(PhaseTracer("decks"), "http11.send_request_headers.started")
+
+        assert sample("gateway_upstream_pool_connections_opened_total") == opened + 1
+        assert (
+            sample("gateway_upstream_pool_requests_total", connection="new") == new + 1
+        )
+        assert (
+            sample("gateway_upstream_pool_requests_total", connection="reused")
+            == reused + 1
+        )
+
+    async def test_connections_in_use(self):
+        """Тест числа соединений, занятых запросами"""
+        in_use = sample("gateway_upstream_pool_connections_in_use")
+        tracer = PhaseTracer("decks")
+
+        await trace(tracer, "http11.send_request_headers.started")
+        assert sample("gateway_upstream_pool_connections_in_use") == in_use + 1
+
+        await trace(
+            tracer,
+            "http11.receive_response_headers.complete",
+            "http11.response_closed.started",
+            "http11.response_closed.complete",
+        )
+        assert sample("gateway_upstream_pool_connections_in_use") == in_use
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    """Тесты отдачи метрик"""
+
+    async def test_not_served_on_public_port(self, client: AsyncClient):
+        """Тест отсутствия /metrics на публичном порту gateway"""
+        response = await client.get("/metrics", follow_redirects=True)
+        assert response.status_code == 404
+
+    async def test_served_on_internal_port(self):
+        """Тест /metrics на отдельном внутреннем порту"""
+        with patch.object(Settings, "METRICS_PORT", 0):
+            async with lifespan(app):
+                port = app.state.metrics_server.server_port
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(f"http://127.0.0.1:{port}/metrics")
+
+        assert response.status_code == 200
+        assert "gateway_upstream_pool_max_connections" in response.text
+
+
+def series(name: str) -> set[tuple]:
+    return {
+        tuple(sorted(sample.labels.items()))
+        for metric in registry.collect()
+        for sample in metric.samples
+        if sample.name == name
+    }
+
+
+@pytest.mark.asyncio
+class TestRouteLabels:
+    """Тесты метки endpoint в метриках запросов"""
+
+    async def test_known_route_template(self, client: AsyncClient):
+        """Тест метки по шаблону известного маршрута"""
+        before = sample(
+            "gateway_http_requests_total",
+            method="GET",
+            endpoint="/decks/{id}/",
+            status_code="200",
+        )
+
+        await client.get("/decks/decks/42/")
+        await client.get("/decks/decks/43")
+
+        assert (
+            sample(
+                "gateway_http_requests_total",
+                method="GET",
+                endpoint="/decks/{id}/",
+                status_code="200",
+            )
+            == before + 2
+        )
+
+    async def test_arbitrary_paths_no_new_series(self, client: AsyncClient):
+        """Тест отсутствия новых серий для произвольных путей"""
+        await client.get("/decks/random-path")
+        before = series("gateway_http_requests_total")
+
+        for path in ("a1b2c3", "decks/abc/", "decks/42/unknown", "x/" * 10):
+            await client.get(f"/decks/{path}")
+
+        assert series("gateway_http_requests_total") == before
+        assert sample(
+            "gateway_http_requests_total",
+            method="GET",
+            endpoint="other",
+            status_code="200",
+        )
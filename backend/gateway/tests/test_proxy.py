@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.config import Settings
+from src.main import app
+
+from tests.conftest import MockUpstream
+
+CHUNK = b"x" * (128 * 1024)
+
+
+async def first_chunk_streamed(method: str, path: str, release: asyncio.Event) -> bool:
+    """Дошел ли первый кусок тела до клиента, пока апстрим еще не дописал ответ.
+
+    httpx.ASGITransport собирает ответ целиком, поэтому приложение вызывается
+    напрямую и проверяются сообщения http.response.body.
+    """
+    first_chunk = asyncio.get_running_loop().create_future()
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            if not first_chunk.done():
+                first_chunk.set_result(None)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+    try:
+        await asyncio.wait_for(asyncio.shield(first_chunk), timeout=1)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        release.set()
+        await task
+        finished.set()
+
+
+def slow_stream_handler(release: asyncio.Event):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        async def body():
+            yield CHUNK
+            await release.wait()
+            yield CHUNK
+
+        return httpx.Response(
+            200, headers={"content-type": "application/octet-stream"}, content=body()
+        )
+
+    return handler
+
+
+@pytest.mark.asyncio
+class TestProxy:
+    """Тесты проксирования запросов в сервисы"""
+
+    async def test_proxy_request(self, client: AsyncClient, upstream: MockUpstream):
+        """Тест проксирования запроса с заголовками gateway"""
+        response = await client.get(
+            "/decks/cards/1", params={"q": "a"}, headers={"X-User-Id": "99"}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"path": "/api/cards/1"}
+
+        sent = upstream.requests[0]
+        assert sent.url.params["q"] == "a"
+        assert sent.headers["X-Gateway-Auth"] == "gateway-1"
+        # Заголовки пользователя выставляет только auth_middleware
+        assert "X-User-Id" not in sent.headers
+
+    async def test_unknown_service(self, client: AsyncClient):
+        """Тест запроса к неизвестному сервису"""
+        response = await client.get("/unknown/cards/1")
+        assert response.status_code == 404
+
+    async def test_large_response_streamed(self, upstream: MockUpstream):
+        """Тест потоковой отдачи большого ответа"""
+        release = asyncio.Event()
+        upstream.handler = slow_stream_handler(release)
+
+        assert await first_chunk_streamed("POST", "/decks/learn/export", release)
+
+    async def test_large_get_streamed(self, upstream: MockUpstream):
+        """Тест потоковой отдачи большого ответа на GET"""
+        release = asyncio.Event()
+        upstream.handler = slow_stream_handler(release)
+
+        assert await first_chunk_streamed("GET", "/decks/learn/export", release)
+
+    async def test_large_request_body(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест передачи большого тела запроса в апстрим"""
+        response = await client.post("/decks/cards/", content=CHUNK)
+        assert response.status_code == 200
+
+        sent = upstream.requests[0]
+        assert sent.headers["content-length"] == str(len(CHUNK))
+        assert sent.content == CHUNK
+
+    async def test_request_body_too_large(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест отказа в слишком большом теле запроса"""
+        with patch.object(Settings, "PROXY_MAX_BODY_SIZE", 10):
+            response = await client.post("/decks/cards/", content=b"x" * 11)
+        assert response.status_code == 413
+        assert upstream.requests == []
+
+    @pytest.mark.parametrize("content_length", ["abc", "-1", "1e3", b"\xb2"])
+    async def test_invalid_content_length(
+        self, client: AsyncClient, upstream: MockUpstream, content_length
+    ):
+        """Тест ответа 400 на некорректный Content-Length"""
+        response = await client.post(
+            "/decks/cards/",
+            content=b"x",
+            headers={"content-length": content_length},
+        )
+        assert response.status_code == 400
+        assert upstream.requests == []
+
+    async def test_invalid_upstream_content_length(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест ответа апстрима с некорректным Content-Length"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200, headers={"content-length": "abc"}, stream=httpx.ByteStream(b"ok")
+            )
+
+        upstream.handler = handler
+        response = await client.post("/decks/cards/", json={})
+        assert response.status_code == 200
+        assert response.content == b"ok"
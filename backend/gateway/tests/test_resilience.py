@@ -0,0 +1,175 @@
+import asyncio
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from src.config import Settings
+from src.core.resilience import (
+    AIMDLimiter,
+    BreakerState,
+    CircuitBreaker,
+    upstream_guards,
+)
+
+from tests.conftest import MockUpstream
+
+
+async def failing_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(500, json={"detail": "error"})
+
+
+class TestAIMDLimiter:
+    """Тесты адаптивного лимита одновременных запросов"""
+
+    def make_limiter(self) -> AIMDLimiter:
+        return AIMDLimiter(
+            initial=2, min_limit=1, max_limit=4, latency_target=1.0, backoff=0.5
+        )
+
+    def test_rejects_over_limit(self):
+        """Тест отказа при исчерпанном лимите"""
+        limiter = self.make_limiter()
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+
+    def test_additive_increase(self):
+        """Тест увеличения лимита после успешных ответов"""
+        limiter = self.make_limiter()
+        for _ in range(2):
+            limiter.try_acquire()
+            limiter.release(0.1, failed=False)
+        assert limiter.limit == pytest.approx(2.9, abs=0.05)
+        assert limiter.in_flight == 0
+
+    def test_multiplicative_decrease(self):
+        """Тест уменьшения лимита при ошибке и медленном ответе"""
+        limiter = self.make_limiter()
+        limiter.try_acquire()
+        limiter.release(0.1, failed=True)
+        assert limiter.limit == 1.0
+
+        limiter = self.make_limiter()
+        limiter.try_acquire()
+        limiter.release(5.0, failed=False)
+        assert limiter.limit == 1.0
+
+
+class TestCircuitBreaker:
+    """Тесты circuit breaker'а"""
+
+    def test_opens_after_failures(self):
+        """Тест размыкания после серии ошибок"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record(failed=True)
+        assert breaker.state == BreakerState.closed
+        breaker.record(failed=True)
+        assert breaker.state == BreakerState.open
+        assert not breaker.allow()
+
+    def test_single_probe_closes(self):
+        """Тест одного пробного запроса после таймаута"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record(failed=True)
+
+        assert breaker.allow()
+        assert breaker.state == BreakerState.half_open
+        assert not breaker.allow()
+        breaker.record(failed=False, probe=True)
+        assert breaker.state == BreakerState.closed
+
+    def test_failed_probe_reopens(self):
+        """Тест повторного размыкания при ошибке пробного запроса"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record(failed=True)
+        assert breaker.allow()
+        breaker.record(failed=True, probe=True)
+        assert breaker.state == BreakerState.open
+
+    def test_late_success_ignored_while_open(self):
+        """Тест успеха запроса, отправленного до размыкания"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record(failed=True)
+        breaker.record(failed=False)
+        assert breaker.state == BreakerState.open
+        assert not breaker.allow()
+
+    def test_only_probe_closes_half_open(self):
+        """Тест полуоткрытого breaker'а, который закрывает только пробный запрос"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record(failed=True)
+        assert breaker.allow()
+
+        breaker.record(failed=False)
+        assert breaker.state == BreakerState.half_open
+        assert breaker.probe_in_flight
+        breaker.record(failed=True)
+        assert breaker.state == BreakerState.half_open
+
+        breaker.record(failed=False, probe=True)
+        assert breaker.state == BreakerState.closed
+
+
+@pytest.mark.asyncio
+class TestUpstreamGuard:
+    """Тесты лимитера и breaker'а на запросах через gateway"""
+
+    async def test_breaker_rejects_requests(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест отказа без запроса к апстриму при разомкнутом breaker'е"""
+        upstream.handler = failing_handler
+        for _ in range(Settings.BREAKER_FAILURE_THRESHOLD):
+            response = await client.post("/decks/cards/", json={})
+            assert response.status_code == 500
+
+        response = await client.post("/decks/cards/", json={})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert len(upstream.requests) == Settings.BREAKER_FAILURE_THRESHOLD
+        assert upstream_guards["decks"].breaker.state == BreakerState.open
+
+    async def test_request_before_trip_does_not_close(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест успеха медленного запроса, начатого до размыкания breaker'а"""
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/slow":
+                await release.wait()
+                return httpx.Response(200, json={})
+            return httpx.Response(500, json={})
+
+        upstream.handler = handler
+        slow = asyncio.create_task(client.post("/decks/slow", json={}))
+        await asyncio.sleep(0.05)
+        for _ in range(Settings.BREAKER_FAILURE_THRESHOLD):
+            await client.post("/decks/cards/", json={})
+        release.set()
+
+        assert (await slow).status_code == 200
+        assert upstream_guards["decks"].breaker.state == BreakerState.open
+        response = await client.post("/decks/cards/", json={})
+        assert response.status_code == 503
+
+    async def test_limiter_rejects_over_capacity(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест отказа сверх лимита одновременных запросов"""
+        upstream_guards["decks"].limiter.limit = 1.0
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        first = asyncio.create_task(client.post("/decks/cards/", json={}))
+        await asyncio.sleep(0.05)
+        second = await client.post("/decks/cards/", json={})
+        release.set()
+
+        assert (await first).status_code == 200
+        assert second.status_code == 503
+        assert upstream_guards["decks"].limiter.in_flight == 0
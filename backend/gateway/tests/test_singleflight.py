@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from tests.conftest import MockUpstream
+
+
+@pytest.mark.asyncio
+class TestCoalescing:
+    """Тесты объединения одинаковых одновременных GET-запросов"""
+
+    async def test_identical_gets_share_upstream_request(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест одного запроса к апстриму на несколько одинаковых GET"""
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, json=[{"id": 1}])
+
+        upstream.handler = handler
+        requests = [asyncio.create_task(client.get("/decks/decks/")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        responses = await asyncio.gather(*requests)
+
+        assert len(upstream.requests) == 1
+        assert all(response.json() == [{"id": 1}] for response in responses)
+
+    async def test_route_not_in_allow_list(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест раздельных запросов на маршруте вне COALESCE_ROUTES"""
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, json={})
+
+        upstream.handler = handler
+        requests = [asyncio.create_task(client.get("/decks/cards/1")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(*requests)
+
+        assert len(upstream.requests) == 2
+
+    async def test_different_queries_not_shared(
+        self, client: AsyncClient, upstream: MockUpstream
+    ):
+        """Тест раздельных запросов с разными параметрами"""
+        await asyncio.gather(
+            client.get("/decks/decks/", params={"page": 1}),
+            client.get("/decks/decks/", params={"page": 2}),
+        )
+        assert len(upstream.requests) == 2
@@ -0,0 +1,22 @@
+"""Дедлайн запроса из заголовка X-Request-Deadline для ASGI-сервисов.
+
+Общий для auth, users и decks; тестовый вектор — deadline_cases.json.
+"""
+
+from .middleware import (
+    DEADLINE_HEADER,
+    DeadlineMiddleware,
+    current_deadline,
+    deadline_headers,
+    parse_deadline,
+    remaining_time,
+)
+
+__all__ = [
+    "DEADLINE_HEADER",
+    "DeadlineMiddleware",
+    "current_deadline",
+    "deadline_headers",
+    "parse_deadline",
+    "remaining_time",
+]
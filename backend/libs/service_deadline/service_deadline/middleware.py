@@ -0,0 +1,96 @@
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Абсолютный дедлайн запроса (unix time в секундах), выставляется gateway
+DEADLINE_HEADER = "X-Request-Deadline"
+
+current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    try:
+        deadline = float(value)
+    except (TypeError, ValueError):
+        return None
+    return deadline if math.isfinite(deadline) else None
+
+
+def remaining_time() -> Optional[float]:
+    """Сколько осталось до дедлайна текущего запроса; None — дедлайна нет"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def deadline_headers() -> dict:
+    """Заголовок для передачи дедлайна в исходящие запросы"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return {}
+    return {DEADLINE_HEADER: f"{deadline:.3f}"}
+
+
+class DeadlineMiddleware:
+    """Не начинает просроченные запросы и отменяет обработку по истечении дедлайна.
+
+    Отмена прерывает ожидание запросов к БД и внешних вызовов в обработчике.
+    Счетчик отброшенных запросов и тело ответа 504 задает сервис.
+    """
+
+    def __init__(self, app: ASGIApp, dropped_requests: Counter, timeout_content: dict):
+        self.app = app
+        self.dropped_requests = dropped_requests
+        self.timeout_content = timeout_content
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = parse_deadline(Headers(scope=scope).get(DEADLINE_HEADER))
+        if deadline is None:
+            await self.app(scope, receive, send)
+            return
+
+        timeout_response = JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content=self.timeout_content,
+        )
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            self.dropped_requests.labels(stage="expired").inc()
+            await timeout_response(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = current_deadline.set(deadline)
+        try:
+            async with asyncio.timeout(remaining) as timeout:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            self.dropped_requests.labels(stage="cancelled").inc()
+            if not response_started:
+                await timeout_response(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
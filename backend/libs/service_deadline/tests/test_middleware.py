@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import CollectorRegistry, Counter
+
+from service_deadline import (
+    DEADLINE_HEADER,
+    DeadlineMiddleware,
+    deadline_headers,
+    parse_deadline,
+    remaining_time,
+)
+
+# Общий тестовый вектор дедлайнов (его же проверяет teaching)
+DEADLINE_CASES = Path(__file__).resolve().parents[1] / "deadline_cases.json"
+
+
+def load_cases() -> list[dict]:
+    # Без вектора тесты не должны молча пропускаться
+    cases = json.loads(DEADLINE_CASES.read_text())
+    if not cases:
+        raise ValueError(f"{DEADLINE_CASES} has no cases")
+    return cases
+
+
+class TestParseDeadline:
+    """Тесты разбора заголовка X-Request-Deadline"""
+
+    @pytest.mark.parametrize("value", [None, "", "abc", "nan", "inf", "-inf"])
+    def test_invalid_value(self, value):
+        """Тест некорректных и бесконечных значений"""
+        assert parse_deadline(value) is None
+
+    def test_valid_value(self):
+        """Тест корректного значения"""
+        assert parse_deadline("1700000000.5") == 1700000000.5
+
+
+@pytest.mark.asyncio
+class TestDeadlineMiddleware:
+    """Тесты DeadlineMiddleware по общему вектору"""
+
+    @pytest.mark.parametrize("case", load_cases(), ids=lambda case: case["name"])
+    async def test_case(self, case: dict):
+        """Тест случая из deadline_cases.json"""
+        registry = CollectorRegistry()
+        dropped = Counter("dropped", "Dropped requests", ["stage"], registry=registry)
+        handled = []
+
+        app = FastAPI()
+
+        @app.get("/")
+        async def handler():
+            handled.append((remaining_time(), deadline_headers()))
+            await asyncio.sleep(case["handler_delay"])
+            return {}
+
+        app.add_middleware(
+            DeadlineMiddleware, dropped_requests=dropped, timeout_content={}
+        )
+
+        headers = {}
+        if "offset" in case:
+            headers[DEADLINE_HEADER] = str(time.time() + case["offset"])
+        if "header" in case:
+            headers[DEADLINE_HEADER] = case["header"]
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/", headers=headers)
+
+        assert response.status_code == case["status"]
+        for stage in ("expired", "cancelled"):
+            value = registry.get_sample_value("dropped_total", {"stage": stage})
+            assert (value or 0.0) == (1.0 if case["dropped"] == stage else 0.0)
+        # Просроченный запрос не доходит до обработчика
+        assert bool(handled) == (case["dropped"] != "expired")
+        if handled:
+            remaining, propagated = handled[0]
+            assert (remaining is not None) == ("offset" in case)
+            assert (DEADLINE_HEADER in propagated) == ("offset" in case)
@@ -8,6 +8,7 @@ from event_contracts.base import EventEnvelope
 from event_contracts.kafka_producer import KafkaProducer
 from event_contracts.user.v1 import UserRegistered as EventUserRegisteredV1
 from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status
+from service_deadline import deadline_headers, remaining_time
 
 from ..monitoring.business_metrics import (
     auth_logins_failed_total,
@@ -45,8 +46,15 @@ router = APIRouter(tags=["Auth"])
 
 
 async def get_users_client() -> httpx.AsyncClient:
+    # Запрос в users не должен пережить дедлайн входящего запроса
+    timeout = 30.0
+    remaining = remaining_time()
+    if remaining is not None:
+        timeout = min(timeout, remaining)
     async with httpx.AsyncClient(
-        base_url=f"{os.getenv('USERS_SERVICE_URL')}/api", timeout=30.0
+        base_url=f"{os.getenv('USERS_SERVICE_URL')}/api",
+        timeout=timeout,
+        headers=deadline_headers(),
     ) as client:
         yield client
 
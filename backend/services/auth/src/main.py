@@ -6,8 +6,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, PlainTextResponse
 
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from service_deadline import DeadlineMiddleware
 
 from .api import routes
+from .monitoring.api_metrics import auth_deadline_dropped_requests_total
 from .monitoring.middleware import MetricsMiddleware
 from .monitoring.common import registry
 from .infra.redis_client import redis_manager
@@ -32,6 +34,14 @@ app = FastAPI(
     title="Auth service", version="1.0.0", lifespan=lifespan, docs_url="/api/docs"
 )
 
+app.add_middleware(
+    DeadlineMiddleware,
+    dropped_requests=auth_deadline_dropped_requests_total,
+    timeout_content=CustomError(
+        code="DEADLINE_EXCEEDED", statusCode="504_GATEWAY_TIMEOUT"
+    ).model_dump(),
+)
+
 app.middleware("http")(MetricsMiddleware(app))
 
 app.add_middleware(
@@ -30,3 +30,9 @@ auth_http_errors_5xx_total = Counter(
     registry=registry,
 )
 
+auth_deadline_dropped_requests_total = Counter(
+    "auth_deadline_dropped_requests_total",
+    "Total number of requests dropped due to an expired deadline in auth service",
+    ["stage"],
+    registry=registry,
+)
@@ -9,7 +9,12 @@ from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.card.models import SCardBulkItem
-from src.entities import Card, CardResult, Deck, UserCardStats
+from src.entities import Card, CardResult, Deck, DeckCardStats, UserCardStats
+from src.learn.service import (
+    add_card_to_sessions,
+    remove_card_from_sessions,
+    reset_card_in_sessions,
+)
 from src.utils.minio import extract_object_key_from_url
 from src.utils.storage import BUCKET_CARDS, get_storage_client
 
@@ -41,29 +46,8 @@ async def create_card(
     if deck:
         deck.cards_amount += 1
     await session.flush()
-
-    stats_query = await session.execute(
-        select(UserCardStats.user_id)
-        .join(Card, Card.id == UserCardStats.card_id)
-        .where(Card.deck_id == deck_id)
-    )
-    user_ids = {row[0] for row in stats_query.all()}
-    for user_id in user_ids:
-        stats = UserCardStats(
-            user_id=user_id,
-            card_id=card.id,
-            success_count=0,
-            fail_count=0,
-            total_answers=0,
-            correct_rate=0.0,
-            streak=0,
-            difficulty_score=0.5,
-            is_learned=False,
-            last_result=None,
-            last_answered_at=None,
-        )
-        session.add(stats)
-    await session.flush()
+    # Статистика новой карточки создается при первом ответе
+    await add_card_to_sessions(session, deck_id)
     await session.refresh(card)
 
     payload = EventCardCreatedV1(
@@ -110,6 +94,15 @@ async def update_card(
     back_image_url: Optional[str],
     order_index: Optional[int],
 ) -> Card:
+    content_changed = any(
+        value is not None and value != getattr(card, field)
+        for field, value in (
+            ("front_text", front_text),
+            ("back_text", back_text),
+            ("front_image_url", front_image_url),
+            ("back_image_url", back_image_url),
+        )
+    )
     if front_text is not None:
         card.front_text = front_text
     if back_text is not None:
@@ -144,14 +137,11 @@ async def update_card(
             storage.remove_object(BUCKET_CARDS, src_key)
             card.back_image_url = dst_key
 
-    stats_query = await session.execute(
-        select(UserCardStats).where(UserCardStats.card_id == card.id)
-    )
-    stats = stats_query.scalars().all()
-    for stat in stats:
-        stat.streak = 0
-        stat.is_learned = False
-        stat.difficulty_score = 0.5
+    if content_changed:
+        # Статистика прошлой версии считается сброшенной при чтении,
+        # записи обновляет src.learn.compact
+        await reset_card_in_sessions(session, card.deck_id, card.id)
+        card.content_version += 1
 
     await session.flush()
     await session.refresh(card)
@@ -164,7 +154,9 @@ async def delete_card(session: AsyncSession, card_id: int) -> None:
         deck = await session.get(Deck, card.deck_id)
         if deck:
             deck.cards_amount = max(0, deck.cards_amount - 1)
+        await remove_card_from_sessions(session, card.deck_id, card_id)
     await session.execute(delete(CardResult).where(CardResult.card_id == card_id))
+    await session.execute(delete(DeckCardStats).where(DeckCardStats.card_id == card_id))
     await session.execute(delete(UserCardStats).where(UserCardStats.card_id == card_id))
     await session.execute(delete(Card).where(Card.id == card_id))
 
@@ -157,12 +157,4 @@ async def deck_stats(
         raise HTTPException(status_code=404, detail="Deck not found")
     if not is_authorized_for_resource(deck.owner_id, user):
         raise HTTPException(status_code=403, detail="Forbidden")
-    stats = await get_deck_stats(session, deck_id)
-    return {
-        "deck_id": stats.deck_id,
-        "total_tests": stats.total_tests,
-        "avg_score": stats.avg_score,
-        "correct_rate": stats.correct_rate,
-        "avg_time_seconds": stats.avg_time_seconds,
-        "card_stats": stats.card_stats,
-    }
+    return await get_deck_stats(session, deck_id)
@@ -1,7 +1,17 @@
-from typing import Dict, Any, List
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.entities import DeckStats, CardResult
+from src.entities import CardResult, DeckCardStats, DeckStats
+
+
+def _insert(session: AsyncSession):
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql_insert
+    return sqlite_insert
 
 
 async def update_deck_stats(
@@ -10,94 +20,108 @@ async def update_deck_stats(
     new_correct_rate: float,
     new_total_time_seconds: int,
     card_results: List[CardResult],
-) -> DeckStats:
-    stats = await session.get(DeckStats, deck_id)
-
-    if stats is None:
-        card_stats: Dict[int, Dict[str, Any]] = {}
-        for cr in card_results:
-            card_stats[cr.card_id] = {
-                "total": 1,
-                "correct": 1 if cr.correct else 0,
-                "avg_time_seconds": cr.answer_time_seconds,
-                "correct_rate": 1.0 if cr.correct else 0.0,
-            }
-
-        stats = DeckStats(
-            deck_id=deck_id,
-            total_tests=1,
-            avg_score=new_correct_rate,
-            correct_rate=1.0 if new_correct_rate >= 0.5 else 0.0,
-            avg_time_seconds=new_total_time_seconds,
-            card_stats=card_stats if card_stats else None,
-        )
-        session.add(stats)
-    else:
-        # обновление статистик для карточек
-        old_total = stats.total_tests
-        new_total = old_total + 1
-
-        stats.total_tests = new_total
-        stats.avg_score = (
-            stats.avg_score * old_total + new_correct_rate
-        ) / new_total
-
-        old_successful = stats.correct_rate * old_total
-        new_successful = old_successful + (
-            1.0 if new_correct_rate >= 0.5 else 0.0
+) -> None:
+    """Прибавить результат теста к суммам колоды и карточек.
+
+    INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x: параллельные
+    тесты не теряют обновлений, строки карточек пишутся только для
+    карточек из теста.
+    """
+    insert = _insert(session)
+
+    stmt = insert(DeckStats).values(
+        deck_id=deck_id,
+        total_tests=1,
+        score_sum=new_correct_rate,
+        passed_tests=1 if new_correct_rate >= 0.5 else 0,
+        time_sum_seconds=new_total_time_seconds,
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["deck_id"],
+            set_={
+                column: getattr(DeckStats, column)
+                + getattr(stmt.excluded, column)
+                for column in (
+                    "total_tests",
+                    "score_sum",
+                    "passed_tests",
+                    "time_sum_seconds",
+                )
+            },
         )
-        stats.correct_rate = new_successful / new_total
-
-        stats.avg_time_seconds = int(
-            (stats.avg_time_seconds * old_total + new_total_time_seconds)
-            / new_total
+    )
+
+    # Одна строка на карточку: ON CONFLICT не обновляет строку дважды
+    card_sums: Dict[int, Dict[str, int]] = {}
+    for cr in card_results:
+        card_sum = card_sums.setdefault(
+            cr.card_id,
+            {"total_answers": 0, "correct_answers": 0, "time_sum_seconds": 0},
         )
-
-        if stats.card_stats is None:
-            stats.card_stats = {}
-
-        for cr in card_results:
-            card_id = cr.card_id
-            if card_id not in stats.card_stats:
-                stats.card_stats[card_id] = {
-                    "total": 0,
-                    "correct": 0,
-                    "avg_time_seconds": 0,
-                }
-
-            card_stat = stats.card_stats[card_id]
-            old_card_total = card_stat["total"]
-            new_card_total = old_card_total + 1
-
-            card_stat["total"] = new_card_total
-            if cr.correct:
-                card_stat["correct"] += 1
-
-            card_stat["avg_time_seconds"] = int(
-                (
-                    card_stat["avg_time_seconds"] * old_card_total
-                    + cr.answer_time_seconds
+        card_sum["total_answers"] += 1
+        card_sum["correct_answers"] += 1 if cr.correct else 0
+        card_sum["time_sum_seconds"] += cr.answer_time_seconds
+    if not card_sums:
+        return
+
+    stmt = insert(DeckCardStats).values(
+        [
+            {"deck_id": deck_id, "card_id": card_id, **card_sum}
+            for card_id, card_sum in card_sums.items()
+        ]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["deck_id", "card_id"],
+            set_={
+                column: getattr(DeckCardStats, column)
+                + getattr(stmt.excluded, column)
+                for column in (
+                    "total_answers",
+                    "correct_answers",
+                    "time_sum_seconds",
                 )
-                / new_card_total
-            )
-
-            card_stat["correct_rate"] = card_stat["correct"] / new_card_total
-
-    await session.flush()
-    return stats
-
-
-async def get_deck_stats(session: AsyncSession, deck_id: int) -> DeckStats:
-    stats = await session.get(DeckStats, deck_id)
-    if stats is None:
-        stats = DeckStats(
-            deck_id=deck_id,
-            total_tests=0,
-            avg_score=0.0,
-            correct_rate=0.0,
-            avg_time_seconds=0,
-            card_stats=None,
+            },
         )
-        session.add(stats)
-        await session.flush()
-    return stats
+    )
+
+
+async def get_deck_stats(
+    session: AsyncSession, deck_id: int
+) -> Dict[str, Any]:
+    """Статистика колоды одним запросом по первичным ключам"""
+    result = await session.execute(
+        select(DeckStats, DeckCardStats)
+        .outerjoin(DeckCardStats, DeckCardStats.deck_id == DeckStats.deck_id)
+        .where(DeckStats.deck_id == deck_id)
+    )
+    rows = result.all()
+    stats = rows[0][0] if rows else None
+    total_tests = stats.total_tests if stats else 0
+
+    card_stats: Dict[int, Dict[str, Any]] = {}
+    for _, card in rows:
+        if card is None or not card.total_answers:
+            continue
+        card_stats[card.card_id] = {
+            "total": card.total_answers,
+            "correct": card.correct_answers,
+            "avg_time_seconds": int(
+                card.time_sum_seconds / card.total_answers
+            ),
+            "correct_rate": card.correct_answers / card.total_answers,
+        }
+
+    return {
+        "deck_id": deck_id,
+        "total_tests": total_tests,
+        "avg_score": stats.score_sum / total_tests if total_tests else 0.0,
+        "correct_rate": (
+            stats.passed_tests / total_tests if total_tests else 0.0
+        ),
+        "avg_time_seconds": (
+            int(stats.time_sum_seconds / total_tests) if total_tests else 0
+        ),
+        "card_stats": card_stats or None,
+    }
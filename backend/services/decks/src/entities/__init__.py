@@ -3,7 +3,9 @@ from .card import Card
 from .card_result import CardResult
 from .category import Category, deck_categories
 from .deck import Deck
+from .deck_card_stats import DeckCardStats
 from .deck_stats import DeckStats
+from .learn_answer import LearnAnswer
 from .learn_session import LearnSession
 from .tag import Tag, deck_tags
 from .test_result import TestResult
@@ -19,7 +21,9 @@ __all__ = [
     "Tag",
     "UserCardStats",
     "LearnSession",
+    "LearnAnswer",
     "DeckStats",
+    "DeckCardStats",
     "deck_categories",
     "deck_tags",
 ]
@@ -17,13 +17,15 @@ class Card(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     deck_id = Column(
-        Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False
+        Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False, index=True
     )
     front_text = Column(Text, nullable=False)
     front_image_url = Column(String, nullable=True)
     back_text = Column(Text, nullable=False)
     back_image_url = Column(String, nullable=True)
     order_index = Column(Integer, nullable=False, default=0)
+    # Растет при изменении содержимого; статистика старой версии считается сброшенной
+    content_version = Column(Integer, nullable=False, default=1)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
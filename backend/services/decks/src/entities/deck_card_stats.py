@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from . import Base
+
+
+class DeckCardStats(Base):
+    """Суммы по ответам на карточку в тестах; средние считаются при чтении"""
+
+    __tablename__ = "deck_card_stats"
+
+    deck_id = Column(
+        Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True
+    )
+    card_id = Column(
+        Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_answers = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    time_sum_seconds = Column(Integer, default=0, nullable=False)
@@ -1,15 +1,17 @@
-from sqlalchemy import Column, Integer, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, Float, ForeignKey
 from . import Base
 
 
 class DeckStats(Base):
+    """Суммы по тестам колоды; средние считаются при чтении"""
+
     __tablename__ = "deck_statistics"
 
     deck_id = Column(
         Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True
     )
     total_tests = Column(Integer, default=0, nullable=False)
-    avg_score = Column(Float, default=0.0, nullable=False)
-    correct_rate = Column(Float, default=0.0, nullable=False)
-    avg_time_seconds = Column(Integer, default=0, nullable=False)
-    card_stats = Column(JSON, nullable=True)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    # Тесты с долей верных ответов не ниже 0.5
+    passed_tests = Column(Integer, default=0, nullable=False)
+    time_sum_seconds = Column(Integer, default=0, nullable=False)
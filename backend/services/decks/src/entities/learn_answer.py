@@ -0,0 +1,35 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+from . import Base
+
+
+class LearnAnswer(Base):
+    """Примененный ответ из пакета: по idempotency_key повторы пропускаются"""
+
+    __tablename__ = "learn_answers"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "idempotency_key", name="uq_learn_answers_user_key"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    session_id = Column(
+        Integer, ForeignKey("learn_sessions.id", ondelete="CASCADE"), nullable=False
+    )
+    card_id = Column(
+        Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False
+    )
+    idempotency_key = Column(String(64), nullable=False)
+    correct = Column(Boolean, nullable=False)
+    answer_time_seconds = Column(Integer, nullable=False)
+    answered_at = Column(DateTime(timezone=True), nullable=False)
@@ -11,9 +11,14 @@ class LearnSession(Base):
         Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False
     )
     status = Column(String(32), default="active", nullable=False)
+    # weights — веса внутри сессии, srs — интервальное повторение по due_at
+    mode = Column(String(16), default="weights", nullable=False)
     started_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     ended_at = Column(DateTime(timezone=True), nullable=True)
     total_cards = Column(Integer, default=0, nullable=False)
     learned_cards = Column(Integer, default=0, nullable=False)
+    # Сдвигается при изменении статистики и карточек сессии: очереди
+    # LEARN_SCHEDULER=queue в памяти процессов сверяются с ней при чтении
+    queue_version = Column(Integer, default=0, nullable=False)
@@ -1,9 +1,31 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Boolean, Index
 from . import Base
 
 
 class UserCardStats(Base):
     __tablename__ = "user_card_stats"
+    # Уникальный ключ для upsert ответа; колонки веса в INCLUDE:
+    # ранжирование в БД читает только индекс
+    __table_args__ = (
+        Index(
+            "ix_user_card_stats_user_card",
+            "user_id",
+            "card_id",
+            unique=True,
+            postgresql_include=[
+                "success_count",
+                "fail_count",
+                "total_answers",
+                "streak",
+                "difficulty_score",
+                "is_learned",
+                "last_result",
+                "last_answered_at",
+            ],
+        ),
+        # Выбор карточек к повторению: due_at <= now по возрастанию
+        Index("ix_user_card_stats_user_due", "user_id", "due_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, nullable=False)
@@ -19,3 +41,12 @@ class UserCardStats(Base):
     is_learned = Column(Boolean, default=False, nullable=False)
     last_result = Column(Boolean, nullable=True)
     last_answered_at = Column(DateTime(timezone=True), nullable=True)
+    # Когда выученная карточка последний раз была забыта (неверный ответ)
+    last_lapse_at = Column(DateTime(timezone=True), nullable=True)
+    # Интервальное повторение (SM-2); due_at пуст у еще не изученных карточек
+    repetitions = Column(Integer, default=0, nullable=False)
+    interval_days = Column(Float, default=0.0, nullable=False)
+    ease = Column(Float, default=2.5, nullable=False)
+    due_at = Column(DateTime(timezone=True), nullable=True)
+    # Версия содержимого карточки, к которой относятся streak/is_learned
+    card_version = Column(Integer, default=1, nullable=False)
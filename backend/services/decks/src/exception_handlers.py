@@ -1,7 +1,11 @@
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 
-from src.exceptions import CategoryNotFoundError, CategoryAlreadyExistsError
+from src.exceptions import (
+    CardsNotInDeckError,
+    CategoryAlreadyExistsError,
+    CategoryNotFoundError,
+)
 
 
 async def category_not_found_handler(
@@ -26,6 +30,15 @@ async def category_already_exists_handler(
     )
 
 
+async def cards_not_in_deck_handler(
+    request: Request, exc: CardsNotInDeckError
+):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"error": "Cards not in deck", "card_ids": exc.card_ids},
+    )
+
+
 def register_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(
         CategoryNotFoundError, category_not_found_handler
@@ -33,3 +46,6 @@ def register_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(
         CategoryAlreadyExistsError, category_already_exists_handler
     )
+    app.add_exception_handler(
+        CardsNotInDeckError, cards_not_in_deck_handler
+    )
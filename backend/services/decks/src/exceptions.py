@@ -9,3 +9,9 @@ class CategoryAlreadyExistsError(Exception):
         self.field = field
         self.value = value
         super().__init__(f"Category with {field} '{value}' already exists")
+
+
+class CardsNotInDeckError(Exception):
+    def __init__(self, card_ids: list[int]):
+        self.card_ids = card_ids
+        super().__init__(f"Cards not in deck: {card_ids}")
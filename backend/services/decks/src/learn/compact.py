@@ -0,0 +1,27 @@
+"""Сброс статистики, заработанной на прошлых версиях содержимого карточек.
+
+После правки карточки такая статистика уже считается сброшенной при чтении;
+задача только записывает сброс в user_card_stats порциями по
+LEARN_COMPACT_CHUNK_SIZE записей. Запуск из корня сервиса (по расписанию):
+
+    python -m src.learn.compact
+"""
+
+import asyncio
+import os
+
+from src.database.core import async_session_maker, engine
+from src.learn.service import compact_stale_stats
+
+LEARN_COMPACT_CHUNK_SIZE = int(os.getenv("LEARN_COMPACT_CHUNK_SIZE", 1000))
+
+
+async def main():
+    async with async_session_maker() as session:
+        updated = await compact_stale_stats(session, LEARN_COMPACT_CHUNK_SIZE)
+    await engine.dispose()
+    print(f"Stale card stats compacted: {updated}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
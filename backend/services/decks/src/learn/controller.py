@@ -1,31 +1,47 @@
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth import UserContext, get_current_user
 from src.database.core import get_async_db_session
-from src.entities import Deck
+from src.entities import Card, Deck
 from src.learn.models import (
+    LEARN_FORECAST_MAX_DAYS,
     SLearnAnswer,
+    SLearnAnswerBatch,
+    SLearnAnswerBatchResponse,
     SLearnBatchResponse,
+    SLearnCard,
+    SLearnForecastDay,
+    SLearnForecastResponse,
     SLearnProgressResponse,
+    SLearnReviewAnswerResponse,
+    SLearnReviewCard,
     SLearnSessionCreateResponse,
     SLearnSessionResponse,
 )
 from src.learn.service import (
     finish_session,
-    get_next_card,
+    get_cards,
+    get_next_cards,
     get_session,
+    list_review_cards,
     record_answer,
+    record_answers,
+    record_review_answer,
+    review_forecast,
     start_session,
-    update_session_progress,
 )
 from src.monitoring.business_metrics import (
     learn_sessions_completed_total,
     learn_sessions_finished_total,
     learn_sessions_started_total,
 )
+from src.utils.storage import BUCKET_CARDS, get_storage_client
+
+# Максимальное число карточек в одном ответе next?count=N
+LEARN_PREFETCH_MAX = 50
 
 router = APIRouter(prefix="/api/learn", tags=["learn"])
 
@@ -35,6 +51,7 @@ def _session_to_response(learn_session) -> SLearnSessionResponse:
         id=learn_session.id,
         deck_id=learn_session.deck_id,
         status=learn_session.status,
+        mode=learn_session.mode,
         total_cards=learn_session.total_cards,
         learned_cards=learn_session.learned_cards,
         started_at=learn_session.started_at.isoformat(),
@@ -44,6 +61,23 @@ def _session_to_response(learn_session) -> SLearnSessionResponse:
     )
 
 
+def _presigned_url(signer, object_key: Optional[str]) -> Optional[str]:
+    if object_key and not object_key.startswith("temp/"):
+        return signer.presigned_get_url(BUCKET_CARDS, object_key)
+    return object_key
+
+
+def _card_to_response(card: Card) -> SLearnCard:
+    signer = get_storage_client()
+    return SLearnCard(
+        card_id=card.id,
+        front_text=card.front_text,
+        back_text=card.back_text,
+        front_image_url=_presigned_url(signer, card.front_image_url),
+        back_image_url=_presigned_url(signer, card.back_image_url),
+    )
+
+
 def _progress_response(learn_session) -> SLearnProgressResponse:
     total = max(learn_session.total_cards, 1)
     progress = learn_session.learned_cards / total
@@ -59,6 +93,7 @@ def _progress_response(learn_session) -> SLearnProgressResponse:
 @router.post("/deck/{deck_id}/sessions", response_model=SLearnSessionCreateResponse)
 async def create_learn_session(
     deck_id: int,
+    mode: Optional[str] = Query(None, pattern="^(weights|srs)$"),
     session: AsyncSession = Depends(get_async_db_session),
     user: Optional[UserContext] = Depends(get_current_user),
 ):
@@ -68,7 +103,7 @@ async def create_learn_session(
     if deck.cards_amount == 0:
         raise HTTPException(status_code=400, detail="Deck has no cards")
 
-    learn_session = await start_session(session, deck_id, user.id)
+    learn_session = await start_session(session, deck_id, user.id, mode)
     progress = learn_session.learned_cards / max(learn_session.total_cards, 1)
     await session.commit()
     learn_sessions_started_total.inc()
@@ -78,6 +113,75 @@ async def create_learn_session(
     )
 
 
+@router.get("/deck/{deck_id}/forecast", response_model=SLearnForecastResponse)
+async def get_review_forecast(
+    deck_id: int,
+    days: int = Query(30, ge=1, le=LEARN_FORECAST_MAX_DAYS),
+    session: AsyncSession = Depends(get_async_db_session),
+    user: Optional[UserContext] = Depends(get_current_user),
+):
+    deck = await session.get(Deck, deck_id)
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    forecast = await review_forecast(session, deck_id, user.id, days)
+    return SLearnForecastResponse(
+        deck_id=deck_id,
+        days=[SLearnForecastDay(date=day, due=due) for day, due in forecast],
+    )
+
+
+@router.get("/review", response_model=List[SLearnReviewCard])
+async def get_review_queue(
+    response: Response,
+    cursor: Optional[str] = Query(
+        None, description="Use X-Next-Cursor of the previous page for pagination"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_db_session),
+    user: Optional[UserContext] = Depends(get_current_user),
+):
+    page = await list_review_cards(session, user.id, cursor=cursor, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    items, next_cursor = page
+    if next_cursor and response is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        SLearnReviewCard(
+            **_card_to_response(card).model_dump(),
+            deck_id=card.deck_id,
+            due_at=stats.due_at,
+        )
+        for stats, card in items
+    ]
+
+
+@router.post(
+    "/review/cards/{card_id}/answer", response_model=SLearnReviewAnswerResponse
+)
+async def submit_review_answer(
+    card_id: int,
+    payload: SLearnAnswer,
+    session: AsyncSession = Depends(get_async_db_session),
+    user: Optional[UserContext] = Depends(get_current_user),
+):
+    result = await record_review_answer(
+        session, user.id, card_id, payload.correct, payload.quality
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Card not found")
+    stats, deck_id = result
+    await session.commit()
+    return SLearnReviewAnswerResponse(
+        card_id=card_id,
+        deck_id=deck_id,
+        is_learned=stats.is_learned,
+        interval_days=stats.interval_days,
+        due_at=stats.due_at,
+    )
+
+
 @router.get("/sessions/{session_id}", response_model=SLearnSessionResponse)
 async def get_learn_session(
     session_id: int,
@@ -93,6 +197,7 @@ async def get_learn_session(
 @router.get("/sessions/{session_id}/next", response_model=SLearnBatchResponse)
 async def get_next_card_endpoint(
     session_id: int,
+    count: Optional[int] = Query(None, ge=1, le=LEARN_PREFETCH_MAX),
     session: AsyncSession = Depends(get_async_db_session),
     user: Optional[UserContext] = Depends(get_current_user),
 ):
@@ -102,14 +207,15 @@ async def get_next_card_endpoint(
     if learn_session.status != "active":
         raise HTTPException(status_code=400, detail="Learn session is not active")
 
-    card_id = await get_next_card(session, learn_session, user.id)
-    await update_session_progress(session, learn_session, user.id)
+    card_ids = await get_next_cards(session, learn_session, user.id, count or 1)
+    cards = await get_cards(session, card_ids) if count else None
     await session.commit()
     total = max(learn_session.total_cards, 1)
     progress = learn_session.learned_cards / total
     return SLearnBatchResponse(
         session_id=learn_session.id,
-        card_id=card_id,
+        card_id=card_ids[0] if card_ids else None,
+        cards=[_card_to_response(card) for card in cards] if count else None,
         learned_cards=learn_session.learned_cards,
         total_cards=total,
         progress=progress,
@@ -124,6 +230,7 @@ async def submit_answer(
     session_id: int,
     card_id: int,
     payload: SLearnAnswer,
+    include_next: bool = Query(False, alias="next"),
     session: AsyncSession = Depends(get_async_db_session),
     user: Optional[UserContext] = Depends(get_current_user),
 ):
@@ -133,17 +240,49 @@ async def submit_answer(
     if learn_session.status != "active":
         raise HTTPException(status_code=400, detail="Learn session is not active")
 
-    await record_answer(
+    recorded = await record_answer(
         session,
         learn_session,
         user.id,
         card_id,
         payload.correct,
         payload.answer_time_seconds,
+        payload.quality,
     )
-    await update_session_progress(session, learn_session, user.id)
+    if not recorded:
+        raise HTTPException(status_code=404, detail="Card not found")
+    next_cards = []
+    if include_next and learn_session.status == "active":
+        next_cards = await get_cards(
+            session, await get_next_cards(session, learn_session, user.id, 1)
+        )
     await session.commit()
-    return _progress_response(learn_session)
+    response = _progress_response(learn_session)
+    if next_cards:
+        response.next_card = _card_to_response(next_cards[0])
+    return response
+
+
+@router.post("/sessions/{session_id}/answers", response_model=SLearnAnswerBatchResponse)
+async def submit_answers(
+    session_id: int,
+    payload: SLearnAnswerBatch,
+    session: AsyncSession = Depends(get_async_db_session),
+    user: Optional[UserContext] = Depends(get_current_user),
+):
+    learn_session = await get_session(session, session_id, user.id)
+    if not learn_session:
+        raise HTTPException(status_code=404, detail="Learn session not found")
+    if learn_session.status != "active":
+        raise HTTPException(status_code=400, detail="Learn session is not active")
+
+    applied = await record_answers(session, learn_session, user.id, payload.answers)
+    await session.commit()
+    return SLearnAnswerBatchResponse(
+        **_progress_response(learn_session).model_dump(),
+        applied=applied,
+        duplicates=len(payload.answers) - applied,
+    )
 
 
 @router.get("/sessions/{session_id}/progress", response_model=SLearnProgressResponse)
@@ -155,8 +294,6 @@ async def get_session_progress(
     learn_session = await get_session(session, session_id, user.id)
     if not learn_session:
         raise HTTPException(status_code=404, detail="Learn session not found")
-    await update_session_progress(session, learn_session, user.id)
-    await session.commit()
     return _progress_response(learn_session)
 
 
@@ -170,7 +307,6 @@ async def finish_learn_session(
     if not learn_session:
         raise HTTPException(status_code=404, detail="Learn session not found")
     await finish_session(session, learn_session)
-    await update_session_progress(session, learn_session, user.id)
     await session.commit()
     learn_sessions_finished_total.inc()
     if learn_session.learned_cards == learn_session.total_cards == 1:
@@ -1,11 +1,18 @@
+from datetime import date, datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Максимальное число ответов в одном пакете
+LEARN_ANSWERS_BATCH_MAX = 500
+# Максимальный горизонт прогноза повторений, дней
+LEARN_FORECAST_MAX_DAYS = 365
 
 
 class SLearnSession(BaseModel):
     id: int
     deck_id: int
     status: str
+    mode: str = "weights"
     total_cards: int
     learned_cards: int
 
@@ -20,9 +27,23 @@ class SLearnSessionCreateResponse(BaseModel):
     progress: float
 
 
+class SLearnCard(BaseModel):
+    card_id: int
+    front_text: str
+    back_text: str
+    front_image_url: Optional[str] = None
+    back_image_url: Optional[str] = None
+
+
+class SLearnReviewCard(SLearnCard):
+    deck_id: int
+    due_at: Optional[datetime] = None
+
+
 class SLearnBatchResponse(BaseModel):
     session_id: int
     card_id: Optional[int] = None
+    cards: Optional[List[SLearnCard]] = None
     learned_cards: int
     total_cards: int
     progress: float
@@ -31,6 +52,20 @@ class SLearnBatchResponse(BaseModel):
 class SLearnAnswer(BaseModel):
     correct: bool
     answer_time_seconds: int
+    # Оценка SM-2 для режима srs; без нее выводится из correct
+    quality: Optional[int] = Field(None, ge=0, le=5)
+
+
+class SLearnBatchAnswer(SLearnAnswer):
+    card_id: int
+    idempotency_key: str = Field(min_length=1, max_length=64)
+    answered_at: Optional[datetime] = None
+
+
+class SLearnAnswerBatch(BaseModel):
+    answers: List[SLearnBatchAnswer] = Field(
+        min_length=1, max_length=LEARN_ANSWERS_BATCH_MAX
+    )
 
 
 class SLearnProgressResponse(BaseModel):
@@ -39,3 +74,27 @@ class SLearnProgressResponse(BaseModel):
     total_cards: int
     progress: float
     is_completed: bool
+    next_card: Optional[SLearnCard] = None
+
+
+class SLearnAnswerBatchResponse(SLearnProgressResponse):
+    applied: int
+    duplicates: int
+
+
+class SLearnForecastDay(BaseModel):
+    date: date
+    due: int
+
+
+class SLearnForecastResponse(BaseModel):
+    deck_id: int
+    days: List[SLearnForecastDay]
+
+
+class SLearnReviewAnswerResponse(BaseModel):
+    card_id: int
+    deck_id: int
+    is_learned: bool
+    interval_days: float
+    due_at: Optional[datetime] = None
@@ -0,0 +1,24 @@
+"""Пересчет счетчиков learned_cards/total_cards активных сессий обучения.
+
+Счетчики ведутся инкрементально; задача исправляет расхождения, например после
+ручных правок БД. Запуск из корня сервиса (по расписанию или вручную):
+
+    python -m src.learn.repair
+"""
+
+import asyncio
+
+from src.database.core import async_session_maker, engine
+from src.learn.service import repair_session_counters
+
+
+async def main():
+    async with async_session_maker() as session:
+        await repair_session_counters(session)
+        await session.commit()
+    await engine.dispose()
+    print("Learn session counters repaired")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
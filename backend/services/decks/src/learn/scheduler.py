@@ -0,0 +1,191 @@
+import heapq
+import os
+import random
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import Float, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+# Способ выбора следующей карточки: sql — ранжирование в БД, queue — очередь
+# в памяти процесса, сверяемая с LearnSession.queue_version
+LEARN_SCHEDULER = os.getenv("LEARN_SCHEDULER", "queue")
+LEARN_QUEUE_MAX_SESSIONS = int(os.getenv("LEARN_QUEUE_MAX_SESSIONS", 10000))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite возвращает naive datetime, время в БД хранится в UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _hours(value: datetime) -> float:
+    return _as_utc(value).timestamp() / 3600
+
+
+class epoch_hours(FunctionElement):
+    """SQL-аналог _hours: часы с начала эпохи для колонки DateTime"""
+
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(epoch_hours)
+def _epoch_hours(element, compiler, **kw):
+    return "EXTRACT(EPOCH FROM %s) / 3600.0" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch_hours, "sqlite")
+def _epoch_hours_sqlite(element, compiler, **kw):
+    # julianday начала эпохи Unix; время в SQLite хранится в UTC без смещения
+    return "(julianday(%s) - 2440587.5) * 24.0" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+class CardQueue:
+    """Очередь карточек активной сессии обучения с приоритетом по весу.
+
+    Вес карточки = base_weight + time_weight * часов с последнего ответа.
+    Слагаемое time_weight * now общее для всех отвеченных карточек, поэтому
+    в куче хранится base_weight - time_weight * last_answered_at, а время
+    учитывается только при сравнении вершин куч в peek. У неотвеченных карточек
+    время фиксировано (unanswered_hours), они лежат в отдельной куче.
+
+    Обновление карточки добавляет новую запись, старая пропускается при peek.
+    """
+
+    def __init__(self, deck_id: int, time_weight: float, unanswered_hours: float):
+        self.deck_id = deck_id
+        self.time_weight = time_weight
+        self.unanswered_hours = unanswered_hours
+        self._unanswered: list[tuple[float, float, int, int]] = []
+        self._answered: list[tuple[float, float, int, int]] = []
+        self._versions: dict[int, int] = {}
+
+    def __contains__(self, card_id: int) -> bool:
+        return card_id in self._versions
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def update(
+        self, card_id: int, base_weight: float, last_answered_at: Optional[datetime]
+    ) -> None:
+        version = self._versions.get(card_id, 0) + 1
+        self._versions[card_id] = version
+        # Случайное второе поле — случайный выбор среди карточек с равным весом
+        if last_answered_at is None:
+            key = base_weight + self.time_weight * self.unanswered_hours
+            heapq.heappush(self._unanswered, (-key, random.random(), card_id, version))
+        else:
+            key = base_weight - self.time_weight * _hours(last_answered_at)
+            heapq.heappush(self._answered, (-key, random.random(), card_id, version))
+
+        if len(self._unanswered) + len(self._answered) > 2 * len(self._versions) + 16:
+            self._compact()
+
+    def _is_current(self, entry: tuple[float, float, int, int]) -> bool:
+        return self._versions.get(entry[2]) == entry[3]
+
+    def _compact(self) -> None:
+        self._unanswered = [e for e in self._unanswered if self._is_current(e)]
+        self._answered = [e for e in self._answered if self._is_current(e)]
+        heapq.heapify(self._unanswered)
+        heapq.heapify(self._answered)
+
+    def _top(self, heap: list) -> Optional[tuple[float, float, int, int]]:
+        while heap and not self._is_current(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def top(self, now: datetime, count: int) -> list[int]:
+        """count карточек по убыванию веса на момент now (остаются в очереди)"""
+        unanswered = heapq.nsmallest(
+            count, (e for e in self._unanswered if self._is_current(e))
+        )
+        answered = heapq.nsmallest(
+            count, (e for e in self._answered if self._is_current(e))
+        )
+        shift = self.time_weight * _hours(now)
+        weighted = [(-e[0], e[1], e[2]) for e in unanswered]
+        weighted += [(-e[0] + shift, e[1], e[2]) for e in answered]
+        weighted.sort(key=lambda item: (-item[0], item[1]))
+        return [card_id for _, _, card_id in weighted[:count]]
+
+    def peek(self, now: datetime) -> Optional[int]:
+        """Карточка с наибольшим весом на момент now (остается в очереди)"""
+        unanswered = self._top(self._unanswered)
+        answered = self._top(self._answered)
+        if unanswered is None or answered is None:
+            top = unanswered or answered
+            return top[2] if top else None
+
+        unanswered_weight = -unanswered[0]
+        answered_weight = -answered[0] + self.time_weight * _hours(now)
+        if unanswered_weight == answered_weight:
+            return random.choice([unanswered[2], answered[2]])
+        if unanswered_weight > answered_weight:
+            return unanswered[2]
+        return answered[2]
+
+
+class LearnQueues:
+    """Очереди активных сессий в памяти процесса (LRU по числу сессий).
+
+    Очередь — кеш: при отсутствии она заново строится из UserCardStats.
+    Очередь хранится с версией сессии (LearnSession.queue_version), из которой
+    построена; версию в БД сдвигают ответы и изменения карточек колоды в любом
+    процессе, и очередь с другой версией не возвращается. Изменения очередей
+    применяются только после commit транзакции (after_commit).
+    """
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self._queues: OrderedDict[int, tuple[int, CardQueue]] = OrderedDict()
+
+    def get(self, session_id: int, version: int) -> Optional[CardQueue]:
+        entry = self._queues.get(session_id)
+        if entry is None or entry[0] != version:
+            return None
+        self._queues.move_to_end(session_id)
+        return entry[1]
+
+    def set(self, session_id: int, version: int, queue: CardQueue) -> None:
+        self._queues[session_id] = (version, queue)
+        self._queues.move_to_end(session_id)
+        while len(self._queues) > self.max_sessions:
+            self._queues.popitem(last=False)
+
+    def discard(self, session_id: int) -> None:
+        self._queues.pop(session_id, None)
+
+    def clear(self) -> None:
+        self._queues.clear()
+
+
+_PENDING_CHANGES = "after_commit_pending"
+
+
+def after_commit(session: AsyncSession, change: Callable[[], None]) -> None:
+    """Выполнить change после commit транзакции session; откат его отбрасывает"""
+    session.sync_session.info.setdefault(_PENDING_CHANGES, []).append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    for change in session.info.pop(_PENDING_CHANGES, []):
+        change()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_changes(session: Session) -> None:
+    session.info.pop(_PENDING_CHANGES, None)
+
+
+learn_queues = LearnQueues(LEARN_QUEUE_MAX_SESSIONS)
@@ -1,7 +1,11 @@
+import base64
+import heapq
+import json
 import logging
 import os
 import random
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timedelta, timezone
+from functools import partial
 from typing import Optional
 
 from event_contracts.base import EventEnvelope
@@ -12,10 +16,25 @@ from event_contracts.learning.v1 import (
 from event_contracts.learning.v1 import (
     LearningSessionStarted as EventLearningSessionStarted,
 )
-from sqlalchemy import and_, select
+from sqlalchemy import Float, and_, case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from src.entities import Card, Deck, LearnSession, UserCardStats
+from src.entities import Card, Deck, LearnAnswer, LearnSession, UserCardStats
+from src.exceptions import CardsNotInDeckError
+from src.learn.models import SLearnBatchAnswer
+from src.learn.scheduler import (
+    LEARN_SCHEDULER,
+    CardQueue,
+    _as_utc,
+    _hours,
+    after_commit,
+    epoch_hours,
+    learn_queues,
+)
+from src.learn.state import LEARN_STATE_MAX_DIRTY, learn_state
 
 logger = logging.getLogger(__name__)
 producer = KafkaProducer(os.getenv("KAFKA_BROKER_URL"))
@@ -28,12 +47,23 @@ W_TIME = 0.05
 W_DIFFICULTY = 2.0
 W_STREAK = 2.0
 W_LAST_ERROR = 5.0
+# Считается, что на карточку без ответов не отвечали столько часов
+UNANSWERED_HOURS = 100.0
+
+# Режим srs: интервальное повторение по алгоритму SM-2
+SRS_MIN_EASE = 1.3
+# Оценка ответа (0-5), если клиент передал только correct
+SRS_QUALITY_CORRECT = 4
+SRS_QUALITY_WRONG = 1
 
 
 async def start_session(
-    session: AsyncSession, deck_id: int, user_id: int
+    session: AsyncSession, deck_id: int, user_id: int, mode: Optional[str] = None
 ) -> LearnSession:
-    """Создать или вернуть активную сессию обучения."""
+    """Создать или вернуть активную сессию обучения.
+
+    mode меняет режим активной сессии; без него режим сохраняется.
+    """
     existing = await session.execute(
         select(LearnSession).where(
             and_(
@@ -45,25 +75,29 @@ async def start_session(
     )
     learn_session = existing.scalars().first()
     if learn_session:
-        await ensure_user_card_stats(session, deck_id, user_id)
-        await update_session_progress(session, learn_session, user_id)
+        learn_queues.discard(learn_session.id)
+        if mode is not None and mode != learn_session.mode:
+            if learn_state.enabled:
+                await learn_state.flush(session, learn_session.id, drop=True)
+            learn_session.mode = mode
+            # Ответы в режиме srs не сдвигают версию очереди режима weights
+            await _bump_queue_version(session, learn_session)
+        await _apply_state_counters(learn_session)
         return learn_session
 
     deck = await session.get(Deck, deck_id)
     if not deck:
         raise ValueError("Deck not found")
 
-    cards_query = await session.execute(select(Card.id).where(Card.deck_id == deck_id))
-    card_ids = cards_query.scalars().all()
-    total_cards = len(card_ids)
-
-    await ensure_user_card_stats(session, deck_id, user_id, card_ids)
-    await reset_stats_if_all_learned(session, deck_id, user_id)
+    mode = mode or "weights"
+    if mode == "weights":
+        await reset_stats_if_all_learned(session, deck_id, user_id)
 
     learn_session = LearnSession(
         user_id=user_id,
         deck_id=deck_id,
-        total_cards=total_cards,
+        mode=mode,
+        total_cards=0,
         learned_cards=0,
     )
     session.add(learn_session)
@@ -102,34 +136,96 @@ async def start_session(
     return learn_session
 
 
+def _insert(dialect_name: str):
+    return postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+
+
+def _empty_stats(user_id: int, card_id: int, card_version: int) -> UserCardStats:
+    """Статистика карточки без ответов; отсутствующая запись равна ей"""
+    return UserCardStats(
+        user_id=user_id,
+        card_id=card_id,
+        card_version=card_version,
+        success_count=0,
+        fail_count=0,
+        total_answers=0,
+        correct_rate=0.0,
+        streak=0,
+        difficulty_score=0.5,
+        is_learned=False,
+        last_result=None,
+        last_answered_at=None,
+        last_lapse_at=None,
+        repetitions=0,
+        interval_days=0.0,
+        ease=2.5,
+        due_at=None,
+    )
+
+
+def _reset_if_stale(stats: UserCardStats, card_version: int) -> None:
+    """Сбросить прогресс, заработанный на прошлой версии содержимого карточки"""
+    if stats.card_version != card_version:
+        stats.streak = 0
+        stats.is_learned = False
+        stats.difficulty_score = 0.5
+        stats.card_version = card_version
+
+
+def _is_current():
+    """Условие: статистика относится к текущей версии карточки (с join Card)"""
+    return UserCardStats.card_version == Card.content_version
+
+
+def _is_learned_current():
+    return UserCardStats.is_learned & _is_current()
+
+
 async def ensure_user_card_stats(
     session: AsyncSession,
     deck_id: int,
     user_id: int,
     card_ids: Optional[list[int]] = None,
 ) -> None:
-    """Создать отсутствующие записи статистики для пользователя."""
-    if card_ids is None:
-        cards_query = await session.execute(
-            select(Card.id).where(Card.deck_id == deck_id)
-        )
-        card_ids = cards_query.scalars().all()
-    if not card_ids:
-        return
+    """Создать отсутствующие записи статистики одним INSERT ... ON CONFLICT DO NOTHING.
 
-    existing_query = await session.execute(
-        select(UserCardStats.card_id).where(
-            (UserCardStats.user_id == user_id) & (UserCardStats.card_id.in_(card_ids))
-        )
+    Записи создаются при первом ответе; массово — только там, где нужны строки
+    (состояние сессии в Redis, пакет ответов).
+    """
+    cards = select(literal(user_id), Card.id, Card.content_version).where(
+        Card.deck_id == deck_id
+    )
+    if card_ids is not None:
+        if not card_ids:
+            return
+        cards = cards.where(Card.id.in_(card_ids))
+    insert = _insert(session.get_bind().dialect.name)
+    await session.execute(
+        insert(UserCardStats)
+        .from_select(["user_id", "card_id", "card_version"], cards)
+        .on_conflict_do_nothing(index_elements=["user_id", "card_id"])
     )
-    existing = set(existing_query.scalars().all())
 
-    for card_id in card_ids:
-        if card_id in existing:
-            continue
-        stats = UserCardStats(
-            user_id=user_id,
-            card_id=card_id,
+
+async def reset_stats_if_all_learned(
+    session: AsyncSession, deck_id: int, user_id: int
+) -> bool:
+    result = await session.execute(
+        select(
+            _deck_cards_count(deck_id),
+            _deck_stats_count(user_id, deck_id, _is_learned_current()),
+        )
+    )
+    total, learned = result.one()
+    if not total or learned < total:
+        return False
+    await session.execute(
+        update(UserCardStats)
+        .where(
+            (UserCardStats.user_id == user_id)
+            & UserCardStats.card_id.in_(select(Card.id).where(Card.deck_id == deck_id))
+        )
+        .values(
             success_count=0,
             fail_count=0,
             total_answers=0,
@@ -140,33 +236,9 @@ async def ensure_user_card_stats(
             last_result=None,
             last_answered_at=None,
         )
-        session.add(stats)
-    await session.flush()
-
-
-async def reset_stats_if_all_learned(
-    session: AsyncSession, deck_id: int, user_id: int
-) -> None:
-    stats_query = await session.execute(
-        select(UserCardStats)
-        .join(Card, Card.id == UserCardStats.card_id)
-        .where((Card.deck_id == deck_id) & (UserCardStats.user_id == user_id))
+        .execution_options(synchronize_session="fetch")
     )
-    stats = stats_query.scalars().all()
-    if not stats:
-        return
-    if all(stat.is_learned for stat in stats):
-        for stat in stats:
-            stat.success_count = 0
-            stat.fail_count = 0
-            stat.total_answers = 0
-            stat.correct_rate = 0.0
-            stat.streak = 0
-            stat.difficulty_score = 0.5
-            stat.is_learned = False
-            stat.last_result = None
-            stat.last_answered_at = None
-        await session.flush()
+    return True
 
 
 async def get_session(
@@ -177,16 +249,93 @@ async def get_session(
             (LearnSession.id == session_id) & (LearnSession.user_id == user_id)
         )
     )
-    return result.scalars().first()
+    learn_session = result.scalars().first()
+    if learn_session is not None:
+        await _apply_state_counters(learn_session)
+    return learn_session
+
+
+async def _apply_state_counters(learn_session: LearnSession) -> None:
+    """Подставить счетчики из состояния в Redis, еще не записанные в БД"""
+    if not learn_state.enabled:
+        return
+    counters = await learn_state.get_counters(learn_session.id)
+    if counters is not None:
+        set_committed_value(learn_session, "total_cards", counters[0])
+        set_committed_value(learn_session, "learned_cards", counters[1])
 
 
 async def reset_cycle_if_needed(
-    session: AsyncSession, deck_id: int, user_id: int
+    session: AsyncSession, learn_session: LearnSession, user_id: int
 ) -> None:
-    await reset_stats_if_all_learned(session, deck_id, user_id)
+    if await reset_stats_if_all_learned(session, learn_session.deck_id, user_id):
+        learn_session.learned_cards = 0
+        await _bump_queue_version(session, learn_session)
 
 
-def _compute_weight(stat: UserCardStats) -> float:
+async def _bump_queue_version(
+    session: AsyncSession, learn_session: LearnSession
+) -> int:
+    """Сдвинуть LearnSession.queue_version в БД; возвращает прежнюю версию.
+
+    Очереди этой сессии в памяти всех процессов перестроятся при чтении.
+    """
+    result = await session.execute(
+        update(LearnSession)
+        .where(LearnSession.id == learn_session.id)
+        .values(queue_version=LearnSession.queue_version + 1)
+        .returning(LearnSession.queue_version)
+        .execution_options(synchronize_session=False)
+    )
+    version = result.scalar_one()
+    set_committed_value(learn_session, "queue_version", version)
+    return version - 1
+
+
+def _uses_card_queue(learn_session: LearnSession) -> bool:
+    return (
+        LEARN_SCHEDULER == "queue"
+        and learn_session.mode != "srs"
+        and not learn_state.enabled
+    )
+
+
+async def _update_card_queue(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    stats: list[UserCardStats],
+    version: Optional[int] = None,
+) -> None:
+    """Обновить приоритеты отвеченных карточек в очереди сессии после commit.
+
+    Очередь обновляется, только если с ее версии сессию никто не менял,
+    иначе она перестроится при следующем чтении. version — прежняя версия,
+    если ее уже сдвинул запрос ответа.
+    """
+    if not _uses_card_queue(learn_session):
+        return
+    if version is None:
+        version = await _bump_queue_version(session, learn_session)
+    # После commit объекты ORM истекают: значения берутся сейчас
+    updates = [
+        (stat.card_id, _base_weight(stat), stat.last_answered_at) for stat in stats
+    ]
+    session_id = learn_session.id
+
+    def apply() -> None:
+        queue = learn_queues.get(session_id, version)
+        if queue is None:
+            return
+        for card_id, base_weight, last_answered_at in updates:
+            if card_id in queue:
+                queue.update(card_id, base_weight, last_answered_at)
+        learn_queues.set(session_id, version + 1, queue)
+
+    after_commit(session, apply)
+
+
+def _base_weight(stat: UserCardStats) -> float:
+    """Вес карточки без слагаемого, зависящего от времени"""
     weight = 0.0
     if stat.total_answers == 0:
         weight += 100.0
@@ -195,73 +344,211 @@ def _compute_weight(stat: UserCardStats) -> float:
     weight += W_FAIL * stat.fail_count
     weight -= W_SUCCESS * stat.success_count
     weight += W_STREAK * max(0, TARGET_STREAK - stat.streak)
+    weight += W_DIFFICULTY * stat.difficulty_score
+    if stat.is_learned:
+        weight -= 50.0
+    return weight
 
+
+def _compute_weight(stat: UserCardStats) -> float:
     if stat.last_answered_at is None:
-        hours_since = 100.0
+        hours_since = UNANSWERED_HOURS
     else:
         hours_since = (
             datetime.now(timezone.utc) - stat.last_answered_at
         ).total_seconds() / 3600
-    weight += W_TIME * hours_since
+    return _base_weight(stat) + W_TIME * hours_since
 
-    weight += W_DIFFICULTY * stat.difficulty_score
-    if stat.is_learned:
-        weight -= 50.0
-    return weight
 
+def _weight_expression(now: datetime):
+    """_compute_weight в виде SQL-выражения над колонками UserCardStats.
 
-async def get_next_card(
-    session: AsyncSession, learn_session: LearnSession, user_id: int
-) -> Optional[int]:
-    await ensure_user_card_stats(session, learn_session.deck_id, user_id)
-    await reset_cycle_if_needed(session, learn_session.deck_id, user_id)
+    Колонки отсутствующей записи (внешнее соединение) — значения _empty_stats.
+    """
+    # Устаревшая по версии карточки статистика (и отсутствующая) — как сброшенная
+    current = _is_current()
+    total_answers = func.coalesce(UserCardStats.total_answers, 0)
+    streak = case((current, UserCardStats.streak), else_=0)
+    hours_since = case(
+        (UserCardStats.last_answered_at.is_(None), UNANSWERED_HOURS),
+        else_=literal(_hours(now)) - epoch_hours(UserCardStats.last_answered_at),
+    )
+    return (
+        case((total_answers == 0, 100.0), else_=0.0)
+        + case((UserCardStats.last_result.is_(False), W_LAST_ERROR), else_=0.0)
+        + W_FAIL * func.coalesce(UserCardStats.fail_count, 0)
+        - W_SUCCESS * func.coalesce(UserCardStats.success_count, 0)
+        + W_STREAK
+        * case(
+            (streak < TARGET_STREAK, TARGET_STREAK - streak),
+            else_=0,
+        )
+        + W_DIFFICULTY * case((current, UserCardStats.difficulty_score), else_=0.5)
+        + case((current & UserCardStats.is_learned, -50.0), else_=0.0)
+        + W_TIME * hours_since
+    )
 
-    stats_query = await session.execute(
-        select(UserCardStats, Card)
-        .join(Card, Card.id == UserCardStats.card_id)
-        .where(
-            (Card.deck_id == learn_session.deck_id) & (UserCardStats.user_id == user_id)
+
+async def rank_cards(
+    session: AsyncSession, deck_id: int, user_id: int, limit: int = 1
+) -> list[int]:
+    """id карточек по убыванию веса, посчитанного в БД (равные — в случайном порядке)"""
+    weight = _weight_expression(datetime.now(timezone.utc)).label("weight")
+    result = await session.execute(
+        select(Card.id)
+        .outerjoin(
+            UserCardStats,
+            (UserCardStats.card_id == Card.id) & (UserCardStats.user_id == user_id),
         )
+        .where(Card.deck_id == deck_id)
+        .order_by(weight.desc(), func.random())
+        .limit(limit)
     )
-    rows = stats_query.all()
-    if not rows:
-        return None
+    return list(result.scalars().all())
 
-    weighted = []
-    for stat, card in rows:
-        weighted.append((_compute_weight(stat), card.id))
-    if not weighted:
-        return None
 
-    max_weight = max(weighted, key=lambda x: x[0])[0]
-    top_cards = [card_id for weight, card_id in weighted if weight == max_weight]
-    return random.choice(top_cards) if top_cards else None
+async def _deck_card_stats(
+    session: AsyncSession, deck_id: int, user_id: int
+) -> list[UserCardStats]:
+    """Статистика всех карточек колоды; для карточек без записи — _empty_stats"""
+    result = await session.execute(
+        select(Card.id, Card.content_version, UserCardStats)
+        .outerjoin(
+            UserCardStats,
+            (UserCardStats.card_id == Card.id) & (UserCardStats.user_id == user_id),
+        )
+        .where(Card.deck_id == deck_id)
+    )
+    stats = []
+    for card_id, version, stat in result.all():
+        if stat is None:
+            stat = _empty_stats(user_id, card_id, version)
+        _reset_if_stale(stat, version)
+        stats.append(stat)
+    return stats
 
 
-async def record_answer(
+async def _build_card_queue(
+    session: AsyncSession, learn_session: LearnSession, user_id: int
+) -> CardQueue:
+    await reset_cycle_if_needed(session, learn_session, user_id)
+    queue = CardQueue(learn_session.deck_id, W_TIME, UNANSWERED_HOURS)
+    for stat in await _deck_card_stats(session, learn_session.deck_id, user_id):
+        queue.update(stat.card_id, _base_weight(stat), stat.last_answered_at)
+    return queue
+
+
+async def _load_learn_state(
+    session: AsyncSession, learn_session: LearnSession, user_id: int
+) -> list[UserCardStats]:
+    # Состояние записывается в БД по id записей: они нужны для всех карточек
+    await ensure_user_card_stats(session, learn_session.deck_id, user_id)
+    await reset_cycle_if_needed(session, learn_session, user_id)
+    stats = await _deck_card_stats(session, learn_session.deck_id, user_id)
+    await session.flush()
+    await learn_state.save(learn_session, user_id, stats)
+    return await learn_state.get_stats(learn_session.id)
+
+
+async def get_due_cards(
     session: AsyncSession,
-    learn_session: LearnSession,
+    deck_id: int,
     user_id: int,
-    card_id: int,
-    correct: bool,
-    answer_time_seconds: int,
-) -> None:
-    stats_query = await session.execute(
-        select(UserCardStats).where(
-            (UserCardStats.user_id == user_id) & (UserCardStats.card_id == card_id)
+    count: int,
+    now: Optional[datetime] = None,
+) -> list[int]:
+    """Карточки с наступившим due_at (сначала самые давние), затем новые.
+
+    Повторения выбираются по индексу (user_id, due_at), новые — по порядку
+    карточек в колоде; статистика у новых карточек может еще не существовать.
+    """
+    now = now or datetime.now(timezone.utc)
+    due_query = await session.execute(
+        select(UserCardStats.card_id)
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(
+            (UserCardStats.user_id == user_id)
+            & (UserCardStats.due_at <= now)
+            & (Card.deck_id == deck_id)
         )
+        .order_by(UserCardStats.due_at, UserCardStats.card_id)
+        .limit(count)
     )
-    stats = stats_query.scalars().first()
-    if not stats:
-        stats = UserCardStats(
-            user_id=user_id,
-            card_id=card_id,
+    card_ids = list(due_query.scalars().all())
+    if len(card_ids) < count:
+        new_query = await session.execute(
+            select(Card.id)
+            .outerjoin(
+                UserCardStats,
+                (UserCardStats.card_id == Card.id) & (UserCardStats.user_id == user_id),
+            )
+            .where((Card.deck_id == deck_id) & UserCardStats.due_at.is_(None))
+            .order_by(Card.order_index, Card.id)
+            .limit(count - len(card_ids))
         )
-        session.add(stats)
-        await session.flush()
+        card_ids += new_query.scalars().all()
+    return card_ids
+
+
+async def get_next_cards(
+    session: AsyncSession, learn_session: LearnSession, user_id: int, count: int
+) -> list[int]:
+    """count карточек по убыванию веса; очередь сессии строится при первом вызове.
+
+    В режиме srs — карточки к повторению по due_at.
+    """
+    if learn_session.mode == "srs":
+        return await get_due_cards(session, learn_session.deck_id, user_id, count)
 
+    if learn_state.enabled:
+        stats = await learn_state.get_stats(learn_session.id)
+        if stats is None:
+            stats = await _load_learn_state(session, learn_session, user_id)
+        ranked = heapq.nlargest(
+            count, stats, key=lambda stat: (_compute_weight(stat), random.random())
+        )
+        return [stat.card_id for stat in ranked]
+
+    if LEARN_SCHEDULER == "sql":
+        await reset_cycle_if_needed(session, learn_session, user_id)
+        return await rank_cards(session, learn_session.deck_id, user_id, count)
+
+    queue = learn_queues.get(learn_session.id, learn_session.queue_version)
+    if queue is None:
+        queue = await _build_card_queue(session, learn_session, user_id)
+        # Очередь построена в текущей транзакции: сохраняется после ее commit
+        after_commit(
+            session,
+            partial(
+                learn_queues.set, learn_session.id, learn_session.queue_version, queue
+            ),
+        )
+        if not queue:
+            return []
     now = datetime.now(timezone.utc)
+    if count == 1:
+        card_id = queue.peek(now)
+        return [card_id] if card_id is not None else []
+    return queue.top(now, count)
+
+
+async def get_next_card(
+    session: AsyncSession, learn_session: LearnSession, user_id: int
+) -> Optional[int]:
+    card_ids = await get_next_cards(session, learn_session, user_id, 1)
+    return card_ids[0] if card_ids else None
+
 
+async def get_cards(session: AsyncSession, card_ids: list[int]) -> list[Card]:
+    """Карточки одним запросом в порядке card_ids"""
+    if not card_ids:
+        return []
+    result = await session.execute(select(Card).where(Card.id.in_(card_ids)))
+    cards = {card.id: card for card in result.scalars().all()}
+    return [cards[card_id] for card_id in card_ids if card_id in cards]
+
+
+def _apply_answer(stats: UserCardStats, correct: bool, answered_at: datetime) -> None:
     if correct:
         stats.success_count += 1
         stats.streak += 1
@@ -270,6 +557,8 @@ async def record_answer(
         stats.fail_count += 1
         stats.streak = 0
         stats.last_result = False
+        if stats.is_learned:
+            stats.last_lapse_at = answered_at
         stats.is_learned = False
 
     stats.total_answers = stats.success_count + stats.fail_count
@@ -286,39 +575,795 @@ async def record_answer(
         )
 
     stats.is_learned = stats.streak >= TARGET_STREAK
-    stats.last_answered_at = now
+    stats.last_answered_at = answered_at
 
-    await session.flush()
-    await update_session_progress(session, learn_session, user_id)
 
+def _answer_quality(correct: bool, quality: Optional[int]) -> int:
+    if quality is not None:
+        return quality
+    return SRS_QUALITY_CORRECT if correct else SRS_QUALITY_WRONG
 
-async def update_session_progress(
-    session: AsyncSession, learn_session: LearnSession, user_id: int
+
+def _apply_review(
+    stats: UserCardStats, correct: bool, quality: Optional[int], reviewed_at: datetime
 ) -> None:
-    stats_query = await session.execute(
-        select(UserCardStats.is_learned)
+    _apply_answer(stats, correct, reviewed_at)
+    _schedule_review(stats, _answer_quality(correct, quality), reviewed_at)
+
+
+def _schedule_review(stats: UserCardStats, quality: int, reviewed_at: datetime) -> None:
+    """Следующее повторение карточки по SM-2 (quality от 0 до 5).
+
+    Ошибка (quality < 3) сбрасывает повторения, но не меняет ease.
+    """
+    if quality >= 3:
+        if stats.repetitions == 0:
+            stats.interval_days = 1.0
+        elif stats.repetitions == 1:
+            stats.interval_days = 6.0
+        else:
+            stats.interval_days = stats.interval_days * stats.ease
+        stats.repetitions += 1
+        stats.ease = max(
+            SRS_MIN_EASE,
+            stats.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+        )
+    else:
+        stats.repetitions = 0
+        stats.interval_days = 1.0
+    stats.due_at = reviewed_at + timedelta(days=stats.interval_days)
+
+
+async def review_forecast(
+    session: AsyncSession, deck_id: int, user_id: int, days: int
+) -> list[tuple[date, int]]:
+    """Число повторений по дням (UTC) на days дней вперед; просроченные — сегодня"""
+    today = datetime.now(timezone.utc).date()
+    until = datetime.combine(today + timedelta(days=days), time(), timezone.utc)
+    due_at = UserCardStats.due_at
+    if session.get_bind().dialect.name == "postgresql":
+        # date() от timestamptz берется в часовом поясе сессии БД, а дни — в UTC
+        due_at = func.timezone("UTC", due_at)
+    due_date = func.date(due_at)
+    result = await session.execute(
+        select(due_date, func.count(UserCardStats.id))
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(
+            (UserCardStats.user_id == user_id)
+            & (UserCardStats.due_at < until)
+            & (Card.deck_id == deck_id)
+        )
+        .group_by(due_date)
+    )
+    counts = dict.fromkeys((today + timedelta(days=i) for i in range(days)), 0)
+    for value, due in result.all():
+        # SQLite возвращает дату строкой
+        day = value if isinstance(value, date) else date.fromisoformat(value)
+        counts[max(day, today)] += due
+    return list(counts.items())
+
+
+def _upsert_answer(
+    dialect_name: str,
+    user_id: int,
+    deck_id: int,
+    card_id: int,
+    correct: bool,
+    answered_at: datetime,
+):
+    """INSERT ... SELECT ... ON CONFLICT DO UPDATE ... RETURNING с логикой _apply_answer.
+
+    Строка для вставки выбирается из карточки колоды deck_id: для чужой карточки
+    ничего не вставляется и RETURNING пуст. В SET колонки справа — значения
+    до обновления, excluded.card_version — текущая версия карточки (streak
+    и is_learned старой версии не учитываются).
+    """
+    insert = _insert(dialect_name)
+    success = int(correct)
+    columns = {
+        "user_id": literal(user_id),
+        "card_id": Card.id,
+        "card_version": Card.content_version,
+        "success_count": literal(success),
+        "fail_count": literal(1 - success),
+        "total_answers": literal(1),
+        "correct_rate": literal(float(success)),
+        "streak": literal(success),
+        "difficulty_score": literal(0.3 if correct else 0.8),
+        "is_learned": literal(success >= TARGET_STREAK),
+        "last_result": literal(correct),
+        "last_answered_at": literal(answered_at, UserCardStats.last_answered_at.type),
+    }
+    stmt = insert(UserCardStats).from_select(
+        list(columns),
+        select(*columns.values()).where(
+            (Card.id == card_id) & (Card.deck_id == deck_id)
+        ),
+    )
+    current = UserCardStats.card_version == stmt.excluded.card_version
+    answered = UserCardStats.success_count + UserCardStats.fail_count
+    if correct:
+        streak = case((current, UserCardStats.streak), else_=0) + 1
+        changes = {
+            "success_count": UserCardStats.success_count + 1,
+            "streak": streak,
+            "is_learned": streak >= TARGET_STREAK,
+        }
+    else:
+        changes = {
+            "fail_count": UserCardStats.fail_count + 1,
+            "streak": 0,
+            "is_learned": False,
+            "last_lapse_at": case(
+                (current & UserCardStats.is_learned, answered_at),
+                else_=UserCardStats.last_lapse_at,
+            ),
+        }
+    changes.update(
+        total_answers=answered + 1,
+        correct_rate=(UserCardStats.success_count + success) * 1.0 / (answered + 1),
+        difficulty_score=case(
+            (answered == 0, 0.3 if correct else 0.8),
+            else_=(UserCardStats.fail_count + (1 - success)) * 1.0 / (answered + 2),
+        ),
+        last_result=correct,
+        last_answered_at=answered_at,
+        card_version=stmt.excluded.card_version,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "card_id"], set_=changes
+    ).returning(UserCardStats)
+
+
+async def _answer_stats(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    user_id: int,
+    card_id: int,
+    correct: bool,
+    answered_at: datetime,
+) -> Optional[tuple[bool, UserCardStats, Optional[int]]]:
+    """Записать ответ одним upsert: (было ли выучено до ответа, новая статистика,
+    прежняя версия очереди сессии, если upsert ее сдвинул).
+
+    None — карточки нет в колоде. Прежняя выученность выводится из новой
+    строки: is_learned всегда равен streak >= TARGET_STREAK, поэтому верный
+    ответ был на выученную карточку, если streak стал больше TARGET_STREAK,
+    а неверный — если upsert записал last_lapse_at этого ответа.
+    """
+    dialect_name = session.get_bind().dialect.name
+    stmt = _upsert_answer(
+        dialect_name,
+        user_id,
+        learn_session.deck_id,
+        card_id,
+        correct,
+        answered_at,
+    )
+    columns = [UserCardStats]
+    # В PostgreSQL версия очереди сдвигается тем же запросом (UPDATE в CTE)
+    bump = dialect_name == "postgresql" and _uses_card_queue(learn_session)
+    if bump:
+        bumped = (
+            update(LearnSession)
+            .where(LearnSession.id == learn_session.id)
+            .values(queue_version=LearnSession.queue_version + 1)
+            .returning(LearnSession.queue_version)
+            .cte("queue_bump")
+        )
+        version = select(bumped.c.queue_version).scalar_subquery().label("version")
+        stmt = stmt.add_cte(bumped).returning(version)
+        columns.append(version)
+    result = await session.execute(
+        select(*columns).from_statement(stmt),
+        execution_options={"populate_existing": True},
+    )
+    row = result.first()
+    if row is None:
+        return None
+    stats = row[0]
+    if correct:
+        was_learned = stats.streak > TARGET_STREAK
+    else:
+        was_learned = (
+            stats.last_lapse_at is not None
+            and _as_utc(stats.last_lapse_at) == answered_at
+        )
+    if not bump:
+        return was_learned, stats, None
+    set_committed_value(learn_session, "queue_version", row[1])
+    return was_learned, stats, row[1] - 1
+
+
+async def _record_answer_in_state(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    card_id: int,
+    correct: bool,
+    answered_at: datetime,
+) -> bool:
+    result = await learn_state.apply_answer(
+        learn_session.id,
+        card_id,
+        lambda stats: _apply_answer(stats, correct, answered_at),
+    )
+    if result is None:
+        return False
+    _, total, learned, dirty = result
+    set_committed_value(learn_session, "total_cards", total)
+    set_committed_value(learn_session, "learned_cards", learned)
+    _complete_if_learned(learn_session)
+    completed = learn_session.status == "completed"
+    if completed or dirty >= LEARN_STATE_MAX_DIRTY:
+        await learn_state.flush(session, learn_session.id, drop=completed)
+    return True
+
+
+async def record_answer(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    user_id: int,
+    card_id: int,
+    correct: bool,
+    answer_time_seconds: int,
+    quality: Optional[int] = None,
+) -> bool:
+    """Записать ответ одним атомарным upsert и обновить счетчик и очередь сессии.
+
+    Возвращает False, если карточки нет в колоде сессии.
+    """
+    now = datetime.now(timezone.utc)
+    if learn_session.mode == "srs":
+        return await _record_review(
+            session, learn_session, user_id, card_id, correct, quality
+        )
+    if learn_state.enabled:
+        if await _record_answer_in_state(session, learn_session, card_id, correct, now):
+            return True
+        # Карточки нет в состоянии (добавлена после его загрузки): пишем в БД
+        await learn_state.flush(session, learn_session.id, drop=True)
+
+    result = await _answer_stats(session, learn_session, user_id, card_id, correct, now)
+    if result is None:
+        return False
+    was_learned, stats, version = result
+    _add_learned_cards(learn_session, stats.is_learned - was_learned)
+    await _update_card_queue(session, learn_session, [stats], version)
+    return True
+
+
+async def _record_review(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    user_id: int,
+    card_id: int,
+    correct: bool,
+    quality: Optional[int],
+) -> bool:
+    """Ответ в режиме srs: статистика и следующее повторение под блокировкой строки.
+
+    Возвращает False, если карточки нет в колоде сессии.
+    """
+    await ensure_user_card_stats(session, learn_session.deck_id, user_id, [card_id])
+    result = await session.execute(
+        select(UserCardStats, Card.content_version)
         .join(Card, Card.id == UserCardStats.card_id)
         .where(
-            (Card.deck_id == learn_session.deck_id) & (UserCardStats.user_id == user_id)
+            (UserCardStats.user_id == user_id)
+            & (UserCardStats.card_id == card_id)
+            & (Card.deck_id == learn_session.deck_id)
+        )
+        .with_for_update(of=UserCardStats)
+    )
+    row = result.first()
+    if row is None:
+        return False
+    stats, version = row
+    _reset_if_stale(stats, version)
+    was_learned = stats.is_learned
+    _apply_review(stats, correct, quality, datetime.now(timezone.utc))
+    _add_learned_cards(learn_session, stats.is_learned - was_learned)
+    await session.flush()
+    return True
+
+
+async def _review_page(
+    session: AsyncSession, conditions: list, order_by: tuple, limit: int, weight
+) -> list[tuple[UserCardStats, Card, Optional[float]]]:
+    result = await session.execute(
+        select(UserCardStats, Card, weight)
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(and_(*conditions))
+        .order_by(*order_by)
+        .limit(limit)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def _review_cursor(
+    snapshot: datetime, stats: UserCardStats, weight: Optional[float]
+) -> str:
+    """Курсор очереди повторений: момент первой страницы и ключ сортировки
+    последней записи (due_at или вес на этот момент) с ее id"""
+    data = {
+        "at": snapshot.isoformat(),
+        "id": stats.id,
+        "due_at": None if weight is not None else _as_utc(stats.due_at).isoformat(),
+        "weight": weight,
+    }
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def _parse_review_cursor(cursor: str) -> Optional[dict]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor))
+        return {
+            "at": datetime.fromisoformat(data["at"]),
+            "id": int(data["id"]),
+            "due_at": (
+                datetime.fromisoformat(data["due_at"]) if data["due_at"] else None
+            ),
+            "weight": None if data["weight"] is None else float(data["weight"]),
+        }
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def list_review_cards(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    cursor: Optional[str],
+    limit: int,
+) -> Optional[tuple[list[tuple[UserCardStats, Card]], Optional[str]]]:
+    """Карточки всех колод пользователя к повторению.
+
+    Сначала карточки с наступившим due_at (режим srs) по due_at и id статистики,
+    затем карточки без due_at (режим weights) по убыванию веса и id. Все
+    страницы считаются на момент первой: курсор хранит его и ключ последней
+    записи, поэтому вес, зависящий от времени, не сдвигает страницы.
+    None — курсор не разобран.
+    """
+    now = datetime.now(timezone.utc)
+    last = None
+    if cursor is not None:
+        last = _parse_review_cursor(cursor)
+        if last is None:
+            return None
+        now = last["at"]
+    weight = _weight_expression(now)
+    due = [UserCardStats.user_id == user_id, UserCardStats.due_at <= now]
+    unscheduled = [UserCardStats.user_id == user_id, UserCardStats.due_at.is_(None)]
+    if last is not None and last["weight"] is not None:
+        # Карточки с due_at уже отданы на прошлых страницах
+        due = None
+        unscheduled.append(
+            (weight < last["weight"])
+            | ((weight == last["weight"]) & (UserCardStats.id > last["id"]))
+        )
+    elif last is not None:
+        due.append(
+            (UserCardStats.due_at > last["due_at"])
+            | (
+                (UserCardStats.due_at == last["due_at"])
+                & (UserCardStats.id > last["id"])
+            )
+        )
+
+    items = []
+    if due is not None:
+        items = await _review_page(
+            session,
+            due,
+            (UserCardStats.due_at, UserCardStats.id),
+            limit,
+            literal(None, Float),
+        )
+    if len(items) < limit:
+        items += await _review_page(
+            session,
+            unscheduled,
+            (weight.desc(), UserCardStats.id),
+            limit - len(items),
+            weight,
+        )
+    next_cursor = None
+    if len(items) == limit:
+        stats, _, last_weight = items[-1]
+        next_cursor = _review_cursor(now, stats, last_weight)
+    return [(stats, card) for stats, card, _ in items], next_cursor
+
+
+async def record_review_answer(
+    session: AsyncSession,
+    user_id: int,
+    card_id: int,
+    correct: bool,
+    quality: Optional[int] = None,
+) -> Optional[tuple[UserCardStats, int]]:
+    """Ответ из общей очереди повторений: статистика карточки и активная
+    сессия ее колоды обновляются так же, как при ответе в сессии.
+
+    Возвращает (статистика, deck_id) или None, если статистики нет.
+    """
+    result = await session.execute(
+        select(UserCardStats, Card.deck_id, Card.content_version)
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where((UserCardStats.user_id == user_id) & (UserCardStats.card_id == card_id))
+        .with_for_update(of=UserCardStats)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    stats, deck_id, version = row
+
+    sessions_query = await session.execute(
+        select(LearnSession).where(
+            (LearnSession.user_id == user_id)
+            & (LearnSession.deck_id == deck_id)
+            & (LearnSession.status == "active")
         )
     )
-    stats = stats_query.scalars().all()
-    total = len(stats)
-    learned = sum(1 for value in stats if value)
-    learn_session.total_cards = max(learn_session.total_cards, total)
-    learn_session.learned_cards = learned
+    learn_session = sessions_query.scalars().first()
+    if learn_session is not None and learn_state.enabled:
+        # Состояние сессии в Redis устарело бы после ответа в БД
+        await learn_state.flush(session, learn_session.id, drop=True)
+        await session.refresh(stats)
+
+    _reset_if_stale(stats, version)
+    was_learned = stats.is_learned
+    now = datetime.now(timezone.utc)
+    # SM-2 только для карточек в режиме srs: карточка режима weights
+    # (без due_at, сессия колоды не srs) не получает срок повторения
+    if stats.due_at is not None or (
+        learn_session is not None and learn_session.mode == "srs"
+    ):
+        _apply_review(stats, correct, quality, now)
+    else:
+        _apply_answer(stats, correct, now)
+    if learn_session is not None:
+        _add_learned_cards(learn_session, stats.is_learned - was_learned)
+        await _update_card_queue(session, learn_session, [stats])
+    await session.flush()
+    return stats, deck_id
+
+
+# Колонки статистики, которые меняют ответы (_apply_answer, _apply_review)
+_ANSWER_STATS_COLUMNS = (
+    "card_version",
+    "success_count",
+    "fail_count",
+    "total_answers",
+    "correct_rate",
+    "streak",
+    "difficulty_score",
+    "is_learned",
+    "last_result",
+    "last_answered_at",
+    "last_lapse_at",
+    "repetitions",
+    "interval_days",
+    "ease",
+    "due_at",
+)
+
+
+def _upsert_stats(dialect_name: str, stats: list[UserCardStats]):
+    """Один INSERT ... VALUES ... ON CONFLICT DO UPDATE для посчитанных строк"""
+    insert = _insert(dialect_name)
+    stmt = insert(UserCardStats).values(
+        [
+            {
+                column: getattr(stat, column)
+                for column in ("user_id", "card_id", *_ANSWER_STATS_COLUMNS)
+            }
+            for stat in stats
+        ]
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "card_id"],
+        set_={column: stmt.excluded[column] for column in _ANSWER_STATS_COLUMNS},
+    ).returning(UserCardStats)
+
+
+async def record_answers(
+    session: AsyncSession,
+    learn_session: LearnSession,
+    user_id: int,
+    answers: list[SLearnBatchAnswer],
+) -> int:
+    """Применить пакет ответов по порядку, пропуская уже примененные ключи.
+
+    Ключи вставляются первыми (ON CONFLICT DO NOTHING): конфликт — повтор,
+    в том числе из параллельного такого же пакета. Статистика карточек
+    читается одним запросом и записывается одним upsert, прогресс сессии
+    пересчитывается один раз. Возвращает число примененных.
+    """
+    card_ids = {answer.card_id for answer in answers}
+    cards_query = await session.execute(
+        select(Card.id, Card.content_version).where(
+            (Card.deck_id == learn_session.deck_id) & (Card.id.in_(card_ids))
+        )
+    )
+    versions = dict(cards_query.all())
+    if set(versions) != card_ids:
+        raise CardsNotInDeckError(sorted(card_ids - set(versions)))
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": user_id,
+            "session_id": learn_session.id,
+            "card_id": answer.card_id,
+            "idempotency_key": answer.idempotency_key,
+            "correct": answer.correct,
+            "answer_time_seconds": answer.answer_time_seconds,
+            # Время клиента не может быть в будущем относительно сервера
+            "answered_at": (
+                min(_as_utc(answer.answered_at), now) if answer.answered_at else now
+            ),
+        }
+        for answer in answers
+    ]
+    insert = _insert(session.get_bind().dialect.name)
+    keys_query = await session.execute(
+        insert(LearnAnswer)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "idempotency_key"])
+        .returning(LearnAnswer.idempotency_key)
+    )
+    inserted = set(keys_query.scalars().all())
+    new_answers = []
+    for answer, row in zip(answers, rows):
+        # Повтор ключа внутри пакета: вставлено только первое вхождение
+        if answer.idempotency_key in inserted:
+            inserted.discard(answer.idempotency_key)
+            new_answers.append((answer, row["answered_at"]))
+    if not new_answers:
+        return 0
+
+    if learn_state.enabled:
+        # Пакет применяется к БД: сначала записываем и сбрасываем состояние
+        await learn_state.flush(session, learn_session.id, drop=True)
+    answered_ids = sorted({answer.card_id for answer, _ in new_answers})
+    await ensure_user_card_stats(session, learn_session.deck_id, user_id, answered_ids)
+    # Блокировка строк: параллельные ответы с других устройств ждут транзакцию.
+    # Строки читаются как значения колонок и считаются вне сессии ORM
+    stats_query = await session.execute(
+        select(*UserCardStats.__table__.columns)
+        .where(
+            (UserCardStats.user_id == user_id)
+            & (UserCardStats.card_id.in_(answered_ids))
+        )
+        .with_for_update()
+    )
+    stats = {row.card_id: UserCardStats(**row._mapping) for row in stats_query}
+    for card_id, stat in stats.items():
+        _reset_if_stale(stat, versions[card_id])
+    was_learned = sum(1 for stat in stats.values() if stat.is_learned)
+
+    for answer, answered_at in new_answers:
+        if learn_session.mode == "srs":
+            _apply_review(
+                stats[answer.card_id], answer.correct, answer.quality, answered_at
+            )
+        else:
+            _apply_answer(stats[answer.card_id], answer.correct, answered_at)
+    learned = sum(1 for stat in stats.values() if stat.is_learned)
+    _add_learned_cards(learn_session, learned - was_learned)
+
+    result = await session.execute(
+        select(UserCardStats).from_statement(
+            _upsert_stats(session.get_bind().dialect.name, list(stats.values()))
+        ),
+        execution_options={"populate_existing": True},
+    )
+    await _update_card_queue(session, learn_session, result.scalars().all())
+    return len(new_answers)
+
+
+def _complete_if_learned(learn_session: LearnSession) -> None:
+    # Сессия повторений не завершается: карточки возвращаются по due_at
+    if learn_session.mode == "srs":
+        return
     if (
         learn_session.total_cards > 0
         and learn_session.learned_cards >= learn_session.total_cards
     ):
         learn_session.status = "completed"
         learn_session.ended_at = datetime.now(timezone.utc)
+        learn_queues.discard(learn_session.id)
+
+
+def _add_learned_cards(learn_session: LearnSession, delta: int) -> None:
+    """Сдвинуть счетчик выученных карточек после смены is_learned"""
+    if delta:
+        learn_session.learned_cards = max(0, learn_session.learned_cards + delta)
+        _complete_if_learned(learn_session)
+
+
+def _deck_cards_count(deck_id):
+    """Скалярный подзапрос: число карточек колоды"""
+    return select(func.count(Card.id)).where(Card.deck_id == deck_id).scalar_subquery()
+
+
+def _deck_stats_count(user_id, deck_id, *conditions):
+    """Скалярный подзапрос: число записей статистики пользователя по колоде"""
+    return (
+        select(func.count(UserCardStats.id))
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(
+            (Card.deck_id == deck_id) & (UserCardStats.user_id == user_id), *conditions
+        )
+        .scalar_subquery()
+    )
+
+
+async def update_session_progress(
+    session: AsyncSession, learn_session: LearnSession, user_id: int
+) -> None:
+    """Пересчитать счетчики сессии по карточкам колоды и UserCardStats."""
+    result = await session.execute(
+        select(
+            _deck_cards_count(learn_session.deck_id),
+            _deck_stats_count(user_id, learn_session.deck_id, _is_learned_current()),
+        )
+    )
+    learn_session.total_cards, learn_session.learned_cards = result.one()
+    _complete_if_learned(learn_session)
     await session.flush()
 
 
+async def add_card_to_sessions(session: AsyncSession, deck_id: int) -> None:
+    """Учесть новую карточку колоды в активных сессиях"""
+    if learn_state.enabled:
+        await learn_state.invalidate_deck(session, deck_id)
+    await session.execute(
+        update(LearnSession)
+        .where((LearnSession.deck_id == deck_id) & (LearnSession.status == "active"))
+        .values(
+            total_cards=LearnSession.total_cards + 1,
+            queue_version=LearnSession.queue_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _learned_by_session_user(card_id: int):
+    """EXISTS: пользователь сессии выучил текущую версию карточки"""
+    return (
+        select(UserCardStats.id)
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(
+            (UserCardStats.card_id == card_id)
+            & (UserCardStats.user_id == LearnSession.user_id)
+            & _is_learned_current()
+        )
+        .exists()
+    )
+
+
+async def reset_card_in_sessions(
+    session: AsyncSession, deck_id: int, card_id: int
+) -> None:
+    """Учесть сброс прогресса по карточке в активных сессиях (до смены ее версии)"""
+    if learn_state.enabled:
+        await learn_state.invalidate_deck(session, deck_id)
+    is_learned = _learned_by_session_user(card_id)
+    await session.execute(
+        update(LearnSession)
+        .where((LearnSession.deck_id == deck_id) & (LearnSession.status == "active"))
+        .values(
+            learned_cards=LearnSession.learned_cards - case((is_learned, 1), else_=0),
+            queue_version=LearnSession.queue_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def remove_card_from_sessions(
+    session: AsyncSession, deck_id: int, card_id: int
+) -> None:
+    """Учесть удаление карточки в активных сессиях (до удаления ее статистики)"""
+    if learn_state.enabled:
+        await learn_state.invalidate_deck(session, deck_id)
+    is_learned = _learned_by_session_user(card_id)
+    await session.execute(
+        update(LearnSession)
+        .where(
+            (LearnSession.deck_id == deck_id)
+            & (LearnSession.status == "active")
+            & (LearnSession.total_cards > 0)
+        )
+        .values(
+            total_cards=LearnSession.total_cards - 1,
+            learned_cards=LearnSession.learned_cards - case((is_learned, 1), else_=0),
+            queue_version=LearnSession.queue_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await complete_learned_sessions(session, deck_id)
+
+
+async def complete_learned_sessions(
+    session: AsyncSession, deck_id: Optional[int] = None
+) -> None:
+    """Завершить активные сессии, в которых выучены все карточки"""
+    condition = (
+        (LearnSession.status == "active")
+        & (LearnSession.mode != "srs")
+        & (LearnSession.total_cards > 0)
+        & (LearnSession.learned_cards >= LearnSession.total_cards)
+    )
+    if deck_id is not None:
+        condition &= LearnSession.deck_id == deck_id
+    await session.execute(
+        update(LearnSession)
+        .where(condition)
+        .values(status="completed", ended_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def compact_stale_stats(session: AsyncSession, chunk_size: int = 1000) -> int:
+    """Применить сброс к статистике устаревших версий карточек.
+
+    UPDATE по chunk_size записей с фиксацией после каждой порции, чтобы не
+    держать долгие блокировки. Возвращает число обновленных записей.
+    """
+    stale_ids = (
+        select(UserCardStats.id)
+        .join(Card, Card.id == UserCardStats.card_id)
+        .where(UserCardStats.card_version != Card.content_version)
+        .limit(chunk_size)
+    )
+    card_version = (
+        select(Card.content_version)
+        .where(Card.id == UserCardStats.card_id)
+        .scalar_subquery()
+    )
+    total = 0
+    while True:
+        ids = (await session.execute(stale_ids)).scalars().all()
+        if not ids:
+            return total
+        await session.execute(
+            update(UserCardStats)
+            .where(UserCardStats.id.in_(ids))
+            .values(
+                streak=0,
+                is_learned=False,
+                difficulty_score=0.5,
+                card_version=card_version,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        total += len(ids)
+
+
+async def repair_session_counters(session: AsyncSession) -> None:
+    """Пересчитать счетчики всех активных сессий одним UPDATE"""
+    await session.execute(
+        update(LearnSession)
+        .where(LearnSession.status == "active")
+        .values(
+            total_cards=_deck_cards_count(LearnSession.deck_id),
+            learned_cards=_deck_stats_count(
+                LearnSession.user_id, LearnSession.deck_id, _is_learned_current()
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await complete_learned_sessions(session)
+
+
 async def finish_session(session: AsyncSession, learn_session: LearnSession) -> None:
+    if learn_state.enabled:
+        await learn_state.flush(session, learn_session.id, drop=True)
     learn_session.status = "completed"
     learn_session.ended_at = datetime.now(timezone.utc)
+    learn_queues.discard(learn_session.id)
     await session.flush()
 
     delta = learn_session.ended_at - learn_session.started_at
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+import redis.asyncio as redis
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+
+from src.database.core import async_session_maker
+from src.entities import LearnSession, UserCardStats
+from src.learn.scheduler import _as_utc, after_commit
+
+logger = logging.getLogger(__name__)
+
+# Без URL состояние сессий хранится только в БД
+LEARN_STATE_REDIS_URL = os.getenv("LEARN_STATE_REDIS_URL")
+# Ограничения потерь при падении: ответы старше интервала уже записаны в БД,
+# а сессия с LEARN_STATE_MAX_DIRTY измененными карточками записывается сразу
+LEARN_STATE_FLUSH_INTERVAL = float(os.getenv("LEARN_STATE_FLUSH_INTERVAL", 1.0))
+LEARN_STATE_MAX_DIRTY = int(os.getenv("LEARN_STATE_MAX_DIRTY", 100))
+# Время жизни состояния неактивной сессии
+LEARN_STATE_TTL = int(os.getenv("LEARN_STATE_TTL", 24 * 3600))
+
+STATS_FIELDS = (
+    "id",
+    "card_id",
+    "success_count",
+    "fail_count",
+    "total_answers",
+    "correct_rate",
+    "streak",
+    "difficulty_score",
+    "is_learned",
+    "last_result",
+    "last_answered_at",
+    "last_lapse_at",
+    "card_version",
+)
+DATETIME_FIELDS = ("last_answered_at", "last_lapse_at")
+
+DIRTY_SESSIONS_KEY = "learn:dirty_sessions"
+
+
+def _encode(stats: UserCardStats) -> str:
+    data = {field: getattr(stats, field) for field in STATS_FIELDS}
+    for field in DATETIME_FIELDS:
+        if data[field] is not None:
+            data[field] = _as_utc(data[field]).isoformat()
+    return json.dumps(data)
+
+
+def _decode(raw: str, user_id: int) -> UserCardStats:
+    data = json.loads(raw)
+    for field in DATETIME_FIELDS:
+        if data[field] is not None:
+            data[field] = datetime.fromisoformat(data[field])
+    # Объект не добавляется в сессию БД
+    return UserCardStats(user_id=user_id, **data)
+
+
+class LearnStateStore:
+    """Состояние активных сессий обучения в Redis с отложенной записью в БД.
+
+    Ключи сессии: learn:{id}:meta (user_id, deck_id, счетчики),
+    learn:{id}:stats (card_id -> статистика), learn:{id}:dirty (измененные
+    карточки). Сессии с незаписанными изменениями — в learn:dirty_sessions.
+    """
+
+    def __init__(self, url: Optional[str]):
+        self.redis = redis.from_url(url, decode_responses=True) if url else None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    @staticmethod
+    def _keys(session_id: int) -> tuple[str, str, str]:
+        prefix = f"learn:{session_id}"
+        return f"{prefix}:meta", f"{prefix}:stats", f"{prefix}:dirty"
+
+    @staticmethod
+    def _deck_key(deck_id: int) -> str:
+        return f"learn:deck:{deck_id}:sessions"
+
+    async def save(
+        self,
+        learn_session: LearnSession,
+        user_id: int,
+        stats: list[UserCardStats],
+    ) -> None:
+        meta_key, stats_key, dirty_key = self._keys(learn_session.id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(meta_key, stats_key, dirty_key)
+            pipe.hset(
+                meta_key,
+                mapping={
+                    "user_id": user_id,
+                    "deck_id": learn_session.deck_id,
+                    "total_cards": learn_session.total_cards,
+                    "learned_cards": learn_session.learned_cards,
+                },
+            )
+            if stats:
+                pipe.hset(
+                    stats_key, mapping={stat.card_id: _encode(stat) for stat in stats}
+                )
+            pipe.sadd(self._deck_key(learn_session.deck_id), learn_session.id)
+            pipe.expire(meta_key, LEARN_STATE_TTL)
+            pipe.expire(stats_key, LEARN_STATE_TTL)
+            await pipe.execute()
+
+    async def get_stats(self, session_id: int) -> Optional[list[UserCardStats]]:
+        meta_key, stats_key, _ = self._keys(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hget(meta_key, "user_id")
+            pipe.hvals(stats_key)
+            user_id, values = await pipe.execute()
+        if user_id is None:
+            return None
+        return [_decode(raw, int(user_id)) for raw in values]
+
+    async def get_counters(self, session_id: int) -> Optional[tuple[int, int]]:
+        """(total_cards, learned_cards) сессии или None, если состояния нет"""
+        meta_key, _, _ = self._keys(session_id)
+        total, learned = await self.redis.hmget(
+            meta_key, "total_cards", "learned_cards"
+        )
+        if total is None:
+            return None
+        return int(total), int(learned)
+
+    async def apply_answer(
+        self, session_id: int, card_id: int, apply
+    ) -> Optional[tuple[UserCardStats, int, int, int]]:
+        """Применить apply(stats) к статистике карточки атомарно (WATCH/MULTI).
+
+        Возвращает (статистика, total_cards, learned_cards, число измененных
+        карточек) или None, если карточки нет в состоянии сессии.
+        """
+        meta_key, stats_key, dirty_key = self._keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(stats_key)
+                    user_id = await pipe.hget(meta_key, "user_id")
+                    raw = await pipe.hget(stats_key, card_id)
+                    if user_id is None or raw is None:
+                        await pipe.reset()
+                        return None
+                    stats = _decode(raw, int(user_id))
+                    was_learned = stats.is_learned
+                    apply(stats)
+
+                    pipe.multi()
+                    pipe.hset(stats_key, card_id, _encode(stats))
+                    pipe.hincrby(
+                        meta_key, "learned_cards", stats.is_learned - was_learned
+                    )
+                    pipe.hget(meta_key, "total_cards")
+                    pipe.sadd(dirty_key, card_id)
+                    pipe.scard(dirty_key)
+                    pipe.sadd(DIRTY_SESSIONS_KEY, session_id)
+                    for key in (meta_key, stats_key, dirty_key):
+                        pipe.expire(key, LEARN_STATE_TTL)
+                    _, learned, total, _, dirty, *_ = await pipe.execute()
+                    return stats, int(total), learned, dirty
+                except redis.WatchError:
+                    continue
+
+    async def flush(
+        self, session: AsyncSession, session_id: int, drop: bool = False
+    ) -> None:
+        """Записать измененную статистику и счетчики сессии в БД.
+
+        Отметки измененных карточек снимаются только после commit транзакции
+        session; с drop после commit удаляется и состояние: следующий запрос
+        загрузит его из БД. При откате состояние в Redis остается как было.
+        """
+        meta_key, stats_key, dirty_key = self._keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.smembers(dirty_key)
+            pipe.hgetall(meta_key)
+            card_ids, meta = await pipe.execute()
+
+        # card_id -> записанное значение (None, если статистики уже нет)
+        flushed = {}
+        if card_ids:
+            card_ids = list(card_ids)
+            flushed = dict(zip(card_ids, await self.redis.hmget(stats_key, *card_ids)))
+            user_id = int(meta.get("user_id", 0))
+            rows = [
+                {
+                    field: getattr(_decode(raw, user_id), field)
+                    for field in STATS_FIELDS
+                    if field != "card_id"
+                }
+                for raw in flushed.values()
+                if raw is not None
+            ]
+            if rows:
+                await session.execute(update(UserCardStats), rows)
+        if meta:
+            await session.execute(
+                update(LearnSession)
+                .where(LearnSession.id == session_id)
+                .values(
+                    total_cards=int(meta["total_cards"]),
+                    learned_cards=int(meta["learned_cards"]),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        await session.flush()
+
+        deck_id = int(meta["deck_id"]) if meta else None
+        # Событие after_commit синхронное, но выполняется внутри greenlet
+        # AsyncSession.commit, поэтому корутину можно дождаться через await_only
+        after_commit(
+            session,
+            lambda: await_only(self._release(session_id, flushed, drop, deck_id)),
+        )
+
+    async def _release(
+        self,
+        session_id: int,
+        flushed: dict[str, str],
+        drop: bool,
+        deck_id: Optional[int],
+    ) -> None:
+        """Снять отметки записанных карточек, не изменившихся с момента записи.
+
+        Состояние удаляется (drop), только если с записи его никто не менял,
+        иначе новые ответы остаются отмеченными до следующей записи.
+        """
+        meta_key, stats_key, dirty_key = self._keys(session_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                while True:
+                    try:
+                        await pipe.watch(stats_key, dirty_key)
+                        dirty = await pipe.smembers(dirty_key)
+                        current = (
+                            await pipe.hmget(stats_key, *flushed) if flushed else []
+                        )
+                        clean = [
+                            card_id
+                            for card_id, raw in zip(flushed, current)
+                            if raw == flushed[card_id]
+                        ]
+                        remaining = dirty - set(clean)
+
+                        pipe.multi()
+                        if drop and not remaining:
+                            pipe.delete(meta_key, stats_key, dirty_key)
+                            if deck_id is not None:
+                                pipe.srem(self._deck_key(deck_id), session_id)
+                        elif clean:
+                            pipe.srem(dirty_key, *clean)
+                        if not remaining:
+                            pipe.srem(DIRTY_SESSIONS_KEY, session_id)
+                        await pipe.execute()
+                        return
+                    except redis.WatchError:
+                        continue
+        except Exception as e:
+            # Отметки остались: карточки будут записаны повторно
+            logger.exception(f"Failed to release learn session state: {e}")
+
+    async def invalidate_deck(self, session: AsyncSession, deck_id: int) -> None:
+        """Записать и сбросить состояние сессий колоды после изменения карточек"""
+        deck_key = self._deck_key(deck_id)
+        for session_id in await self.redis.smembers(deck_key):
+            meta_key, _, _ = self._keys(int(session_id))
+            if not await self.redis.exists(meta_key):
+                # Состояние истекло по TTL
+                await self.redis.srem(deck_key, session_id)
+                continue
+            await self.flush(session, int(session_id), drop=True)
+
+    async def flush_dirty(self, session: AsyncSession) -> None:
+        for session_id in await self.redis.smembers(DIRTY_SESSIONS_KEY):
+            await self.flush(session, int(session_id))
+        await session.commit()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LEARN_STATE_FLUSH_INTERVAL)
+            try:
+                async with async_session_maker() as session:
+                    await self.flush_dirty(session)
+            except Exception as e:
+                logger.exception(f"Failed to flush learn session state: {e}")
+
+    async def start(self):
+        if self.enabled:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            async with async_session_maker() as session:
+                await self.flush_dirty(session)
+        if self.enabled:
+            await self.redis.aclose()
+
+
+learn_state = LearnStateStore(LEARN_STATE_REDIS_URL)
@@ -1,15 +1,19 @@
 import time
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.responses import PlainTextResponse
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from service_deadline import DeadlineMiddleware
 
 from src.log_settings import LogLevels, configure_logging
 
 from .api import register_routes
 from .exception_handlers import register_exception_handlers
+from .learn.state import learn_state
 from .monitoring.api_metrics import (
     api_calls_total,
+    deadline_dropped_requests_total,
     http_errors_4xx_total,
     http_errors_5xx_total,
     http_request_duration_seconds,
@@ -19,11 +23,25 @@ from .monitoring.common import registry
 
 configure_logging(LogLevels.info)
 
-app = FastAPI(docs_url="/api/docs")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await learn_state.start()
+    yield
+    await learn_state.stop()
+
+
+app = FastAPI(docs_url="/api/docs", lifespan=lifespan)
 
 register_exception_handlers(app)
 register_routes(app)
 
+app.add_middleware(
+    DeadlineMiddleware,
+    dropped_requests=deadline_dropped_requests_total,
+    timeout_content={"detail": "Deadline exceeded"},
+)
+
 
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
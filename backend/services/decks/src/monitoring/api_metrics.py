@@ -39,3 +39,10 @@ http_errors_5xx_total = Counter(
     ["endpoint", "status_code"],
     registry=registry,
 )
+
+deadline_dropped_requests_total = Counter(
+    "deadline_dropped_requests_total",
+    "Total number of requests dropped due to an expired deadline",
+    ["stage"],
+    registry=registry,
+)
@@ -2,6 +2,7 @@ import os
 from typing import AsyncGenerator, Optional
 from unittest.mock import Mock, patch
 
+import fakeredis
 import pytest
 from fastapi import Header, HTTPException, status
 from httpx import ASGITransport, AsyncClient
@@ -26,6 +27,8 @@ from src.entities import (
     TestResult,
     deck_categories,
 )
+from src.learn.scheduler import learn_queues
+from src.learn.state import learn_state
 from src.main import app
 
 # Получение базы
@@ -124,6 +127,9 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         ),
         patch("src.card.service.get_storage_client",
               return_value=mock_storage_client),
+        patch(
+            "src.learn.controller.get_storage_client", return_value=mock_storage_client
+        ),
     ):
         async with AsyncClient(
             transport=ASGITransport(app=app),
@@ -133,6 +139,17 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
             yield ac
 
     app.dependency_overrides.clear()
+    # id сессий в тестовой БД повторяются между тестами
+    learn_queues.clear()
+
+
+@pytest.fixture
+async def redis_learn_state():
+    """Состояние сессий обучения в fakeredis вместо Redis"""
+    learn_state.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield learn_state
+    await learn_state.redis.aclose()
+    learn_state.redis = None
 
 
 @pytest.fixture
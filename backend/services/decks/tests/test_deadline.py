@@ -0,0 +1,56 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+from service_deadline import DEADLINE_HEADER
+
+# DeadlineMiddleware проверяется в libs/service_deadline, здесь — его подключение
+
+
+@pytest.mark.asyncio
+class TestDeadline:
+    """Тесты для заголовка X-Request-Deadline"""
+
+    async def test_request_without_deadline(self, client: AsyncClient):
+        """Тест запроса без дедлайна"""
+        response = await client.get("/categories/")
+        assert response.status_code == 200
+
+    async def test_request_before_deadline(self, client: AsyncClient):
+        """Тест запроса, успевающего до дедлайна"""
+        headers = {DEADLINE_HEADER: str(time.time() + 10)}
+        response = await client.get("/categories/", headers=headers)
+        assert response.status_code == 200
+
+    async def test_expired_deadline_rejected(self, client: AsyncClient):
+        """Тест отказа в запросе с уже истекшим дедлайном"""
+        headers = {DEADLINE_HEADER: str(time.time() - 1)}
+        with patch("src.category.controller.list_categories") as list_categories:
+            response = await client.get("/categories/", headers=headers)
+        assert response.status_code == 504
+        list_categories.assert_not_called()
+
+    async def test_slow_request_cancelled(self, client: AsyncClient):
+        """Тест отмены обработки при истечении дедлайна"""
+        finished = False
+
+        async def slow_list_categories(session):
+            nonlocal finished
+            await asyncio.sleep(1)
+            finished = True
+            return []
+
+        headers = {DEADLINE_HEADER: str(time.time() + 0.1)}
+        with patch(
+            "src.category.controller.list_categories", side_effect=slow_list_categories
+        ):
+            response = await client.get("/categories/", headers=headers)
+        assert response.status_code == 504
+        assert not finished
+
+    async def test_invalid_deadline_ignored(self, client: AsyncClient):
+        """Тест игнорирования некорректного заголовка"""
+        response = await client.get("/categories/", headers={DEADLINE_HEADER: "abc"})
+        assert response.status_code == 200
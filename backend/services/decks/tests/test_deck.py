@@ -2,7 +2,8 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.auth import UserContext
-from src.entities import Category, Deck
+from src.deck_stats.service import update_deck_stats
+from src.entities import Card, CardResult, Category, Deck
 
 from tests.conftest import get_auth_headers
 
@@ -437,6 +438,62 @@ class TestDeckStats:
         assert "avg_time_seconds" in data
         assert "card_stats" in data
 
+    async def test_deck_stats_accumulated(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: средние колоды и карточек считаются по накопленным суммам"""
+        first, second = test_cards[0].id, test_cards[1].id
+        await update_deck_stats(
+            db_session,
+            deck_id=test_deck.id,
+            new_correct_rate=1.0,
+            new_total_time_seconds=30,
+            card_results=[
+                CardResult(card_id=first, correct=True, answer_time_seconds=10),
+                CardResult(card_id=second, correct=True, answer_time_seconds=20),
+            ],
+        )
+        await update_deck_stats(
+            db_session,
+            deck_id=test_deck.id,
+            new_correct_rate=0.0,
+            new_total_time_seconds=61,
+            card_results=[
+                CardResult(card_id=first, correct=False, answer_time_seconds=41),
+                CardResult(card_id=first, correct=True, answer_time_seconds=20),
+            ],
+        )
+        await db_session.commit()
+
+        headers = get_auth_headers(mock_user)
+        response = await client.get(f"/decks/{test_deck.id}/stats/", headers=headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_tests"] == 2
+        assert data["avg_score"] == 0.5
+        assert data["correct_rate"] == 0.5
+        assert data["avg_time_seconds"] == 45
+        assert data["card_stats"] == {
+            str(first): {
+                "total": 3,
+                "correct": 2,
+                "avg_time_seconds": 23,
+                "correct_rate": 2 / 3,
+            },
+            str(second): {
+                "total": 1,
+                "correct": 1,
+                "avg_time_seconds": 20,
+                "correct_rate": 1.0,
+            },
+        }
+
     async def test_deck_stats_as_manager(
         self, client: AsyncClient, test_deck: Deck, mock_manager: UserContext
     ):
@@ -1,9 +1,30 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import delete
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.auth import UserContext
-from src.entities import Card, Deck
+from src.entities import Card, Deck, LearnSession, UserCardStats
+from src.learn.scheduler import CardQueue
+from src.learn.service import (
+    UNANSWERED_HOURS,
+    W_TIME,
+    _apply_answer,
+    _base_weight,
+    _compute_weight,
+    _schedule_review,
+    compact_stale_stats,
+    get_next_cards,
+    rank_cards,
+    record_answer,
+    repair_session_counters,
+    start_session,
+)
+from src.learn.state import DIRTY_SESSIONS_KEY
 
 from tests.conftest import get_auth_headers
 
@@ -36,6 +57,41 @@ class TestCreateLearnSession:
         assert "started_at" in data["session"]
         assert data["session"]["ended_at"] is None
 
+    async def test_stats_created_on_first_answer(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: статистика карточки создается только при первом ответе"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        assert create_response.json()["session"]["total_cards"] == len(test_cards)
+        await client.post(
+            f"/deck/{test_deck.id}/cards",
+            json={"front_text": "Front 4", "back_text": "Back 4"},
+            headers=headers,
+        )
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        card_id = response.json()["card_id"]
+        assert card_id is not None
+        assert await db_session.scalar(select(func.count(UserCardStats.id))) == 0
+
+        await client.post(
+            f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+            json={"correct": True, "answer_time_seconds": 3},
+            headers=headers,
+        )
+        stats = (await db_session.scalars(select(UserCardStats))).all()
+        assert [(stat.card_id, stat.success_count) for stat in stats] == [(card_id, 1)]
+
     async def test_create_learn_session_unauthorized(
         self, client: AsyncClient, test_deck: Deck
     ):
@@ -223,6 +279,74 @@ class TestGetNextCard:
         assert data["total_cards"] == len(test_cards)
         assert 0.0 <= data["progress"] <= 1.0
 
+    async def test_get_next_card_after_answers(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: пока есть неотвеченные карточки, отвеченная не выдается снова"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        shown = []
+        for _ in test_cards:
+            response = await client.get(
+                f"/learn/sessions/{session_id}/next", headers=headers
+            )
+            card_id = response.json()["card_id"]
+            shown.append(card_id)
+            await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": False, "answer_time_seconds": 3},
+                headers=headers,
+            )
+        assert sorted(shown) == sorted(card.id for card in test_cards)
+
+    async def test_get_next_card_prefetch(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест получения очереди карточек с содержимым"""
+        headers = get_auth_headers(mock_user)
+        test_cards[0].front_image_url = "decks/1/card/1/images/front.png"
+        test_cards[1].back_image_url = "temp/1/uploads/back.png"
+        await db_session.flush()
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next?count=5", headers=headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        cards = {card["card_id"]: card for card in data["cards"]}
+        assert len(data["cards"]) == len(test_cards)
+        assert data["card_id"] == data["cards"][0]["card_id"]
+        assert cards[test_cards[0].id]["front_text"] == "Front 1"
+        assert cards[test_cards[0].id]["back_text"] == "Back 1"
+        assert (
+            cards[test_cards[0].id]["front_image_url"]
+            == "http://mock-presigned-get-url"
+        )
+        assert cards[test_cards[1].id]["back_image_url"] == "temp/1/uploads/back.png"
+        assert cards[test_cards[2].id]["front_image_url"] is None
+
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next?count=0", headers=headers
+        )
+        assert response.status_code == 422
+
     async def test_get_next_card_unauthorized(
         self,
         client: AsyncClient,
@@ -325,6 +449,86 @@ class TestSubmitAnswer:
         assert 0.0 <= data["progress"] <= 1.0
         assert isinstance(data["is_completed"], bool)
 
+    async def test_submit_answer_with_next(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ с next=true возвращает следующую карточку"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        next_response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        card_id = next_response.json()["card_id"]
+
+        response = await client.post(
+            f"/learn/sessions/{session_id}/cards/{card_id}/answer?next=true",
+            json={"correct": True, "answer_time_seconds": 5},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        next_card = response.json()["next_card"]
+        assert next_card["card_id"] != card_id
+        assert next_card["card_id"] in [card.id for card in test_cards]
+        assert next_card["front_text"].startswith("Front")
+
+        response = await client.post(
+            f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+            json={"correct": True, "answer_time_seconds": 5},
+            headers=headers,
+        )
+        assert response.json()["next_card"] is None
+
+    async def test_submit_answer_matches_apply_answer(
+        self,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: upsert ответа дает ту же статистику, что и _apply_answer"""
+        learn_session = await start_session(db_session, test_deck.id, mock_user.id)
+        card_id = test_cards[0].id
+        expected = UserCardStats(
+            success_count=0,
+            fail_count=0,
+            total_answers=0,
+            correct_rate=0.0,
+            streak=0,
+            difficulty_score=0.5,
+            is_learned=False,
+        )
+        for correct in [True, True, True, True, False, True, False, False, True]:
+            await record_answer(
+                db_session, learn_session, mock_user.id, card_id, correct, 1
+            )
+            stats = await db_session.scalar(
+                select(UserCardStats).where(
+                    (UserCardStats.user_id == mock_user.id)
+                    & (UserCardStats.card_id == card_id)
+                )
+            )
+            _apply_answer(expected, correct, stats.last_answered_at)
+            for field in (
+                "success_count",
+                "fail_count",
+                "total_answers",
+                "streak",
+                "is_learned",
+                "last_result",
+            ):
+                assert getattr(stats, field) == getattr(expected, field)
+            assert stats.correct_rate == pytest.approx(expected.correct_rate)
+            assert stats.difficulty_score == pytest.approx(expected.difficulty_score)
+            assert learn_session.learned_cards == int(expected.is_learned)
+        assert stats.last_lapse_at is not None
+
     async def test_submit_answer_incorrect(
         self,
         client: AsyncClient,
@@ -359,6 +563,49 @@ class TestSubmitAnswer:
         assert data["session_id"] == session_id
         assert data["is_completed"] is False
 
+    async def test_submit_answer_card_not_in_deck(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ на карточку другой колоды не меняет статистику и счетчики"""
+        headers = get_auth_headers(mock_user)
+        other_deck = Deck(title="Other", description="Other", owner_id=mock_user.id)
+        db_session.add(other_deck)
+        await db_session.flush()
+        other_card = Card(
+            deck_id=other_deck.id, front_text="F", back_text="B", order_index=0
+        )
+        db_session.add(other_card)
+        await db_session.commit()
+
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        for _ in range(3):
+            response = await client.post(
+                f"/learn/sessions/{session_id}/cards/{other_card.id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
+            assert response.status_code == 404
+            assert "Card not found" in response.json()["detail"]
+
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        assert response.json()["learned_cards"] == 0
+        stats_count = await db_session.scalar(
+            select(func.count(UserCardStats.id)).where(
+                UserCardStats.card_id == other_card.id
+            )
+        )
+        assert stats_count == 0
+
     async def test_submit_answer_unauthorized(
         self,
         client: AsyncClient,
@@ -441,80 +688,193 @@ class TestSubmitAnswer:
 
 
 @pytest.mark.asyncio
-class TestGetSessionProgress:
-    """Тесты для GET /learn/sessions/{session_id}/progress"""
+class TestSubmitAnswers:
+    """Тесты для POST /learn/sessions/{session_id}/answers"""
 
-    async def test_get_session_progress_success(
+    async def test_submit_answers_success(
         self,
         client: AsyncClient,
+        db_session: AsyncSession,
         test_deck: Deck,
         test_cards: list[Card],
         mock_user: UserContext,
     ):
-        """Тест успешного получения прогресса сессии"""
+        """Тест применения пакета ответов и повторной отправки того же пакета"""
         headers = get_auth_headers(mock_user)
-
-        # Создаем сессию
         create_response = await client.post(
             f"/learn/deck/{test_deck.id}/sessions", headers=headers
         )
         session_id = create_response.json()["session"]["id"]
 
-        # Получаем прогресс
-        response = await client.get(
-            f"/learn/sessions/{session_id}/progress", headers=headers
+        card = test_cards[0]
+        answered_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        payload = {
+            "answers": [
+                {
+                    "card_id": card.id,
+                    "correct": True,
+                    "answer_time_seconds": 2,
+                    "idempotency_key": f"answer-{i}",
+                    "answered_at": (answered_at + timedelta(minutes=i)).isoformat(),
+                }
+                for i in range(3)
+            ]
+            + [
+                {
+                    "card_id": test_cards[1].id,
+                    "correct": False,
+                    "answer_time_seconds": 4,
+                    "idempotency_key": "answer-3",
+                }
+            ]
+        }
+        response = await client.post(
+            f"/learn/sessions/{session_id}/answers", json=payload, headers=headers
         )
         assert response.status_code == 200
         data = response.json()
-        assert data["session_id"] == session_id
-        assert data["learned_cards"] >= 0
+        assert data["applied"] == 4
+        assert data["duplicates"] == 0
+        assert data["learned_cards"] == 1
         assert data["total_cards"] == len(test_cards)
-        assert 0.0 <= data["progress"] <= 1.0
-        assert isinstance(data["is_completed"], bool)
 
-    async def test_get_session_progress_unauthorized(
+        response = await client.post(
+            f"/learn/sessions/{session_id}/answers", json=payload, headers=headers
+        )
+        data = response.json()
+        assert data["applied"] == 0
+        assert data["duplicates"] == 4
+        assert data["learned_cards"] == 1
+
+        stats = await db_session.scalar(
+            select(UserCardStats).where(
+                (UserCardStats.user_id == mock_user.id)
+                & (UserCardStats.card_id == card.id)
+            )
+        )
+        assert stats.success_count == 3
+        assert stats.streak == 3
+        assert stats.is_learned is True
+
+    async def test_submit_answers_repeated_keys(
         self,
         client: AsyncClient,
+        db_session: AsyncSession,
         test_deck: Deck,
         test_cards: list[Card],
         mock_user: UserContext,
     ):
-        """Тест получения прогресса без авторизации"""
+        """Тест: примененный ключ и повтор ключа внутри пакета пропускаются"""
         headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        card_id = test_cards[0].id
+
+        def answer(key: str) -> dict:
+            return {
+                "card_id": card_id,
+                "correct": True,
+                "answer_time_seconds": 2,
+                "idempotency_key": key,
+            }
+
+        await client.post(
+            f"/learn/sessions/{session_id}/answers",
+            json={"answers": [answer("answer-1")]},
+            headers=headers,
+        )
+        response = await client.post(
+            f"/learn/sessions/{session_id}/answers",
+            json={
+                "answers": [answer("answer-1"), answer("answer-2"), answer("answer-2")]
+            },
+            headers=headers,
+        )
+        data = response.json()
+        assert data["applied"] == 1
+        assert data["duplicates"] == 2
+
+        stats = await db_session.scalar(
+            select(UserCardStats).where(
+                (UserCardStats.user_id == mock_user.id)
+                & (UserCardStats.card_id == card_id)
+            )
+        )
+        assert stats.success_count == 2
+        assert stats.streak == 2
 
-        # Создаем сессию
+    async def test_submit_answers_card_not_in_deck(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: пакет с чужой карточкой отклоняется целиком"""
+        headers = get_auth_headers(mock_user)
         create_response = await client.post(
             f"/learn/deck/{test_deck.id}/sessions", headers=headers
         )
         session_id = create_response.json()["session"]["id"]
 
-        # Пытаемся получить прогресс без авторизации
-        response = await client.get(f"/learn/sessions/{session_id}/progress")
-        assert response.status_code == 401
-        assert "Not authenticated" in response.json()["detail"]
+        payload = {
+            "answers": [
+                {
+                    "card_id": test_cards[0].id,
+                    "correct": True,
+                    "answer_time_seconds": 2,
+                    "idempotency_key": "answer-1",
+                },
+                {
+                    "card_id": 99999,
+                    "correct": True,
+                    "answer_time_seconds": 2,
+                    "idempotency_key": "answer-2",
+                },
+            ]
+        }
+        response = await client.post(
+            f"/learn/sessions/{session_id}/answers", json=payload, headers=headers
+        )
+        assert response.status_code == 400
+        assert response.json()["card_ids"] == [99999]
 
-    async def test_get_session_progress_not_found(
-        self, client: AsyncClient, mock_user: UserContext
+    async def test_submit_answers_empty(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
     ):
-        """Тест получения прогресса для несуществующей сессии"""
+        """Тест пустого пакета"""
         headers = get_auth_headers(mock_user)
-        response = await client.get("/learn/sessions/99999/progress", headers=headers)
-        assert response.status_code == 404
-        assert "Learn session not found" in response.json()["detail"]
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        response = await client.post(
+            f"/learn/sessions/{session_id}/answers",
+            json={"answers": []},
+            headers=headers,
+        )
+        assert response.status_code == 422
 
 
 @pytest.mark.asyncio
-class TestFinishLearnSession:
-    """Тесты для POST /learn/sessions/{session_id}/finish"""
+class TestGetSessionProgress:
+    """Тесты для GET /learn/sessions/{session_id}/progress"""
 
-    async def test_finish_learn_session_success(
+    async def test_get_session_progress_success(
         self,
         client: AsyncClient,
         test_deck: Deck,
         test_cards: list[Card],
         mock_user: UserContext,
     ):
-        """Тест успешного завершения сессии"""
+        """Тест успешного получения прогресса сессии"""
         headers = get_auth_headers(mock_user)
 
         # Создаем сессию
@@ -523,80 +883,1094 @@ class TestFinishLearnSession:
         )
         session_id = create_response.json()["session"]["id"]
 
-        # Завершаем сессию
-        response = await client.post(
-            f"/learn/sessions/{session_id}/finish", headers=headers
+        # Получаем прогресс
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
         )
         assert response.status_code == 200
         data = response.json()
         assert data["session_id"] == session_id
-        assert data["is_completed"] is True
+        assert data["learned_cards"] >= 0
+        assert data["total_cards"] == len(test_cards)
         assert 0.0 <= data["progress"] <= 1.0
+        assert isinstance(data["is_completed"], bool)
 
-        # Проверяем, что сессия действительно завершена
-        get_response = await client.get(
-            f"/learn/sessions/{session_id}", headers=headers
-        )
-        assert get_response.status_code == 200
-        assert get_response.json()["status"] == "completed"
-        assert get_response.json()["ended_at"] is not None
-
-    async def test_finish_learn_session_unauthorized(
+    async def test_progress_counters_follow_card_changes(
         self,
         client: AsyncClient,
+        db_session: AsyncSession,
         test_deck: Deck,
         test_cards: list[Card],
         mock_user: UserContext,
     ):
-        """Тест завершения сессии без авторизации"""
+        """Тест: счетчики сессии меняются при ответах, создании и удалении карточек"""
         headers = get_auth_headers(mock_user)
-
-        # Создаем сессию
         create_response = await client.post(
             f"/learn/deck/{test_deck.id}/sessions", headers=headers
         )
         session_id = create_response.json()["session"]["id"]
+        deck_id = test_deck.id
+        card_id = test_cards[0].id
+        total_cards = len(test_cards)
+        for _ in range(3):
+            await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
 
-        # Пытаемся завершить без авторизации
-        response = await client.post(f"/learn/sessions/{session_id}/finish")
-        assert response.status_code == 401
-        assert "Not authenticated" in response.json()["detail"]
+        response = await client.post(
+            f"/deck/{deck_id}/cards",
+            json={"front_text": "Front 4", "back_text": "Back 4"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        # Счетчики обновлены UPDATE в обход объекта сессии в общей тестовой сессии БД
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        data = response.json()
+        assert data["learned_cards"] == 1
+        assert data["total_cards"] == total_cards + 1
 
-    async def test_finish_learn_session_not_found(
-        self, client: AsyncClient, mock_user: UserContext
-    ):
-        """Тест завершения несуществующей сессии"""
-        headers = get_auth_headers(mock_user)
-        response = await client.post("/learn/sessions/99999/finish", headers=headers)
-        assert response.status_code == 404
-        assert "Learn session not found" in response.json()["detail"]
+        response = await client.delete(
+            f"/deck/{deck_id}/cards/{card_id}", headers=headers
+        )
+        assert response.status_code == 204
+        # Счетчики обновлены UPDATE в обход объекта сессии в общей тестовой сессии БД
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        data = response.json()
+        assert data["learned_cards"] == 0
+        assert data["total_cards"] == total_cards
 
-    async def test_finish_learn_session_already_completed(
+    async def test_repair_session_counters(
         self,
         client: AsyncClient,
+        db_session: AsyncSession,
         test_deck: Deck,
         test_cards: list[Card],
         mock_user: UserContext,
     ):
-        """Тест повторного завершения уже завершенной сессии"""
+        """Тест: /progress только читает счетчики, ремонт пересчитывает их"""
         headers = get_auth_headers(mock_user)
-
-        # Создаем сессию
         create_response = await client.post(
             f"/learn/deck/{test_deck.id}/sessions", headers=headers
         )
         session_id = create_response.json()["session"]["id"]
+        total_cards = len(test_cards)
+        db_session.add(
+            UserCardStats(
+                user_id=mock_user.id, card_id=test_cards[0].id, is_learned=True
+            )
+        )
+        await db_session.execute(
+            update(LearnSession)
+            .where(LearnSession.id == session_id)
+            .values(total_cards=10)
+        )
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
 
-        # Завершаем сессию первый раз
-        finish_response1 = await client.post(
-            f"/learn/sessions/{session_id}/finish", headers=headers
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
         )
-        assert finish_response1.status_code == 200
+        data = response.json()
+        assert data["learned_cards"] == 0
+        assert data["total_cards"] == 10
 
-        # Пытаемся завершить еще раз
-        finish_response2 = await client.post(
-            f"/learn/sessions/{session_id}/finish", headers=headers
+        await repair_session_counters(db_session)
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
         )
-        # Должно вернуть успех, но сессия уже завершена
+        data = response.json()
+        assert data["learned_cards"] == 1
+        assert data["total_cards"] == total_cards
+
+    async def test_card_edit_resets_progress(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: правка содержимого сбрасывает прогресс по карточке, сжатие
+        записывает сброс в статистику"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        card_id = test_cards[0].id
+        for _ in range(3):
+            await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
+
+        response = await client.patch(
+            f"/deck/{test_deck.id}/cards/{card_id}",
+            json={"order_index": 5},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
+        progress = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        assert progress.json()["learned_cards"] == 1
+
+        response = await client.patch(
+            f"/deck/{test_deck.id}/cards/{card_id}",
+            json={"front_text": "Updated Front"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        await db_session.refresh(await db_session.get(LearnSession, session_id))
+        progress = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        assert progress.json()["learned_cards"] == 0
+
+        # Запись статистики не тронута правкой, сброс учитывается при ответе
+        stats = await db_session.scalar(
+            select(UserCardStats).where(UserCardStats.card_id == card_id)
+        )
+        assert (stats.streak, stats.is_learned, stats.card_version) == (3, True, 1)
+
+        await client.post(
+            f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+            json={"correct": True, "answer_time_seconds": 2},
+            headers=headers,
+        )
+        await db_session.refresh(stats)
+        assert (stats.streak, stats.is_learned, stats.card_version) == (1, False, 2)
+
+        await db_session.execute(
+            update(UserCardStats)
+            .where(UserCardStats.id == stats.id)
+            .values(card_version=1, is_learned=True)
+        )
+        assert await compact_stale_stats(db_session, chunk_size=1) == 1
+        await db_session.refresh(stats)
+        assert (stats.streak, stats.is_learned, stats.card_version) == (0, False, 2)
+
+    async def test_get_session_progress_unauthorized(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест получения прогресса без авторизации"""
+        headers = get_auth_headers(mock_user)
+
+        # Создаем сессию
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        # Пытаемся получить прогресс без авторизации
+        response = await client.get(f"/learn/sessions/{session_id}/progress")
+        assert response.status_code == 401
+        assert "Not authenticated" in response.json()["detail"]
+
+    async def test_get_session_progress_not_found(
+        self, client: AsyncClient, mock_user: UserContext
+    ):
+        """Тест получения прогресса для несуществующей сессии"""
+        headers = get_auth_headers(mock_user)
+        response = await client.get("/learn/sessions/99999/progress", headers=headers)
+        assert response.status_code == 404
+        assert "Learn session not found" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+class TestFinishLearnSession:
+    """Тесты для POST /learn/sessions/{session_id}/finish"""
+
+    async def test_finish_learn_session_success(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест успешного завершения сессии"""
+        headers = get_auth_headers(mock_user)
+
+        # Создаем сессию
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        # Завершаем сессию
+        response = await client.post(
+            f"/learn/sessions/{session_id}/finish", headers=headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["session_id"] == session_id
+        assert data["is_completed"] is True
+        assert 0.0 <= data["progress"] <= 1.0
+
+        # Проверяем, что сессия действительно завершена
+        get_response = await client.get(
+            f"/learn/sessions/{session_id}", headers=headers
+        )
+        assert get_response.status_code == 200
+        assert get_response.json()["status"] == "completed"
+        assert get_response.json()["ended_at"] is not None
+
+    async def test_finish_learn_session_unauthorized(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест завершения сессии без авторизации"""
+        headers = get_auth_headers(mock_user)
+
+        # Создаем сессию
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        # Пытаемся завершить без авторизации
+        response = await client.post(f"/learn/sessions/{session_id}/finish")
+        assert response.status_code == 401
+        assert "Not authenticated" in response.json()["detail"]
+
+    async def test_finish_learn_session_not_found(
+        self, client: AsyncClient, mock_user: UserContext
+    ):
+        """Тест завершения несуществующей сессии"""
+        headers = get_auth_headers(mock_user)
+        response = await client.post("/learn/sessions/99999/finish", headers=headers)
+        assert response.status_code == 404
+        assert "Learn session not found" in response.json()["detail"]
+
+    async def test_finish_learn_session_already_completed(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест повторного завершения уже завершенной сессии"""
+        headers = get_auth_headers(mock_user)
+
+        # Создаем сессию
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        # Завершаем сессию первый раз
+        finish_response1 = await client.post(
+            f"/learn/sessions/{session_id}/finish", headers=headers
+        )
+        assert finish_response1.status_code == 200
+
+        # Пытаемся завершить еще раз
+        finish_response2 = await client.post(
+            f"/learn/sessions/{session_id}/finish", headers=headers
+        )
+        # Должно вернуть успех, но сессия уже завершена
         assert finish_response2.status_code == 200
         assert finish_response2.json()["is_completed"] is True
+
+
+def _random_stats(card_id: int, now: datetime) -> UserCardStats:
+    success = random.randint(0, 5)
+    fail = random.randint(0, 5)
+    answered = success + fail > 0
+    return UserCardStats(
+        user_id=1,
+        card_id=card_id,
+        success_count=success,
+        fail_count=fail,
+        total_answers=success + fail,
+        streak=random.randint(0, 4),
+        difficulty_score=random.random(),
+        is_learned=random.random() < 0.2,
+        last_result=random.choice([True, False]) if answered else None,
+        last_answered_at=(
+            now - timedelta(hours=random.uniform(0, 200)) if answered else None
+        ),
+    )
+
+
+class TestCardQueue:
+    """Тесты очереди карточек сессии"""
+
+    def _queue(self, stats: list[UserCardStats]) -> CardQueue:
+        queue = CardQueue(1, W_TIME, UNANSWERED_HOURS)
+        for stat in stats:
+            queue.update(stat.card_id, _base_weight(stat), stat.last_answered_at)
+        return queue
+
+    def test_peek_matches_compute_weight(self):
+        """Тест: очередь выбирает карточку с максимальным _compute_weight"""
+        now = datetime.now(timezone.utc)
+        for _ in range(50):
+            stats = [_random_stats(card_id, now) for card_id in range(1, 30)]
+            queue = self._queue(stats)
+            expected = max(stats, key=_compute_weight)
+            assert queue.peek(datetime.now(timezone.utc)) == expected.card_id
+
+    def test_update_changes_priority(self):
+        """Тест: после обновления карточки очередь учитывает новый вес"""
+        now = datetime.now(timezone.utc)
+        stats = [_random_stats(card_id, now) for card_id in range(1, 20)]
+        queue = self._queue(stats)
+        for _ in range(200):
+            stat = random.choice(stats)
+            stat.fail_count += 1
+            stat.total_answers = stat.success_count + stat.fail_count
+            stat.streak = 0
+            stat.last_result = False
+            stat.last_answered_at = datetime.now(timezone.utc)
+            queue.update(stat.card_id, _base_weight(stat), stat.last_answered_at)
+            expected = max(stats, key=_compute_weight)
+            assert queue.peek(datetime.now(timezone.utc)) == expected.card_id
+        assert len(queue) == len(stats)
+
+    def test_top_matches_compute_weight(self):
+        """Тест: top возвращает карточки по убыванию _compute_weight"""
+        now = datetime.now(timezone.utc)
+        for _ in range(50):
+            stats = [_random_stats(card_id, now) for card_id in range(1, 30)]
+            queue = self._queue(stats)
+            expected = sorted(stats, key=_compute_weight, reverse=True)
+            assert queue.top(datetime.now(timezone.utc), 10) == [
+                stat.card_id for stat in expected[:10]
+            ]
+
+    def test_peek_empty(self):
+        """Тест пустой очереди"""
+        assert self._queue([]).peek(datetime.now(timezone.utc)) is None
+
+
+@pytest.mark.asyncio
+class TestRankCards:
+    """Тесты ранжирования карточек в БД (LEARN_SCHEDULER=sql)"""
+
+    async def test_rank_cards_matches_compute_weight(
+        self, db_session: AsyncSession, test_deck: Deck, mock_user: UserContext
+    ):
+        """Тест: порядок из БД совпадает с порядком по _compute_weight"""
+        cards = [
+            Card(deck_id=test_deck.id, front_text=f"Q{i}", back_text=f"A{i}")
+            for i in range(30)
+        ]
+        db_session.add_all(cards)
+        await db_session.flush()
+
+        for _ in range(10):
+            await db_session.execute(delete(UserCardStats))
+            now = datetime.now(timezone.utc)
+            stats = [_random_stats(card.id, now) for card in cards]
+            for stat in stats:
+                stat.user_id = mock_user.id
+            db_session.add_all(stats)
+            await db_session.flush()
+
+            expected = sorted(stats, key=_compute_weight, reverse=True)
+            ranked = await rank_cards(db_session, test_deck.id, mock_user.id, limit=10)
+            assert ranked == [stat.card_id for stat in expected[:10]]
+
+    async def test_get_next_card_sql_scheduler(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: с LEARN_SCHEDULER=sql неотвеченные карточки выдаются по одной"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        shown = []
+        with patch("src.learn.service.LEARN_SCHEDULER", "sql"):
+            for _ in test_cards:
+                response = await client.get(
+                    f"/learn/sessions/{session_id}/next", headers=headers
+                )
+                card_id = response.json()["card_id"]
+                shown.append(card_id)
+                await client.post(
+                    f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                    json={"correct": False, "answer_time_seconds": 3},
+                    headers=headers,
+                )
+        assert sorted(shown) == sorted(card.id for card in test_cards)
+
+
+@pytest.mark.asyncio
+class TestLearnQueues:
+    """Тесты очередей сессий в памяти процесса (LEARN_SCHEDULER=queue)"""
+
+    @pytest.fixture(autouse=True)
+    def queue_scheduler(self):
+        with patch("src.learn.service.LEARN_SCHEDULER", "queue"):
+            yield
+
+    async def test_deleted_card_not_served(
+        self,
+        client: AsyncClient,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: после удаления карточки очередь перестраивается по версии сессии"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        card_id = response.json()["card_id"]
+
+        response = await client.delete(
+            f"/deck/{test_deck.id}/cards/{card_id}", headers=headers
+        )
+        assert response.status_code == 204
+        for _ in test_cards:
+            response = await client.get(
+                f"/learn/sessions/{session_id}/next", headers=headers
+            )
+            assert response.json()["card_id"] != card_id
+
+    async def test_queue_changed_after_commit(
+        self,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ меняет очередь после commit, откат ее не трогает"""
+        answered_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db_session.add_all(
+            UserCardStats(
+                user_id=mock_user.id,
+                card_id=card.id,
+                success_count=1,
+                total_answers=1,
+                correct_rate=1.0,
+                streak=1,
+                difficulty_score=0.3,
+                last_result=True,
+                last_answered_at=answered_at,
+            )
+            for card in test_cards[1:]
+        )
+        learn_session = await start_session(db_session, test_deck.id, mock_user.id)
+        card_id = test_cards[0].id
+        assert await get_next_cards(db_session, learn_session, mock_user.id, 1) == [
+            card_id
+        ]
+        await db_session.commit()
+
+        # Правильный ответ опускает неотвеченную карточку ниже остальных
+        await db_session.refresh(learn_session)
+        await record_answer(db_session, learn_session, mock_user.id, card_id, True, 1)
+        await db_session.rollback()
+        await db_session.refresh(learn_session)
+        assert await get_next_cards(db_session, learn_session, mock_user.id, 1) == [
+            card_id
+        ]
+
+        await record_answer(db_session, learn_session, mock_user.id, card_id, True, 1)
+        await db_session.commit()
+        await db_session.refresh(learn_session)
+        assert await get_next_cards(db_session, learn_session, mock_user.id, 1) != [
+            card_id
+        ]
+
+
+@pytest.mark.asyncio
+class TestLearnState:
+    """Тесты состояния сессий обучения в Redis"""
+
+    async def _stats(self, db_session: AsyncSession, card_id: int) -> UserCardStats:
+        return await db_session.scalar(
+            select(UserCardStats)
+            .where(UserCardStats.card_id == card_id)
+            .execution_options(populate_existing=True)
+        )
+
+    async def test_answers_written_behind(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        redis_learn_state,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответы применяются в Redis и записываются в БД при сбросе"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        card_id = response.json()["card_id"]
+
+        for _ in range(3):
+            response = await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
+        assert response.json()["learned_cards"] == 1
+        assert (await self._stats(db_session, card_id)).success_count == 0
+
+        response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        assert response.json()["learned_cards"] == 1
+
+        await redis_learn_state.flush_dirty(db_session)
+        stats = await self._stats(db_session, card_id)
+        assert stats.success_count == 3
+        assert stats.streak == 3
+        assert stats.is_learned is True
+        learn_session = await db_session.get(
+            LearnSession, session_id, populate_existing=True
+        )
+        assert learn_session.learned_cards == 1
+
+    async def test_completed_session_flushed(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        redis_learn_state,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: при завершении сессии состояние записывается в БД и удаляется"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        card_ids = [card.id for card in test_cards]
+
+        response = None
+        for _ in range(3 * len(card_ids)):
+            next_response = await client.get(
+                f"/learn/sessions/{session_id}/next", headers=headers
+            )
+            if next_response.status_code != 200:
+                break
+            card_id = next_response.json()["card_id"]
+            response = await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
+        assert response.json()["is_completed"] is True
+        assert await redis_learn_state.get_counters(session_id) is None
+        for card_id in card_ids:
+            assert (await self._stats(db_session, card_id)).is_learned is True
+
+    async def _answered_session(
+        self, client: AsyncClient, mock_user: UserContext, test_deck: Deck
+    ) -> tuple[int, int]:
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        card_id = response.json()["card_id"]
+        for _ in range(3):
+            await client.post(
+                f"/learn/sessions/{session_id}/cards/{card_id}/answer",
+                json={"correct": True, "answer_time_seconds": 2},
+                headers=headers,
+            )
+        return session_id, card_id
+
+    async def test_state_kept_on_rollback(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        redis_learn_state,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: откат после записи состояния не теряет его в Redis"""
+        session_id, card_id = await self._answered_session(client, mock_user, test_deck)
+
+        await redis_learn_state.flush(db_session, session_id, drop=True)
+        await db_session.rollback()
+
+        assert await redis_learn_state.get_counters(session_id) is not None
+        stats = {
+            stat.card_id: stat for stat in await redis_learn_state.get_stats(session_id)
+        }
+        assert stats[card_id].success_count == 3
+        assert (await self._stats(db_session, card_id)).success_count == 0
+
+        await redis_learn_state.flush_dirty(db_session)
+        assert (await self._stats(db_session, card_id)).success_count == 3
+        assert await redis_learn_state.redis.smembers(DIRTY_SESSIONS_KEY) == set()
+
+    async def test_state_dropped_after_commit(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        redis_learn_state,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: состояние удаляется только после commit и без новых ответов"""
+        session_id, card_id = await self._answered_session(client, mock_user, test_deck)
+
+        def answer(stats):
+            stats.success_count += 1
+
+        await redis_learn_state.flush(db_session, session_id, drop=True)
+        # Ответ между записью и commit остается в Redis до следующей записи
+        await redis_learn_state.apply_answer(session_id, card_id, answer)
+        await db_session.commit()
+        assert await redis_learn_state.get_counters(session_id) is not None
+        assert await redis_learn_state.redis.smembers(DIRTY_SESSIONS_KEY) == {
+            str(session_id)
+        }
+
+        await redis_learn_state.flush(db_session, session_id, drop=True)
+        assert await redis_learn_state.get_counters(session_id) is not None
+        await db_session.commit()
+        assert await redis_learn_state.get_counters(session_id) is None
+        assert (await self._stats(db_session, card_id)).success_count == 4
+
+    async def test_concurrent_answers(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        redis_learn_state,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: параллельные ответы на одну карточку не теряются"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        await client.get(f"/learn/sessions/{session_id}/next", headers=headers)
+        card_id = test_cards[0].id
+
+        def answer(stats):
+            stats.success_count += 1
+
+        await asyncio.gather(
+            *[
+                redis_learn_state.apply_answer(session_id, card_id, answer)
+                for _ in range(10)
+            ]
+        )
+        stats = {
+            stat.card_id: stat for stat in await redis_learn_state.get_stats(session_id)
+        }
+        assert stats[card_id].success_count == 10
+
+
+@pytest.mark.asyncio
+class TestSpacedRepetition:
+    """Тесты режима srs (SM-2) и прогноза повторений"""
+
+    async def test_schedule_review_sm2(self):
+        """Тест: интервалы 1, 6, 6 * ease; ошибка сбрасывает повторения, не ease"""
+        now = datetime.now(timezone.utc)
+        stats = UserCardStats(repetitions=0, interval_days=0.0, ease=2.5)
+
+        _schedule_review(stats, 5, now)
+        assert stats.interval_days == 1.0
+        assert stats.ease == pytest.approx(2.6)
+        _schedule_review(stats, 4, now)
+        assert stats.interval_days == 6.0
+        _schedule_review(stats, 4, now)
+        assert stats.interval_days == pytest.approx(6.0 * 2.6)
+        assert stats.due_at == now + timedelta(days=stats.interval_days)
+        assert stats.repetitions == 3
+
+        _schedule_review(stats, 1, now)
+        assert stats.repetitions == 0
+        assert stats.interval_days == 1.0
+        assert stats.ease == pytest.approx(2.6)
+
+        for _ in range(10):
+            _schedule_review(stats, 3, now)
+        assert stats.ease == 1.3
+
+    async def test_srs_session_returns_due_cards(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: новые карточки по порядку, отвеченные — только после due_at"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions?mode=srs", headers=headers
+        )
+        assert create_response.json()["session"]["mode"] == "srs"
+        session_id = create_response.json()["session"]["id"]
+
+        for card in test_cards:
+            response = await client.get(
+                f"/learn/sessions/{session_id}/next", headers=headers
+            )
+            assert response.json()["card_id"] == card.id
+            await client.post(
+                f"/learn/sessions/{session_id}/cards/{card.id}/answer",
+                json={"correct": True, "answer_time_seconds": 3, "quality": 5},
+                headers=headers,
+            )
+
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        assert response.json()["card_id"] is None
+
+        await db_session.execute(
+            update(UserCardStats)
+            .where(UserCardStats.card_id == test_cards[1].id)
+            .values(due_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+        )
+        response = await client.get(
+            f"/learn/sessions/{session_id}/next", headers=headers
+        )
+        assert response.json()["card_id"] == test_cards[1].id
+
+        session_response = await client.get(
+            f"/learn/sessions/{session_id}", headers=headers
+        )
+        assert session_response.json()["status"] == "active"
+
+    async def test_srs_answer_card_not_in_deck(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ на карточку другой колоды в режиме srs"""
+        headers = get_auth_headers(mock_user)
+        other_deck = Deck(title="Other", description="Other", owner_id=mock_user.id)
+        db_session.add(other_deck)
+        await db_session.flush()
+        other_card = Card(
+            deck_id=other_deck.id, front_text="F", back_text="B", order_index=0
+        )
+        db_session.add(other_card)
+        await db_session.commit()
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions?mode=srs", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+
+        response = await client.post(
+            f"/learn/sessions/{session_id}/cards/{other_card.id}/answer",
+            json={"correct": True, "answer_time_seconds": 3},
+            headers=headers,
+        )
+        assert response.status_code == 404
+        assert "Card not found" in response.json()["detail"]
+
+    async def test_review_forecast(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: прогноз по дням, просроченные карточки учитываются сегодня"""
+        now = datetime.now(timezone.utc)
+        today = datetime.combine(now.date(), datetime.min.time(), timezone.utc)
+        due = [
+            today - timedelta(days=2),
+            today + timedelta(days=1, hours=12),
+            today + timedelta(days=10),
+        ]
+        db_session.add_all(
+            UserCardStats(user_id=mock_user.id, card_id=card.id, due_at=due_at)
+            for card, due_at in zip(test_cards, due)
+        )
+        await db_session.commit()
+
+        response = await client.get(
+            f"/learn/deck/{test_deck.id}/forecast?days=7",
+            headers=get_auth_headers(mock_user),
+        )
+
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert len(days) == 7
+        assert days[0] == {"date": now.date().isoformat(), "due": 1}
+        assert [day["due"] for day in days] == [1, 1, 0, 0, 0, 0, 0]
+
+
+@pytest.mark.asyncio
+class TestReviewQueue:
+    """Тесты общей очереди повторений по всем колодам пользователя"""
+
+    async def _cards_with_due(
+        self, db_session: AsyncSession, decks: list[Deck], user_id: int
+    ) -> list[Card]:
+        """По две карточки в колодах, сроки повторения через час друг от друга"""
+        now = datetime.now(timezone.utc)
+        cards = [
+            Card(deck_id=deck.id, front_text=f"Q{i}", back_text=f"A{i}")
+            for deck in decks
+            for i in range(2)
+        ]
+        db_session.add_all(cards)
+        await db_session.flush()
+        db_session.add_all(
+            UserCardStats(
+                user_id=user_id,
+                card_id=card.id,
+                due_at=now - timedelta(hours=len(cards) - i),
+            )
+            for i, card in enumerate(cards)
+        )
+        await db_session.commit()
+        return cards
+
+    async def test_review_queue_pagination(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_decks: list[Deck],
+        mock_user: UserContext,
+        mock_other_user: UserContext,
+    ):
+        """Тест: карточки разных колод по due_at, постранично через курсор"""
+        cards = await self._cards_with_due(db_session, test_decks[:2], mock_user.id)
+        await self._cards_with_due(db_session, test_decks[2:], mock_other_user.id)
+        headers = get_auth_headers(mock_user)
+
+        response = await client.get("/learn/review?limit=3", headers=headers)
+        assert response.status_code == 200
+        first_page = response.json()
+        assert [item["card_id"] for item in first_page] == [c.id for c in cards[:3]]
+        assert {item["deck_id"] for item in first_page} == {
+            test_decks[0].id,
+            test_decks[1].id,
+        }
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = await client.get(
+            f"/learn/review?limit=3&cursor={cursor}", headers=headers
+        )
+        assert [item["card_id"] for item in response.json()] == [cards[3].id]
+        assert "X-Next-Cursor" not in response.headers
+
+    async def test_review_queue_weights_fallback(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: после карточек с due_at — карточки без due_at по убыванию веса"""
+        now = datetime.now(timezone.utc)
+        db_session.add(
+            UserCardStats(
+                user_id=mock_user.id,
+                card_id=test_cards[0].id,
+                due_at=now - timedelta(hours=1),
+            )
+        )
+        db_session.add_all(
+            UserCardStats(
+                user_id=mock_user.id,
+                card_id=card.id,
+                fail_count=fail_count,
+                total_answers=fail_count,
+                last_result=False,
+                last_answered_at=now,
+            )
+            for card, fail_count in [(test_cards[1], 1), (test_cards[2], 2)]
+        )
+        await db_session.commit()
+        headers = get_auth_headers(mock_user)
+
+        response = await client.get("/learn/review?limit=2", headers=headers)
+        assert [item["card_id"] for item in response.json()] == [
+            test_cards[0].id,
+            test_cards[2].id,
+        ]
+        assert response.json()[1]["due_at"] is None
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = await client.get(
+            f"/learn/review?limit=2&cursor={cursor}", headers=headers
+        )
+        assert [item["card_id"] for item in response.json()] == [test_cards[1].id]
+        assert "X-Next-Cursor" not in response.headers
+
+    async def test_review_queue_unknown_cursor(
+        self, client: AsyncClient, mock_user: UserContext
+    ):
+        """Тест страницы с неразборчивым курсором"""
+        response = await client.get(
+            "/learn/review?cursor=99999", headers=get_auth_headers(mock_user)
+        )
+        assert response.status_code == 400
+        assert "Invalid cursor" in response.json()["detail"]
+
+    async def test_review_queue_weights_pages_stable(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: страницы по весу считаются на момент первой и не повторяются"""
+        now = datetime.now(timezone.utc)
+        db_session.add_all(
+            UserCardStats(
+                user_id=mock_user.id,
+                card_id=card.id,
+                fail_count=1,
+                total_answers=1,
+                last_result=False,
+                last_answered_at=now - timedelta(minutes=i),
+            )
+            for i, card in enumerate(test_cards)
+        )
+        await db_session.commit()
+        headers = get_auth_headers(mock_user)
+
+        card_ids = []
+        response = await client.get("/learn/review?limit=1", headers=headers)
+        while True:
+            card_ids += [item["card_id"] for item in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            await asyncio.sleep(0.01)
+            response = await client.get(
+                f"/learn/review?limit=1&cursor={cursor}", headers=headers
+            )
+        assert card_ids == [card.id for card in reversed(test_cards)]
+
+    async def test_review_answer_updates_deck_stats(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ из очереди переносит повторение и учитывается в сессии колоды"""
+        headers = get_auth_headers(mock_user)
+        create_response = await client.post(
+            f"/learn/deck/{test_deck.id}/sessions", headers=headers
+        )
+        session_id = create_response.json()["session"]["id"]
+        card_id = test_cards[0].id
+        db_session.add(
+            UserCardStats(
+                user_id=mock_user.id,
+                card_id=card_id,
+                streak=2,
+                due_at=datetime.now(timezone.utc),
+            )
+        )
+        await db_session.flush()
+
+        response = await client.post(
+            f"/learn/review/cards/{card_id}/answer",
+            json={"correct": True, "answer_time_seconds": 3},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["deck_id"] == test_deck.id
+        assert data["is_learned"] is True
+        assert data["interval_days"] == 1.0
+        review_response = await client.get("/learn/review", headers=headers)
+        assert review_response.json() == []
+        progress_response = await client.get(
+            f"/learn/sessions/{session_id}/progress", headers=headers
+        )
+        assert progress_response.json()["learned_cards"] == 1
+
+    async def test_review_answer_card_not_found(
+        self, client: AsyncClient, test_cards: list[Card], mock_user: UserContext
+    ):
+        """Тест ответа на карточку без статистики пользователя"""
+        response = await client.post(
+            f"/learn/review/cards/{test_cards[0].id}/answer",
+            json={"correct": True, "answer_time_seconds": 3},
+            headers=get_auth_headers(mock_user),
+        )
+
+        assert response.status_code == 404
+
+    async def test_review_answer_weights_card_not_scheduled(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_deck: Deck,
+        test_cards: list[Card],
+        mock_user: UserContext,
+    ):
+        """Тест: ответ из очереди на карточку режима weights не включает SM-2"""
+        headers = get_auth_headers(mock_user)
+        await client.post(f"/learn/deck/{test_deck.id}/sessions", headers=headers)
+        card_id = test_cards[0].id
+        db_session.add(UserCardStats(user_id=mock_user.id, card_id=card_id))
+        await db_session.flush()
+
+        response = await client.post(
+            f"/learn/review/cards/{card_id}/answer",
+            json={"correct": True, "answer_time_seconds": 3},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["due_at"] is None
+        assert response.json()["interval_days"] == 0.0
+        stats = await db_session.scalar(
+            select(UserCardStats)
+            .where(UserCardStats.card_id == card_id)
+            .execution_options(populate_existing=True)
+        )
+        assert stats.success_count == 1
+        assert stats.repetitions == 0
@@ -4,6 +4,8 @@ from typing import Any, Dict, Optional
 import httpx
 from django.conf import settings
 
+from common.deadline import check_deadline, deadline_headers, remaining_time
+
 
 class DecksServiceClient:
     def __init__(self):
@@ -14,12 +16,19 @@ class DecksServiceClient:
         headers = {"Content-Type": "application/json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
+        headers.update(deadline_headers())
         return headers
 
     def get_deck_sync(
         self, deck_id: int, token: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        with httpx.Client(timeout=self.timeout) as client:
+        check_deadline()
+        timeout = self.timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+
+        with httpx.Client(timeout=timeout) as client:
             try:
                 response = client.get(
                     f"{self.base_url}/api/decks/{deck_id}/",
@@ -33,6 +42,8 @@ class DecksServiceClient:
                         return None
                 return None
             except httpx.RequestError:
+                # Таймаут из-за дедлайна не должен выглядеть как отсутствие колоды
+                check_deadline()
                 return None
             except Exception:
                 return None
@@ -0,0 +1,92 @@
+import math
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from django.db import connection
+from django.http import HttpRequest, HttpResponse, JsonResponse
+
+from .monitoring.api_metrics import deadline_dropped_requests_total
+
+# Абсолютный дедлайн запроса (unix time в секундах), выставляется gateway
+DEADLINE_HEADER = "X-Request-Deadline"
+
+current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    try:
+        deadline = float(value)
+    except (TypeError, ValueError):
+        return None
+    # nan и inf не дедлайн: с nan любой запрос считался бы просроченным
+    return deadline if math.isfinite(deadline) else None
+
+
+def remaining_time() -> Optional[float]:
+    """Сколько осталось до дедлайна текущего запроса; None — дедлайна нет"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def check_deadline() -> None:
+    if remaining_time() == 0.0:
+        raise DeadlineExceeded()
+
+
+def deadline_headers() -> dict:
+    """Заголовок для передачи дедлайна в исходящие запросы"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return {}
+    return {DEADLINE_HEADER: f"{deadline:.3f}"}
+
+
+def _check_deadline_before_query(execute, sql, params, many, context):
+    check_deadline()
+    return execute(sql, params, many, context)
+
+
+def _timeout_response() -> HttpResponse:
+    return JsonResponse({"detail": "Deadline exceeded"}, status=504)
+
+
+class DeadlineMiddleware:
+    """Не начинает просроченные запросы и прерывает обработку после дедлайна.
+
+    Запросы к БД и в decks проверяют дедлайн перед выполнением, поэтому после
+    его истечения следующий запрос обрывает обработку с ответом 504.
+    """
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+        if deadline is None:
+            return self.get_response(request)
+
+        if deadline <= time.time():
+            deadline_dropped_requests_total.labels(stage="expired").inc()
+            return _timeout_response()
+
+        token = current_deadline.set(deadline)
+        try:
+            with connection.execute_wrapper(_check_deadline_before_query):
+                return self.get_response(request)
+        finally:
+            current_deadline.reset(token)
+
+    def process_exception(self, request: HttpRequest, exception: Exception):
+        if isinstance(exception, DeadlineExceeded):
+            deadline_dropped_requests_total.labels(stage="cancelled").inc()
+            return _timeout_response()
+        return None
@@ -37,3 +37,10 @@ http_errors_5xx_total = Counter(
     registry=registry,
 )
 
+
+deadline_dropped_requests_total = Counter(
+    "teaching_deadline_dropped_requests_total",
+    "Total number of requests dropped due to an expired deadline in teaching service",
+    ["stage"],
+    registry=registry,
+)
@@ -37,6 +37,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "common.monitoring.middleware.MetricsMiddleware",
+    "common.deadline.DeadlineMiddleware",
 ]
 
 ROOT_URLCONF = "teaching.urls"
@@ -0,0 +1,94 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from django.test import RequestFactory
+
+from common.deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    check_deadline,
+    current_deadline,
+    parse_deadline,
+)
+from common.monitoring.common import registry
+
+# Общий с libs/service_deadline тестовый вектор
+DEADLINE_CASES = (
+    Path(__file__).resolve().parents[3]
+    / "libs"
+    / "service_deadline"
+    / "deadline_cases.json"
+)
+
+
+def load_cases() -> list[dict]:
+    # Без вектора тесты не должны молча пропускаться
+    cases = json.loads(DEADLINE_CASES.read_text())
+    if not cases:
+        raise ValueError(f"{DEADLINE_CASES} has no cases")
+    return cases
+
+
+def dropped(stage: str) -> float:
+    value = registry.get_sample_value(
+        "teaching_deadline_dropped_requests_total", {"stage": stage}
+    )
+    return value or 0.0
+
+
+def headers(case: dict) -> dict:
+    if "offset" in case:
+        return {DEADLINE_HEADER: str(time.time() + case["offset"])}
+    if "header" in case:
+        return {DEADLINE_HEADER: case["header"]}
+    return {}
+
+
+class TestParseDeadline:
+    """Тесты разбора заголовка X-Request-Deadline"""
+
+    @pytest.mark.parametrize("value", [None, "abc", "nan", "inf", "-inf"])
+    def test_invalid_value(self, value):
+        """Тест некорректных и бесконечных значений"""
+        assert parse_deadline(value) is None
+
+    def test_valid_value(self):
+        """Тест корректного значения"""
+        assert parse_deadline("1700000000.5") == 1700000000.5
+
+
+class TestDeadlineMiddleware:
+    """Тесты DeadlineMiddleware по общему вектору"""
+
+    @pytest.mark.parametrize("case", load_cases(), ids=lambda case: case["name"])
+    def test_case(self, case: dict):
+        """Тест случая из deadline_cases.json"""
+        handled = []
+
+        def get_response(request):
+            handled.append(current_deadline.get())
+            time.sleep(case["handler_delay"])
+            # Так дедлайн проверяют запросы к БД и в decks
+            check_deadline()
+            return "ok"
+
+        middleware = DeadlineMiddleware(get_response)
+        request = RequestFactory().get("/", headers=headers(case))
+        before = {stage: dropped(stage) for stage in ("expired", "cancelled")}
+        try:
+            response = middleware(request)
+        except DeadlineExceeded as exc:
+            response = middleware.process_exception(request, exc)
+
+        status_code = 200 if response == "ok" else response.status_code
+        assert status_code == case["status"]
+        for stage in ("expired", "cancelled"):
+            expected = 1.0 if case["dropped"] == stage else 0.0
+            assert dropped(stage) == before[stage] + expected
+        # Просроченный запрос не доходит до обработчика
+        assert bool(handled) == (case["dropped"] != "expired")
+        if handled:
+            assert (handled[0] is not None) == ("offset" in case)
@@ -3,11 +3,15 @@ from http import HTTPStatus
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from passlib.context import CryptContext
+from service_deadline import DeadlineMiddleware
 
 from . import routes
 from .database_client import Base, engine
+from .monitoring.api_metrics import users_deadline_dropped_requests_total
+from .monitoring.common import registry
 from .schemas.errors_schemas import CustomError
 
 
@@ -26,6 +30,13 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="User service", version="1.0.0", lifespan=lifespan, docs_url="/api/docs"
 )
+app.add_middleware(
+    DeadlineMiddleware,
+    dropped_requests=users_deadline_dropped_requests_total,
+    timeout_content=CustomError(
+        code="DEADLINE_EXCEEDED", statusCode="504_GATEWAY_TIMEOUT"
+    ).model_dump(),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -36,6 +47,11 @@ app.add_middleware(
 app.include_router(routes.router, prefix="/api")
 
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.exception_handler(HTTPException)
 async def custom_exception(request: Request, exc: HTTPException):
     if isinstance(exc.detail, str):
@@ -0,0 +1,10 @@
+from prometheus_client import Counter
+
+from .common import registry
+
+users_deadline_dropped_requests_total = Counter(
+    "users_deadline_dropped_requests_total",
+    "Total number of requests dropped due to an expired deadline in users service",
+    ["stage"],
+    registry=registry,
+)
@@ -0,0 +1,4 @@
+from prometheus_client import CollectorRegistry, ProcessCollector
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
@@ -0,0 +1,19 @@
+import os
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+# Движок БД создается при импорте приложения
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+async def client() -> AsyncGenerator[AsyncClient, None]:
+    """HTTP клиент приложения без lifespan (таблицы не создаются)"""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
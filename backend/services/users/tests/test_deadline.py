@@ -0,0 +1,40 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+from service_deadline import DEADLINE_HEADER
+
+from app.monitoring.common import registry
+
+
+def dropped(stage: str) -> float:
+    value = registry.get_sample_value(
+        "users_deadline_dropped_requests_total", {"stage": stage}
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+class TestDeadline:
+    """Тесты подключения DeadlineMiddleware"""
+
+    async def test_request_before_deadline(self, client: AsyncClient):
+        """Тест запроса, успевающего до дедлайна"""
+        headers = {DEADLINE_HEADER: str(time.time() + 10)}
+        response = await client.get("/metrics", headers=headers)
+        assert response.status_code == 200
+
+    async def test_expired_deadline_rejected(self, client: AsyncClient):
+        """Тест отказа в запросе с уже истекшим дедлайном"""
+        before = dropped("expired")
+        headers = {DEADLINE_HEADER: str(time.time() - 1)}
+        response = await client.get("/metrics", headers=headers)
+        assert response.status_code == 504
+        assert response.json()["code"] == "DEADLINE_EXCEEDED"
+        assert dropped("expired") == before + 1
+
+    @pytest.mark.parametrize("value", ["abc", "nan", "inf"])
+    async def test_invalid_deadline_ignored(self, client: AsyncClient, value: str):
+        """Тест игнорирования некорректного заголовка"""
+        response = await client.get("/metrics", headers={DEADLINE_HEADER: value})
+        assert response.status_code == 200